@@ -1,19 +1,130 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
+import asyncio
+import atexit
+import hmac
 import os
+import time
 from dotenv import load_dotenv
 from src.chat import MessageHandler, ConversationManager
 from src.whatsapp.client import WhatsAppClient
+from src.whatsapp.async_client import AsyncWhatsAppClient, BackgroundEventLoop
+from src.whatsapp.config import LABELS
+from src.whatsapp.label_sync import LabelSyncEngine
+from src.whatsapp.label_queue import LabelWriteBehindQueue
+from src.whatsapp.rate_limiter import RateLimiter
+from src.utils.errors import WhatsAppRateLimitError
+from src.utils.logger import get_logging_stats
+from src.utils.state_monitor import StateTransitionMonitor
+from src.utils.transition_log import ColumnarTransitionLog
+from src.utils.metrics import REGISTRY, CONTENT_TYPE as METRICS_CONTENT_TYPE
 from src.business.flow_factory import BusinessFlowFactory
+from src.chat.conversation_store import SQLiteConversationStore
+from src.chat.deduplicator import MessageDeduplicator, SQLiteSeenMessageStore
+from src.chat.dispatcher import ShardedDispatcher
+from src.chat.ingestion_queue import WebhookIngestionQueue, IngestionQueueFullError
 
 load_dotenv()  # Load environment variables from a .env file
 
+# Webhook ingestion mode: 'sync' processes messages inside the request,
+# 'queue' acknowledges immediately and processes them on worker threads
+INGESTION_MODE = os.getenv('WEBHOOK_INGESTION_MODE', 'sync').strip().lower()
+
+# Persist conversations across restarts when a database path is configured
+CONVERSATION_DB_PATH = os.getenv('CONVERSATION_DB_PATH')
+conversation_store = SQLiteConversationStore(CONVERSATION_DB_PATH) if CONVERSATION_DB_PATH else None
+
+# Record flow state transitions for a share of users; 0 turns monitoring off
+STATE_MONITOR_SAMPLE_RATE = float(os.getenv('STATE_MONITOR_SAMPLE_RATE', 1.0))
+# Keep the full transition history on disk for flow metrics beyond retention
+STATE_MONITOR_LOG_DIR = os.getenv('STATE_MONITOR_LOG_DIR')
+state_monitor = StateTransitionMonitor(
+    sample_rate=STATE_MONITOR_SAMPLE_RATE,
+    event_log=ColumnarTransitionLog(STATE_MONITOR_LOG_DIR) if STATE_MONITOR_LOG_DIR else None
+) if STATE_MONITOR_SAMPLE_RATE > 0 else None
+
+# Both clients share one limiter so their combined rate stays within API limits
+rate_limiter = RateLimiter()
+whatsapp_client = WhatsAppClient(rate_limiter=rate_limiter)
+
+# Push chat labels to WhatsApp when any label ID is configured, after the replies
+# that caused them; changes without a reply are pushed after the hold time
+label_queue = LabelWriteBehindQueue(
+    LabelSyncEngine(whatsapp_client.send_message),
+    hold_seconds=float(os.getenv('LABEL_HOLD_SECONDS', 5)),
+    max_attempts=int(os.getenv('LABEL_MAX_ATTEMPTS', 5))
+) if any(LABELS.values()) else None
+if label_queue is not None:
+    label_queue.start()
+
+# Required by the admin endpoints; they reject every request when unset
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+
 # Initialize the message handler with its dependencies
-conversation_manager = ConversationManager()
-message_handler = MessageHandler(conversation_manager, BusinessFlowFactory())
-whatsapp_client = WhatsAppClient()
+conversation_manager = ConversationManager(store=conversation_store, monitor=state_monitor, label_sync=label_queue)
+# Expire idle conversations in the background rather than on request paths
+conversation_manager.start_expiry_sweeper(float(os.getenv('CONVERSATION_SWEEP_INTERVAL', 60)))
+
+def _shutdown_monitoring():
+    """Stop the sweeper and write the transitions recorded since its last sweep to disk."""
+    conversation_manager.stop_expiry_sweeper()
+    if state_monitor is not None:
+        state_monitor.close()
+
+atexit.register(_shutdown_monitoring)
+# Redelivered webhook messages are dropped by ID; persisted when a database path is configured
+DEDUP_DB_PATH = os.getenv('DEDUP_DB_PATH')
+message_deduplicator = MessageDeduplicator(
+    ttl_seconds=float(os.getenv('DEDUP_TTL_SECONDS', 86400)),
+    max_entries=int(os.getenv('DEDUP_MAX_ENTRIES', 100000)),
+    store=SQLiteSeenMessageStore(DEDUP_DB_PATH) if DEDUP_DB_PATH else None
+)
+message_handler = MessageHandler(conversation_manager, BusinessFlowFactory(), message_deduplicator)
+
+# The async client lives on one long-lived loop so its connection pool is reused
+async_whatsapp_client = AsyncWhatsAppClient(rate_limiter=rate_limiter)
+async_send_loop = BackgroundEventLoop()
 
 app = Flask(__name__)
 
+WEBHOOK_SECONDS = REGISTRY.histogram(
+    'whatsapp_bot_webhook_seconds',
+    'Time to answer a webhook request, by route',
+    ('route',)
+)
+_WEBHOOK_TIMERS = {route: WEBHOOK_SECONDS.labels(route) for route in ('/hook', '/hook/async')}
+
+REGISTRY.callback(
+    'whatsapp_bot_active_conversations',
+    'Conversations not yet expired or removed, by flow',
+    'gauge', ('flow',),
+    lambda: {(flow,): count for flow, count in conversation_manager.get_active_counts().items()}
+)
+if state_monitor is not None:
+    REGISTRY.callback(
+        'whatsapp_bot_state_transitions_total',
+        'Flow state transitions of monitored users',
+        'counter', ('flow', 'from_state', 'to_state'),
+        state_monitor.get_transition_counts
+    )
+
+@app.before_request
+def _start_request_timer():
+    """Remember when a request started for the webhook histograms."""
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def _observe_request_time(response):
+    """Record how long a webhook request took.
+    Args:
+        response (Response): The response about to be returned.
+    Returns:
+        Response: The response, unchanged.
+    """
+    timer = _WEBHOOK_TIMERS.get(request.path)
+    if timer is not None and 'request_started' in g:
+        timer.observe(time.perf_counter() - g.request_started)
+    return response
+
 def _validate_webhook_data(data):
     """Validate incoming webhook data and check for status updates.
     Args:
@@ -31,16 +142,54 @@ def _validate_webhook_data(data):
     return None, None, messages
 
 def _send_message_responses(payloads):
-    """Send message responses and handle any sending errors.
+    """Queue message responses on the pipelined outbound send queue.
     Args:
         payloads (list): List of payloads to send.
+    Returns:
+        list: Futures resolved when each payload has been sent.
     """
     if not payloads:
-        return
+        return []
         
-    for payload in payloads:
-        if payload:  # Only send if payload is not None/empty
-            whatsapp_client.send_message(payload)
+    # Empty payloads are skipped; order per recipient is kept by the queue
+    payloads = [payload for payload in payloads if payload]
+    futures = whatsapp_client.enqueue_messages(payloads)
+    if label_queue is not None:
+        # Label updates wait for the last reply of their chat
+        last_sends = {payload.get('to', ''): future for payload, future in zip(payloads, futures)}
+        for recipient, future in last_sends.items():
+            future.add_done_callback(lambda _, recipient=recipient: label_queue.release(recipient))
+    return futures
+
+def _process_and_send(message):
+    """Route a single message and queue its responses.
+    Args:
+        message (dict): The incoming WhatsApp message.
+    Returns:
+        list: Futures resolved when each response has been sent.
+    """
+    return message_handler.process_and_send(message, _send_message_responses)
+
+# Messages are sharded by sender: ordered per user, parallel across users
+message_dispatcher = ShardedDispatcher(
+    num_shards=int(os.getenv('INGESTION_WORKERS', 4)),
+    max_queue_size=int(os.getenv('INGESTION_QUEUE_SIZE', 10000)),
+    name='message-dispatcher'
+)
+message_dispatcher.start()
+
+ingestion_queue = WebhookIngestionQueue(_process_and_send, message_dispatcher)
+
+def _handle_rate_limited(e):
+    """Ask the provider to redeliver later instead of failing the webhook.
+    Args:
+        e (WhatsAppRateLimitError): The rate limit error that persisted after retries.
+    Returns:
+        Tuple: (response, status_code, headers)
+    """
+    retry_after = int(e.retry_after) if e.retry_after else 60
+    app.logger.warning("WhatsApp API rate limited, asking for redelivery in %ss", retry_after)
+    return jsonify({"status": "rate_limited", "error": str(e)}), 503, {'Retry-After': str(retry_after)}
 
 def _handle_error(e, request_data):
     """Handle and format error responses.
@@ -73,20 +222,163 @@ def handle_new_messages():
         if early_response:
             return early_response, status_code
             
-        # Process messages and send responses
-        for message in messages:
-            payloads = message_handler.process_message(message)
-            if payloads:
+        # Acknowledge immediately and let the workers route and send
+        if INGESTION_MODE == 'queue':
+            queued = ingestion_queue.enqueue(messages)
+            return jsonify({"status": "queued", "queued": queued}), 200
+
+        # Process messages in parallel across senders and wait for all replies
+        futures = [
+            message_dispatcher.submit(message.get('from', '').strip(), _process_and_send, message)
+            for message in messages
+        ]
+        for future in futures:
+            for send_future in future.result():
+                send_future.result()
+
+        return jsonify({"status": "success"}), 200
+    
+    except WhatsAppRateLimitError as e:
+        return _handle_rate_limited(e)
+
+    except IngestionQueueFullError as e:
+        app.logger.warning("Webhook rejected: %s", str(e))
+        return jsonify({"status": "busy", "error": str(e)}), 503
+
+    except Exception as e:
+        return _handle_error(e, request.json)
+
+async def _process_and_send_async(sender_messages):
+    """Route one sender's messages in order and send replies without blocking a thread.
+    Args:
+        sender_messages (list): Messages from a single sender, in arrival order.
+    """
+    for message in sender_messages:
+        sender = message.get('from', '').strip()
+        payloads = await asyncio.wrap_future(
+            message_dispatcher.submit(sender, message_handler.process_message, message)
+        )
+        payloads = [payload for payload in payloads if payload]
+        if payloads:
+            # Send one by one, so a redelivery resends only what failed
+            for sent, payload in enumerate(payloads):
                 try:
-                    _send_message_responses(payloads)
-                except Exception as e:
+                    await asyncio.wrap_future(
+                        async_send_loop.submit(async_whatsapp_client.send_message(payload))
+                    )
+                except Exception:
+                    message_handler.keep_unsent(message.get('id'), payloads[sent:])
                     raise
+            if label_queue is not None:
+                label_queue.release(sender)
+
+@app.route('/hook/async', methods=['POST'])
+async def handle_new_messages_async():
+    """Webhook handler that sends replies through the asyncio WhatsApp client.
+    Returns:
+        Response: JSON response indicating success or failure.
+    """
+    try:
+        data = request.json
+        early_response, status_code, messages = _validate_webhook_data(data)
+        if early_response:
+            return early_response, status_code
+
+        # Keep per-sender order, run different senders concurrently
+        by_sender = {}
+        for message in messages:
+            by_sender.setdefault(message.get('from', '').strip(), []).append(message)
+        await asyncio.gather(*(
+            _process_and_send_async(sender_messages) for sender_messages in by_sender.values()
+        ))
 
         return jsonify({"status": "success"}), 200
-    
+
+    except WhatsAppRateLimitError as e:
+        return _handle_rate_limited(e)
+
     except Exception as e:
         return _handle_error(e, request.json)
 
+@app.route('/ingestion/metrics', methods=['GET'])
+def ingestion_metrics():
+    """Expose ingestion queue depth and latency metrics.
+    Returns:
+        Response: JSON metrics for sizing the worker pool.
+    """
+    return jsonify({
+        "mode": INGESTION_MODE,
+        **ingestion_queue.get_metrics(),
+        "dedup": message_deduplicator.get_stats(),
+        "logging": get_logging_stats()
+    }), 200
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Expose latency histograms and counters in the Prometheus text format.
+    Returns:
+        Response: Metrics exposition text.
+    """
+    return Response(REGISTRY.render(), mimetype=None, content_type=METRICS_CONTENT_TYPE)
+
+def _admin_authorized():
+    """Check the bearer token of an admin request.
+    Returns:
+        bool: True if an admin token is configured and the request carries it.
+    """
+    # Fail closed: without a configured token the admin endpoints stay shut
+    if not ADMIN_TOKEN:
+        return False
+    return hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {ADMIN_TOKEN}')
+
+@app.route('/admin/labels', methods=['GET'])
+def pending_labels():
+    """Inspect label updates waiting to be pushed.
+    Returns:
+        Response: JSON queue counters and pending updates per chat.
+    """
+    if not _admin_authorized():
+        return jsonify({"error": "unauthorized"}), 401
+    if label_queue is None:
+        return jsonify({"error": "label sync is not enabled"}), 404
+    return jsonify({**label_queue.get_stats(), "updates": label_queue.get_pending()}), 200
+
+@app.route('/admin/labels/flush', methods=['POST'])
+def flush_labels():
+    """Push every pending label update now and wait for the queue to drain.
+    Returns:
+        Response: JSON with whether the queue drained and what is left.
+    """
+    if not _admin_authorized():
+        return jsonify({"error": "unauthorized"}), 401
+    if label_queue is None:
+        return jsonify({"error": "label sync is not enabled"}), 404
+    drained = label_queue.flush(request.args.get('timeout', 10.0, type=float))
+    return jsonify({"drained": drained, **label_queue.get_stats(), "updates": label_queue.get_pending()}), 200
+
+@app.route('/admin/labels/<label>/chats', methods=['GET'])
+def labelled_chats(label):
+    """List the chats that currently have a label, oldest first.
+    The listing holds customer phone numbers, so it is only served to
+    requests carrying the configured ADMIN_TOKEN and is never cached.
+    Args:
+        label (str): Label key, e.g. waiting_urgent_support.
+    Returns:
+        Response: JSON page of user IDs with the time the label was applied.
+    """
+    if not ADMIN_TOKEN or not _admin_authorized():
+        return jsonify({"error": "unauthorized"}), 401
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', 100, type=int), 0), 1000)
+    chats = conversation_manager.get_labelled_chats(label, offset, limit)
+    return jsonify({
+        "label": label,
+        "total": conversation_manager.count_labelled_chats(label),
+        "offset": offset,
+        "limit": limit,
+        "chats": [{"user_id": user_id, "applied_at": applied_at.isoformat()} for user_id, applied_at in chats]
+    }), 200, {'Cache-Control': 'no-store'}
+
 @app.route('/', methods=['GET'])
 def index():
     return 'Bot is running'
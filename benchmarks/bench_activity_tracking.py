@@ -0,0 +1,80 @@
+"""Microbenchmark for per-message conversation activity tracking.
+
+Compares the original datetime/timedelta bookkeeping with TimeoutManager's
+monotonic, array-backed tracker for the is_active + update_activity pair
+that ConversationManager.get_conversation performs on every message.
+
+Run from the project root:
+    python -m benchmarks.bench_activity_tracking [--users N] [--messages N]
+"""
+import argparse
+import json
+import random
+import timeit
+import tracemalloc
+from datetime import datetime, timedelta
+
+from src.chat.timeout_manager import TimeoutManager
+
+
+class DatetimeTimeoutManager:
+    """The previous implementation, kept here as the baseline"""
+
+    def __init__(self, timeout_minutes=300):
+        self._last_activity = {}
+        self._timeout_minutes = timeout_minutes
+
+    def update_activity(self, user_id):
+        self._last_activity[user_id] = datetime.now()
+
+    def is_active(self, user_id):
+        last_active = self._last_activity.get(user_id)
+        if not last_active:
+            return False
+        return (datetime.now() - last_active) <= timedelta(minutes=self._timeout_minutes)
+
+
+def _run_baseline(manager, traffic):
+    for user_id in traffic:
+        if manager.is_active(user_id):
+            manager.update_activity(user_id)
+
+
+def _run_tracker(manager, traffic):
+    for user_id in traffic:
+        manager.touch_if_active(user_id)
+
+
+def _measure(name, run, manager, traffic, repeat):
+    per_call = min(timeit.repeat(lambda: run(manager, traffic), number=1, repeat=repeat)) / len(traffic)
+    tracemalloc.start()
+    run(manager, traffic)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<28} {per_call * 1e9:8.0f} ns/message   peak alloc {peak / len(traffic):6.1f} B/message")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--messages', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    users = [f"9725{i:08d}" for i in range(args.users)]
+    # Copies of the IDs, as parsed from separate webhook payloads
+    traffic = json.loads(json.dumps([random.choice(users) for _ in range(args.messages)]))
+
+    baseline = DatetimeTimeoutManager()
+    tracked = TimeoutManager()
+    for user_id in users:
+        baseline.update_activity(user_id)
+        tracked.update_activity(user_id)
+
+    print(f"{args.users} users, {args.messages} messages")
+    _measure('datetime + timedelta', _run_baseline, baseline, traffic, args.repeat)
+    _measure('monotonic array tracker', _run_tracker, tracked, traffic, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
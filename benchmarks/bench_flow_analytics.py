@@ -0,0 +1,129 @@
+"""Benchmark of vectorized flow analytics against Python loops.
+
+Generates synthetic moving-flow histories and times flow metrics computed
+the way StateTransitionMonitor originally did (loops over a list of
+StateTransition records and timedelta objects) against FlowAnalytics,
+then times the funnel, dwell time, drop-off and cohort analyses.
+
+Run from the project root:
+    python -m benchmarks.bench_flow_analytics [--transitions N]
+"""
+import argparse
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from src.utils.flow_analytics import FlowAnalytics
+from src.utils.state_monitor import StateTransition
+from src.utils.transition_log import TransitionColumns
+
+STEPS = [
+    'initial', 'awaiting_packing_choice', 'awaiting_customer_details',
+    'awaiting_verification', 'awaiting_photos', 'awaiting_slot_selection', 'completed'
+]
+START = datetime(2024, 1, 1)
+
+
+def generate_columns(transitions: int, seed: int = 7) -> TransitionColumns:
+    """Create histories where each user walks the steps and may drop off at any of them"""
+    rng = np.random.default_rng(seed)
+    users = transitions // 3
+    # Steps taken per user, at least one, more often few than many
+    lengths = np.minimum(rng.geometric(0.3, users), len(STEPS) - 1)
+    lengths = lengths[np.cumsum(lengths) <= transitions]
+    user = np.repeat(np.arange(len(lengths), dtype=np.uint32), lengths)
+    step = np.arange(len(user)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    durations = rng.exponential(300.0, len(user)).astype(np.float32)
+    durations[step == 0] = np.nan
+    started = rng.uniform(0, 90 * 86400, len(lengths))
+    timestamp = np.repeat(started, lengths) + np.nan_to_num(durations).cumsum() - np.repeat(
+        np.concatenate(([0.0], np.nan_to_num(durations).cumsum()[np.cumsum(lengths)[:-1] - 1])), lengths
+    )
+    # In time order, as appended to the transition log
+    order = np.argsort(timestamp, kind='stable')
+    user, step, durations, timestamp = user[order], step[order], durations[order], timestamp[order]
+    columns = {
+        'timestamp': START.timestamp() + timestamp,
+        'duration': durations,
+        'user': user,
+        'flow': np.zeros(len(user), dtype=np.uint16),
+        'from_state': step.astype(np.uint16),
+        'to_state': (step + 1).astype(np.uint16),
+    }
+    return TransitionColumns(columns, [f"9725{i:08d}" for i in range(len(lengths))], ['moving'], STEPS)
+
+
+def to_records(columns: TransitionColumns):
+    """Convert columns to the list of records the original monitor kept"""
+    return [
+        StateTransition(
+            user_id=columns.users[user], from_state=STEPS[from_state], to_state=STEPS[to_state],
+            timestamp=datetime.fromtimestamp(timestamp), flow_type='moving',
+            duration=None if np.isnan(duration) else timedelta(seconds=float(duration))
+        )
+        for timestamp, duration, user, from_state, to_state in zip(
+            columns['timestamp'].tolist(), columns['duration'].tolist(), columns['user'].tolist(),
+            columns['from_state'].tolist(), columns['to_state'].tolist()
+        )
+    ]
+
+
+def loop_flow_metrics(transitions, flow_type):
+    """Flow metrics as originally computed by StateTransitionMonitor.get_flow_metrics"""
+    transitions = [t for t in transitions if t.flow_type == flow_type]
+    total_users = len(set(t.user_id for t in transitions))
+    completion_rate = len([t for t in transitions if t.to_state == 'completed']) / total_users
+    avg_duration = timedelta()
+    duration_count = 0
+    for t in transitions:
+        if t.duration:
+            avg_duration += t.duration
+            duration_count += 1
+    avg_duration = avg_duration / duration_count
+    paths = defaultdict(int)
+    for t in transitions:
+        paths[f"{t.from_state}->{t.to_state}"] += 1
+    common_paths = sorted(paths.items(), key=lambda x: x[1], reverse=True)[:10]
+    state_durations = defaultdict(timedelta)
+    state_counts = defaultdict(int)
+    for t in transitions:
+        if t.duration:
+            state_durations[t.from_state] += t.duration
+            state_counts[t.from_state] += 1
+    return total_users, completion_rate, avg_duration, common_paths, state_durations
+
+
+def timed(label, func, *args, **kwargs):
+    """Run a function once and print its wall time"""
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<40} {elapsed * 1e3:10.1f} ms")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--transitions', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    columns = generate_columns(args.transitions)
+    print(f"{len(columns)} transitions of {len(columns.users)} users")
+    records, _ = timed('build StateTransition records', to_records, columns)
+
+    _, loop_time = timed('flow metrics, Python loops', loop_flow_metrics, records, 'moving')
+    analytics, _ = timed('load records into arrays', FlowAnalytics.from_transitions, records)
+    analytics = FlowAnalytics(columns)
+    _, vector_time = timed('flow metrics, vectorized', analytics.flow_metrics, 'moving')
+    print(f"{'speedup':<40} {loop_time / vector_time:10.1f} x")
+
+    timed('funnel', analytics.funnel, STEPS)
+    timed('dwell time percentiles', analytics.dwell_percentiles)
+    timed('drop-off by step', analytics.drop_off)
+    timed('weekly cohorts', analytics.cohorts)
+
+
+if __name__ == '__main__':
+    main()
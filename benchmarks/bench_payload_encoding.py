@@ -0,0 +1,89 @@
+"""Microbenchmark for encoding outbound message payloads.
+
+Compares building a payload with MessagePayloadBuilder and JSON-encoding it
+the way `requests` does for `json=payload` with rendering a CompiledTemplate,
+whose request body is assembled from pre-encoded UTF-8 fragments.
+
+Run from the project root:
+    python -m benchmarks.bench_payload_encoding [--messages N]
+"""
+import argparse
+import json
+import timeit
+
+from src.business.messages import create_details_message
+from src.config.responses.common import WELCOME
+from src.models.message_payload import CompiledTemplate, MessagePayloadBuilder
+
+RECIPIENT = '972500000001'
+
+WELCOME_BUTTONS = [
+    {"id": "moving", "title": WELCOME['moving_button']},
+    {"id": "organization", "title": WELCOME['organization_button']}
+]
+
+# DETAILS_BASE_TEMPLATE with the address type left as a per-message field
+DETAILS_TEMPLATE = create_details_message('אריזה', '{address_type}')
+
+
+def _encode_like_requests(payload):
+    # requests uses json.dumps with ASCII escaping for `json=`
+    return json.dumps(payload, allow_nan=False).encode('utf-8')
+
+
+def _bench_welcome(messages, repeat):
+    compiled = CompiledTemplate(body_text=WELCOME['message'], buttons=WELCOME_BUTTONS)
+
+    def baseline():
+        payload = MessagePayloadBuilder.create_interactive_message(
+            recipient=RECIPIENT, body_text=WELCOME['message'], buttons=WELCOME_BUTTONS
+        )
+        return _encode_like_requests(payload)
+
+    def prepared():
+        return compiled.render(RECIPIENT).encoded
+
+    _report('WELCOME', baseline, prepared, messages, repeat)
+
+
+def _bench_details(messages, repeat):
+    compiled = CompiledTemplate.from_template(DETAILS_TEMPLATE)
+    buttons = [{"id": str(idx), "title": title} for idx, title in enumerate(DETAILS_TEMPLATE['buttons'])]
+    address_type = 'כתובת נוכחית (כולל עיר, רחוב ומספר בית)'
+
+    def baseline():
+        payload = MessagePayloadBuilder.create_interactive_message(
+            recipient=RECIPIENT,
+            body_text=DETAILS_TEMPLATE['body'].format(address_type=address_type),
+            header_text=DETAILS_TEMPLATE['header'],
+            footer_text=DETAILS_TEMPLATE['footer'],
+            buttons=buttons
+        )
+        return _encode_like_requests(payload)
+
+    def prepared():
+        return compiled.render(RECIPIENT, address_type=address_type).encoded
+
+    _report('DETAILS_BASE_TEMPLATE', baseline, prepared, messages, repeat)
+
+
+def _report(name, baseline, prepared, messages, repeat):
+    assert json.loads(baseline()) == json.loads(prepared())
+    print(name)
+    for label, fn in (('build + json.dumps', baseline), ('pre-encoded fragments', prepared)):
+        per_call = min(timeit.repeat(fn, number=messages, repeat=repeat)) / messages
+        print(f"  {label:<24} {per_call * 1e6:7.2f} us/message   body {len(fn()):5d} bytes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    _bench_welcome(args.messages, args.repeat)
+    _bench_details(args.messages, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Microbenchmark for routing incoming messages to their handlers.
+
+Measures MessageRouter.route_message per message type, from a user without
+an active conversation, i.e. the paths that answer with the welcome message,
+start a flow or report an unsupported type.
+
+Run from the project root:
+    python -m benchmarks.bench_routing [--messages N]
+"""
+import argparse
+import itertools
+import logging
+import timeit
+
+from src.business.flow_factory import BusinessFlowFactory
+from src.chat.conversation_manager import ConversationManager
+from src.chat.router import MessageRouter
+
+MESSAGES = {
+    'text': {'type': 'text', 'text': {'body': 'שלום'}},
+    'interactive (start flow)': {
+        'type': 'interactive',
+        'interactive': {'button_reply': {'title': 'מעבר דירה'}}
+    },
+    'interactive (back to main)': {
+        'type': 'interactive',
+        'interactive': {'button_reply': {'title': 'חזרה לתפריט הראשי'}}
+    },
+    'image': {'type': 'image', 'image': {'id': 'media-id', 'mime_type': 'image/jpeg'}},
+    'video': {'type': 'video', 'video': {'id': 'media-id', 'mime_type': 'video/mp4'}},
+    'unsupported': {'type': 'sticker'}
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    router = MessageRouter(ConversationManager(), BusinessFlowFactory())
+    recipients = itertools.cycle([f"9725{i:08d}" for i in range(1000)])
+
+    for name, message in MESSAGES.items():
+        def route():
+            recipient = next(recipients)
+            # Start from no conversation so every call takes the same path
+            router._conversation_manager.remove_conversation(recipient)
+            return router.route_message(message, {"to": recipient})
+
+        route()
+        per_call = min(timeit.repeat(route, number=args.messages, repeat=args.repeat)) / args.messages
+        print(f"{name:<28} {per_call * 1e6:8.2f} us/message")
+
+
+if __name__ == '__main__':
+    main()
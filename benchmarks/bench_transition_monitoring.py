@@ -0,0 +1,69 @@
+"""Microbenchmark for recording flow state transitions in the monitor.
+
+Measures BusinessFlowManager.handle_state_transition without a monitor and
+with monitors at several sample rates; the difference is the overhead of
+the instrumentation hook, including folding the recorded transitions into
+the monitor's indexes.
+
+Run from the project root:
+    python -m benchmarks.bench_transition_monitoring [--transitions N]
+"""
+import argparse
+import itertools
+import logging
+import timeit
+
+from src.business.flow_factory import BusinessFlowFactory
+from src.chat.business_flow_manager import BusinessFlowManager
+from src.chat.state_manager import StateManager
+from src.utils.state_monitor import StateTransitionMonitor
+from src.whatsapp.label_manager import LabelManager
+
+USERS = [f"9725{i:08d}" for i in range(1000)]
+# A valid round trip, so every call is a real transition
+STATES = ['awaiting_packing_choice', 'initial']
+
+
+def build_manager(monitor):
+    """Create a flow manager with a moving flow per user"""
+    state_manager = StateManager()
+    for user_id in USERS:
+        flow = BusinessFlowFactory.create_flow('moving')
+        flow.set_recipient(user_id)
+        state_manager.set_state(user_id, flow)
+    return BusinessFlowManager(state_manager, LabelManager(), monitor)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--transitions', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    configurations = [
+        ('no monitor', None),
+        ('sample_rate=1.0', StateTransitionMonitor(sample_rate=1.0)),
+        ('sample_rate=0.1', StateTransitionMonitor(sample_rate=0.1)),
+    ]
+
+    baseline = None
+    for name, monitor in configurations:
+        manager = build_manager(monitor)
+        steps = itertools.cycle(
+            (user_id, state) for state in STATES for user_id in USERS
+        )
+
+        def transition():
+            user_id, state = next(steps)
+            manager.handle_state_transition(user_id, state)
+
+        transition()
+        per_call = min(timeit.repeat(transition, number=args.transitions, repeat=args.repeat)) / args.transitions
+        if baseline is None:
+            baseline = per_call
+        print(f"{name:<18} {per_call * 1e6:8.2f} us/transition  (+{(per_call - baseline) * 1e6:.2f} us)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,8 @@
 """WhatsApp bot application package."""
+from .utils.logger import configure_logging
+
+# Module loggers propagate to the package logger, so configure it first
+configure_logging()
 
 # Make key components available at package level
 from .chat import MessageHandler, ConversationManager
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Any, Optional, Sequence
 
 from .flows.abstract_business_flow import AbstractBusinessFlow
 from .flows.moving_flow import MovingFlow
@@ -30,6 +30,25 @@ class BusinessFlowFactory:
             
         return None
         
+    @staticmethod
+    def from_snapshot(snapshot: Sequence[Any]) -> Optional[AbstractBusinessFlow]:
+        """Rebuild a business flow from a snapshot created by to_snapshot
+        
+        Args:
+            snapshot (Sequence[Any]): Flow snapshot, starting with the flow name
+            
+        Returns:
+            Optional[AbstractBusinessFlow]: Restored flow if the flow type exists, None otherwise
+        """
+        flow_type = snapshot[0]
+        
+        if flow_type == 'moving':
+            return MovingFlow.from_snapshot(snapshot)
+        elif flow_type == 'organization':
+            return OrganizationFlow.from_snapshot(snapshot)
+            
+        return None
+        
     @staticmethod
     def get_available_flows() -> list[str]:
         """Get list of available business flow types
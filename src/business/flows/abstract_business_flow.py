@@ -1,12 +1,28 @@
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Sequence, Tuple
+
+from ..state_machine import StateMachine
+
+# Compact flow representation: (flow name, state, recipient, flow data, *flow-specific fields)
+FlowSnapshot = Tuple[Any, ...]
 
 class AbstractBusinessFlow(ABC):
-    """Abstract class defining the contract for all business flows"""
+    """Abstract class defining the contract for all business flows
+    
+    Flows hold only per-conversation data in __slots__; dispatch tables,
+    templates and validators are shared at class level so an idle
+    conversation costs a few small objects.
+    """
+    
+    __slots__ = ('_conversation_state', '_flow_data', '_recipient')
+    
+    # Compiled transitions of the flow, None for flows without a definition
+    state_machine: Optional[StateMachine] = None
     
     def __init__(self):
         self._conversation_state: str = 'initial'
-        self._flow_data: Dict[str, Any] = {}
+        # Allocated lazily, most conversations never store extra data
+        self._flow_data: Optional[Dict[str, Any]] = None
         self._recipient: Optional[str] = None
         
     @property
@@ -37,6 +53,8 @@ class AbstractBusinessFlow(ABC):
         Returns:
             Dict[str, Any]: Collected flow data
         """
+        if self._flow_data is None:
+            self._flow_data = {}
         return self._flow_data
         
     def set_flow_data(self, key: str, value: Any) -> None:
@@ -46,7 +64,7 @@ class AbstractBusinessFlow(ABC):
             key (str): Data identifier
             value (Any): Value to store
         """
-        self._flow_data[key] = value
+        self.get_flow_data()[key] = value
         
     def get_flow_data_value(self, key: str) -> Optional[Any]:
         """Get specific data value from the flow
@@ -57,7 +75,7 @@ class AbstractBusinessFlow(ABC):
         Returns:
             Optional[Any]: Stored value if exists, None otherwise
         """
-        return self._flow_data.get(key)
+        return self._flow_data.get(key) if self._flow_data else None
 
     def set_recipient(self, recipient: str) -> None:
         """Set the recipient phone number for this flow
@@ -74,6 +92,52 @@ class AbstractBusinessFlow(ABC):
             Optional[str]: Recipient's phone number if set, None otherwise
         """
         return self._recipient
+
+    def to_snapshot(self) -> FlowSnapshot:
+        """Serialize the flow into a compact, JSON-compatible tuple
+
+        Returns:
+            FlowSnapshot: Flow name, state, recipient, flow data and flow-specific fields
+        """
+        return (
+            self.get_flow_name(),
+            self._conversation_state,
+            self._recipient,
+            self._flow_data or None
+        ) + self._snapshot_fields()
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Sequence[Any]) -> "AbstractBusinessFlow":
+        """Rebuild a flow from a snapshot created by to_snapshot
+
+        Args:
+            snapshot (Sequence[Any]): Snapshot tuple (or list, after a JSON round trip)
+
+        Returns:
+            AbstractBusinessFlow: The restored flow
+        """
+        flow = cls.__new__(cls)
+        flow._conversation_state = snapshot[1]
+        flow._recipient = snapshot[2]
+        flow._flow_data = dict(snapshot[3]) if snapshot[3] else None
+        flow._restore_snapshot_fields(snapshot[4:])
+        return flow
+
+    def _snapshot_fields(self) -> FlowSnapshot:
+        """Get flow-specific fields appended to the snapshot
+
+        Returns:
+            FlowSnapshot: Flow-specific field values
+        """
+        return ()
+
+    def _restore_snapshot_fields(self, fields: Sequence[Any]) -> None:
+        """Restore flow-specific fields from a snapshot
+
+        Args:
+            fields (Sequence[Any]): Values produced by _snapshot_fields
+        """
+        pass
         
     @abstractmethod
     def handle_input(self, user_input: str) -> str:
@@ -0,0 +1,26 @@
+"""State machine of the moving service flow.
+
+The single source of the moving flow's transitions: MovingFlow compiles its
+handler and template tables against it, and BusinessFlowManager validates
+every transition with it.
+"""
+from ...state_machine import StateMachine
+
+# State -> states it may move to, besides itself and the global targets
+TRANSITIONS = {
+    'initial': ('awaiting_packing_choice',),
+    'awaiting_packing_choice': ('awaiting_customer_details', 'awaiting_verification'),
+    'awaiting_customer_details': ('awaiting_verification',),
+    'awaiting_verification': ('awaiting_photos', 'awaiting_customer_details'),
+    'awaiting_photos': ('awaiting_slot_selection',),
+    'awaiting_emergency_support': ('completed', 'awaiting_slot_selection'),
+    'awaiting_slot_selection': ('completed',),
+    'awaiting_reschedule': ('completed',),
+    'completed': ('awaiting_reschedule',),
+}
+
+# Navigation buttons work in every state, and choosing a service type
+# (re)starts details collection from wherever the user is
+GLOBAL_TARGETS = ('initial', 'awaiting_emergency_support', 'awaiting_packing_choice')
+
+MOVING_STATE_MACHINE = StateMachine('moving', TRANSITIONS, GLOBAL_TARGETS)
@@ -5,10 +5,10 @@ import re
 class MovingFlowValidator:
     """Validator for moving flow inputs"""
     
-    def __init__(self):
-        self._address_pattern = re.compile(r'^[א-ת\s,0-9]+$')
-        self._min_address_length = 10
-        self._max_address_length = 200
+    # Compiled once and shared by every validator instance
+    _address_pattern = re.compile(r'^[א-ת\s,0-9]+$')
+    _min_address_length = 10
+    _max_address_length = 200
         
     def validate_customer_details(self, details: str) -> bool:
         """Validate customer address details
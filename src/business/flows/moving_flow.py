@@ -1,10 +1,9 @@
 """Moving service flow implementation."""
-from typing import Dict, Any, Optional
-import logging
+from typing import Dict, Any, Optional, Sequence
 
-from .abstract_business_flow import AbstractBusinessFlow
+from .abstract_business_flow import AbstractBusinessFlow, FlowSnapshot
 from ...whatsapp.utils.message_parser import get_button_title
-from ...models.message_payload import MessagePayloadBuilder
+from ...models.message_payload import CompiledTemplate
 from .moving.messages import (
     RESPONSES as MOVING_RESPONSES,
     TIME_SLOTS,
@@ -14,217 +13,209 @@ from .moving.messages import (
     VERIFY_DETAILS,
     PHOTOS
 )
-from src.config.responses.common import NAVIGATION, GENERAL
+from src.config.responses.common import GENERAL
 from .moving.validator import MovingFlowValidator
-
-logger = logging.getLogger(__name__)
+from .moving.states import MOVING_STATE_MACHINE
+from ..intents import (
+    INTENTS,
+    BACK_TO_MAIN,
+    TALK_TO_REPRESENTATIVE,
+    SELECT_MOVING_SERVICE,
+    CONFIRM_DETAILS,
+    CORRECT_DETAILS,
+    SKIP_PHOTOS,
+    URGENT_SUPPORT,
+    SELECT_SLOT,
+    RESCHEDULE
+)
+from ...utils.logger import get_trace_logger, setup_logger
+
+logger = setup_logger(__name__)
+tracer = get_trace_logger(__name__)
+
+# Templates are compiled once; replies only fill in the recipient and placeholders
+_STATE_TEMPLATES = {
+    'initial': CompiledTemplate.from_template(MOVING_RESPONSES['initial']),
+    'awaiting_customer_details': CompiledTemplate.from_template(VERIFY_DETAILS),
+    'awaiting_verification': CompiledTemplate.from_template(VERIFY_DETAILS),
+    'awaiting_photos': CompiledTemplate.from_template(PHOTOS),
+    'awaiting_emergency_support': CompiledTemplate.from_template(EMERGENCY_SUPPORT),
+    'awaiting_slot_selection': CompiledTemplate.from_template(TIME_SLOTS),
+    'awaiting_reschedule': CompiledTemplate.from_template(TIME_SLOTS),
+    'completed': CompiledTemplate.from_template(SELECTED_SLOT)
+}
+_DETAILS_TEMPLATES = {
+    service_type: CompiledTemplate.from_template(template)
+    for service_type, template in DETAILS_COLLECTION.items()
+}
+_ERROR_TEMPLATE = CompiledTemplate(body_text=GENERAL['error'])
+
+# Per-state templates indexed by state code; details collection depends on the service type
+_STATE_CODES = MOVING_STATE_MACHINE.codes
+_TEMPLATE_TABLE = MOVING_STATE_MACHINE.table(_STATE_TEMPLATES, complete=False)
+_PACKING_CHOICE = MOVING_STATE_MACHINE.code('awaiting_packing_choice')
+
+# Intents handled in every state, with the state they lead to
+_GLOBAL_INTENT_STATES = {
+    BACK_TO_MAIN: 'initial',
+    TALK_TO_REPRESENTATIVE: 'awaiting_emergency_support',
+    SELECT_MOVING_SERVICE: 'awaiting_packing_choice',
+}
 
 class MovingFlow(AbstractBusinessFlow):
     """Handles the moving service business flow"""
     
+    __slots__ = ('_service_type', '_selected_time_slot', '_customer_details')
+    
+    # Stateless, so one validator serves every conversation
+    _validator = MovingFlowValidator()
+    
+    state_machine = MOVING_STATE_MACHINE
+    
     def __init__(self):
         super().__init__()
-        self._states = {
-            'initial': self._handle_initial_state,
-            'awaiting_packing_choice': self._handle_packing_choice,
-            'awaiting_customer_details': self._handle_customer_details,
-            'awaiting_verification': self._handle_verification,
-            'awaiting_photos': self._handle_photos,
-            'awaiting_emergency_support': self._handle_emergency_support,
-            'awaiting_slot_selection': self._handle_slot_selection,
-            'awaiting_reschedule': self._handle_reschedule,
-            'completed': self._handle_completed_state
-        }
         self._service_type: Optional[str] = None
         self._selected_time_slot: Optional[str] = None
         self._customer_details: Optional[str] = None
-        self._validator = MovingFlowValidator()
 
     def get_flow_name(self) -> str:
         """Get the name of this business flow"""
         return 'moving'
 
+    def _snapshot_fields(self) -> FlowSnapshot:
+        """Get service type, selected slot and customer details for the snapshot"""
+        return (self._service_type, self._selected_time_slot, self._customer_details)
+
+    def _restore_snapshot_fields(self, fields: Sequence[Any]) -> None:
+        """Restore service type, selected slot and customer details from a snapshot"""
+        self._service_type, self._selected_time_slot, self._customer_details = fields
+
     def handle_input(self, user_input: str) -> str:
         """Handle user input based on current state"""
         try:
-            # Global navigation commands take absolute precedence
-            if user_input == NAVIGATION['back_to_main']:
-                self.set_conversation_state('initial')
-                return 'initial'
-            
-            if user_input == NAVIGATION['talk_to_representative']:
-                self.set_conversation_state('awaiting_emergency_support')
-                return 'awaiting_emergency_support'
-                
-            # Service type selection
-            if user_input in ['אריזת הבית', 'סידור בבית החדש', 'ליווי מלא - אריזה וסידור']:
-                service_types = {
-                    'אריזת הבית': 'packing_only',
-                    'סידור בבית החדש': 'unpacking_only',
-                    'ליווי מלא - אריזה וסידור': 'both'
-                }
-                self._service_type = service_types[user_input]
-                self.set_conversation_state('awaiting_packing_choice')
-                return 'awaiting_packing_choice'
+            intent, payload = INTENTS.classify(user_input)
             
-            # State-specific handling
-            state_handler = self._states.get(self._conversation_state)
-            if state_handler:
-                next_state = state_handler(user_input)
+            # Navigation and service type buttons take absolute precedence
+            next_state = _GLOBAL_INTENT_STATES.get(intent)
+            if next_state is not None:
+                if intent == SELECT_MOVING_SERVICE:
+                    self._service_type = payload
                 self.set_conversation_state(next_state)
                 return next_state
             
-            self.set_conversation_state('initial')
-            return 'initial'
+            # State-specific handling
+            code = _STATE_CODES.get(self._conversation_state)
+            next_state = 'initial' if code is None else self._HANDLER_TABLE[code](self, user_input, intent, payload)
+            self.set_conversation_state(next_state)
+            return next_state
         except Exception as e:
-            logger.error(f"Error handling input: {str(e)}")
+            logger.error("Error handling input: %s", e)
             self.set_conversation_state('initial')
             return 'initial'
 
-    def _handle_initial_state(self, user_input: str) -> str:
+    def _handle_initial_state(self, user_input: str, intent: Optional[str], payload: Any) -> str:
         """Handle initial state input"""
         # Initial state only handles invalid inputs now
         # Service type selection is handled in handle_input
         return 'initial'
 
-    def _handle_packing_choice(self, user_input: str) -> str:
+    def _handle_packing_choice(self, user_input: str, intent: Optional[str], payload: Any) -> str:
         """Handle packing service details collection"""
         if self._validator.validate_customer_details(user_input):
             self._customer_details = user_input
             return 'awaiting_verification'
         return 'awaiting_packing_choice'
 
-    def _handle_customer_details(self, user_input: str) -> str:
+    def _handle_customer_details(self, user_input: str, intent: Optional[str], payload: Any) -> str:
         """Handle customer details verification"""
         if self._validator.validate_customer_details(user_input):
             self._customer_details = user_input
             return 'awaiting_verification'
         return 'awaiting_customer_details'
 
-    def _handle_verification(self, user_input: str) -> str:
+    def _handle_verification(self, user_input: str, intent: Optional[str], payload: Any) -> str:
         """Handle details verification"""
-        if user_input == 'כן, הפרטים נכונים':
+        if intent == CONFIRM_DETAILS:
             return 'awaiting_photos'
-        elif user_input == 'לא, צריך לתקן':
+        elif intent == CORRECT_DETAILS:
             return 'awaiting_customer_details'
         return 'awaiting_verification'
 
-    def _handle_photos(self, user_input: str) -> str:
+    def _handle_photos(self, user_input: str, intent: Optional[str], payload: Any) -> str:
         """Handle photo submission"""
         if isinstance(user_input, dict):  # Handle photo data
             if self._validator.validate_photo(user_input):
                 return 'awaiting_slot_selection'
-        elif user_input == 'דלג':
+        elif intent == SKIP_PHOTOS:
             return 'awaiting_slot_selection'
         return 'awaiting_photos'
 
-    def _handle_emergency_support(self, user_input: str) -> str:
+    def _handle_emergency_support(self, user_input: str, intent: Optional[str], payload: Any) -> str:
         """Handle emergency support request"""
-        if user_input == 'כן':
+        if intent == URGENT_SUPPORT and payload:
             return 'completed'  # Will trigger urgent support label
         return 'awaiting_slot_selection'
 
-    def _handle_slot_selection(self, user_input: str) -> str:
+    def _handle_slot_selection(self, user_input: str, intent: Optional[str], payload: Any) -> str:
         """Handle time slot selection"""
-        if user_input in TIME_SLOTS['buttons']:
-            self._selected_time_slot = user_input
+        if intent == SELECT_SLOT:
+            self._selected_time_slot = payload
             return 'completed'
         return 'awaiting_slot_selection'
 
-    def _handle_reschedule(self, user_input: str) -> str:
+    def _handle_reschedule(self, user_input: str, intent: Optional[str], payload: Any) -> str:
         """Handle reschedule request"""
-        if user_input in TIME_SLOTS['buttons']:
-            self._selected_time_slot = user_input
+        if intent == SELECT_SLOT:
+            self._selected_time_slot = payload
             return 'completed'
         return 'awaiting_reschedule'
 
-    def _handle_completed_state(self, user_input: str) -> str:
+    def _handle_completed_state(self, user_input: str, intent: Optional[str], payload: Any) -> str:
         """Handle completed state"""
-        if user_input == 'לקבוע זמן אחר':
+        if intent == RESCHEDULE:
             return 'awaiting_reschedule'
         return 'completed'
 
+    # State dispatch table shared by all instances, handlers are called unbound
+    _STATE_HANDLERS = {
+        'initial': _handle_initial_state,
+        'awaiting_packing_choice': _handle_packing_choice,
+        'awaiting_customer_details': _handle_customer_details,
+        'awaiting_verification': _handle_verification,
+        'awaiting_photos': _handle_photos,
+        'awaiting_emergency_support': _handle_emergency_support,
+        'awaiting_slot_selection': _handle_slot_selection,
+        'awaiting_reschedule': _handle_reschedule,
+        'completed': _handle_completed_state
+    }
+    # The same handlers indexed by state code; compiling fails if a state has none
+    _HANDLER_TABLE = MOVING_STATE_MACHINE.table(_STATE_HANDLERS)
+
     def get_next_message(self) -> str:
         """Get next message based on current state"""
         try:
-            print("\n=== MovingFlow.get_next_message() ===")
-            print(f"Current state: {self._conversation_state}")
-            print(f"Service type: {self._service_type}")
-            print(f"Recipient: {self._recipient}")
+            tracer.trace(self._recipient, "Next moving message for state %s (service type %s)",
+                         self._conversation_state, self._service_type)
 
             if not self._recipient:
                 logger.error("Recipient not set for message creation")
-                return MessagePayloadBuilder.create_interactive_message(
-                    recipient=self._recipient,
-                    body_text=GENERAL['error']
-                )
-
-            def create_message_from_template(template, **kwargs):
-                print("\n=== create_message_from_template() ===")
-                print(f"Template: {template}")
-                print(f"Additional kwargs: {kwargs}")
-                # Format buttons as WhatsApp quick_reply buttons
-                buttons = [
-                    {
-                        "type": "quick_reply",
-                        "id": str(idx),  # WhatsApp requires unique IDs
-                        "title": btn
-                    } 
-                    for idx, btn in enumerate(template.get('buttons', []))
-                ] if 'buttons' in template else None
-
-                message = MessagePayloadBuilder.create_interactive_message(
-                    recipient=self._recipient,
-                    body_text=template.get('body', ''),
-                    header_text=template.get('header', ''),
-                    footer_text=template.get('footer', ''),
-                    buttons=buttons,
-                    **kwargs
-                )
-                print(f"Created message payload: {message}")
-                return message
-
-            if self._conversation_state == 'initial':
-                print("\nCreating initial moving flow message")
-                msg = create_message_from_template(MOVING_RESPONSES['initial'])
-                print(f"Initial message payload: {msg}")
-                return msg
-                
-            elif self._conversation_state == 'awaiting_packing_choice':
-                return create_message_from_template(DETAILS_COLLECTION[self._service_type])
-                
-            elif self._conversation_state == 'awaiting_customer_details':
-                return create_message_from_template(VERIFY_DETAILS)
-                
-            elif self._conversation_state == 'awaiting_verification':
-                return create_message_from_template(
-                    VERIFY_DETAILS,
-                    body_text=VERIFY_DETAILS['body'].format(details=self._customer_details)
-                )
-                
-            elif self._conversation_state == 'awaiting_photos':
-                return create_message_from_template(PHOTOS)
-                
-            elif self._conversation_state == 'awaiting_emergency_support':
-                return create_message_from_template(EMERGENCY_SUPPORT)
-                
-            elif self._conversation_state == 'awaiting_slot_selection':
-                return create_message_from_template(TIME_SLOTS)
-                
-            elif self._conversation_state == 'awaiting_reschedule':
-                return create_message_from_template(TIME_SLOTS)
-                
-            elif self._conversation_state == 'completed':
-                return create_message_from_template(
-                    SELECTED_SLOT,
-                    body_text=SELECTED_SLOT['body'].format(slot=self._selected_time_slot)
-                )
-
-            logger.error(f"Invalid state for message: {self._conversation_state}")
-            error_template = {'body': GENERAL['error']}
-            return create_message_from_template(error_template)
+                return _ERROR_TEMPLATE.render(self._recipient)
+
+            code = _STATE_CODES.get(self._conversation_state)
+            if code == _PACKING_CHOICE:
+                return _DETAILS_TEMPLATES[self._service_type].render(self._recipient)
+
+            template = None if code is None else _TEMPLATE_TABLE[code]
+            if template is None:
+                logger.error("Invalid state for message: %s", self._conversation_state)
+                return _ERROR_TEMPLATE.render(self._recipient)
+
+            return template.render(
+                self._recipient,
+                details=self._customer_details,
+                slot=self._selected_time_slot
+            )
 
         except Exception as e:
-            logger.error(f"Error getting next message: {str(e)}")
-            error_template = {'body': GENERAL['error']}
-            return create_message_from_template(error_template)
\ No newline at end of file
+            logger.error("Error getting next message: %s", e)
+            return _ERROR_TEMPLATE.render(self._recipient)
@@ -1,6 +1,6 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Sequence
 
-from .abstract_business_flow import AbstractBusinessFlow
+from .abstract_business_flow import AbstractBusinessFlow, FlowSnapshot
 from ...whatsapp.utils.message_parser import get_button_title
 from ...models.message_payload import MessagePayloadBuilder
 from ...config.responses import SERVICE_RESPONSES, GENERAL
@@ -9,13 +9,25 @@ from ...config.responses.common import NAVIGATION
 class OrganizationFlow(AbstractBusinessFlow):
     """Handles the organization service business flow"""
     
+    __slots__ = ('_customer_details',)
+    
+    # Shared by all instances; handlers are resolved by name as they are implemented
+    _STATE_HANDLERS = {
+        'initial': '_handle_initial_state',
+        'awaiting_customer_details': '_handle_customer_details',
+        'awaiting_verification': '_handle_verification',
+        'completed': '_handle_completed_state'
+    }
+    _responses = SERVICE_RESPONSES['organization']
+    
     def __init__(self):
         super().__init__()
-        self._states = {
-            'initial': self._handle_initial_state,
-            'awaiting_customer_details': self._handle_customer_details,
-            'awaiting_verification': self._handle_verification,
-            'completed': self._handle_completed_state
-        }
-        self._responses = SERVICE_RESPONSES['organization']
-        self._customer_details: Optional[str] = None
\ No newline at end of file
+        self._customer_details: Optional[str] = None
+
+    def _snapshot_fields(self) -> FlowSnapshot:
+        """Get customer details for the snapshot"""
+        return (self._customer_details,)
+
+    def _restore_snapshot_fields(self, fields: Sequence[Any]) -> None:
+        """Restore customer details from a snapshot"""
+        self._customer_details, = fields
\ No newline at end of file
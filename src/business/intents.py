@@ -0,0 +1,150 @@
+"""Classification of inbound text and button titles into intents.
+
+Every button title the bot sends is indexed once at import, so handlers and
+flows classify an input with a single hash lookup instead of comparing it
+against each title. Titles are also indexed in a normalized form, so input
+that differs only in Unicode normalization, direction marks, case or
+whitespace still matches.
+"""
+import unicodedata
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from ..config.responses.common import NAVIGATION, WELCOME
+from ..config.responses.organization import INITIAL as ORGANIZATION_INITIAL
+from ..config.responses.organization import VERIFY_DETAILS as ORGANIZATION_VERIFY_DETAILS
+from .messages import DEFAULT_TIME_SLOTS, MEDIA_REQUEST_TEMPLATE
+from .flows.moving.messages import (
+    INITIAL as MOVING_INITIAL,
+    VERIFY_DETAILS as MOVING_VERIFY_DETAILS,
+    EMERGENCY_SUPPORT,
+    TIME_SLOTS,
+    SELECTED_SLOT
+)
+
+# Intents; the payload each one carries is noted alongside
+BACK_TO_MAIN = 'back_to_main'
+TALK_TO_REPRESENTATIVE = 'talk_to_representative'
+START_FLOW = 'start_flow'                        # Flow type
+SELECT_MOVING_SERVICE = 'select_moving_service'  # Moving service type
+SELECT_ORGANIZATION_SERVICE = 'select_organization_service'  # Button title
+CONFIRM_DETAILS = 'confirm_details'
+CORRECT_DETAILS = 'correct_details'
+SKIP_PHOTOS = 'skip_photos'
+URGENT_SUPPORT = 'urgent_support'                # True if urgent
+SELECT_SLOT = 'select_slot'                      # Slot title as sent
+RESCHEDULE = 'reschedule'
+
+Intent = Tuple[Optional[str], Any]
+
+# Result for input that is not a known title
+NO_INTENT: Intent = (None, None)
+
+# Direction marks and zero-width characters some clients add around RTL text
+_INVISIBLE = dict.fromkeys(
+    [0x200B, 0x200C, 0x200D, 0x200E, 0x200F, 0xFEFF, *range(0x202A, 0x202F), *range(0x2066, 0x206A)]
+)
+
+def normalize_title(text: str) -> str:
+    """Normalize a title for matching
+
+    Applies NFKC, drops direction marks and zero-width characters,
+    collapses whitespace runs to single spaces and folds case.
+
+    Args:
+        text (str): Raw title or input text
+
+    Returns:
+        str: Normalized text
+    """
+    return ' '.join(unicodedata.normalize('NFKC', text).translate(_INVISIBLE).split()).casefold()
+
+
+class IntentIndex:
+    """Hash index from titles to (intent, payload)"""
+
+    def __init__(self):
+        # Exact titles hit without normalizing; anything else is normalized first
+        self._exact: Dict[str, Intent] = {}
+        self._normalized: Dict[str, Intent] = {}
+
+    def add(self, title: str, intent: str, payload: Any = None) -> None:
+        """
+        Index a title.
+
+        Args:
+            title (str): Title as sent on a button
+            intent (str): Intent of the title
+            payload (Any): Data the intent carries
+
+        Raises:
+            ValueError: If the normalized title already has another intent
+        """
+        key = normalize_title(title)
+        existing = self._normalized.get(key)
+        if existing is not None and existing != (intent, payload):
+            raise ValueError(f"Title {title!r} is already indexed as {existing}, not {(intent, payload)}")
+        self._exact[title] = self._normalized[key] = (intent, payload)
+
+    def classify(self, text: Any) -> Intent:
+        """
+        Get the intent of an input.
+
+        Args:
+            text (Any): Input text; anything else, e.g. media data, has no intent
+
+        Returns:
+            Intent: Intent and payload, NO_INTENT if the input is not a known title
+        """
+        if not isinstance(text, str):
+            return NO_INTENT
+        intent = self._exact.get(text)
+        if intent is None:
+            intent = self._normalized.get(normalize_title(text), NO_INTENT)
+        return intent
+
+    def __contains__(self, title: str) -> bool:
+        return self.classify(title) is not NO_INTENT
+
+
+def _button_titles() -> Iterable[str]:
+    """Get every button title of the configured responses"""
+    yield from (WELCOME['moving_button'], WELCOME['organization_button'], WELCOME['other_button'])
+    for message in (MOVING_INITIAL, EMERGENCY_SUPPORT, TIME_SLOTS, SELECTED_SLOT,
+                    MEDIA_REQUEST_TEMPLATE, ORGANIZATION_INITIAL):
+        yield from message['buttons']
+    for message in (MOVING_VERIFY_DETAILS, ORGANIZATION_VERIFY_DETAILS):
+        yield from message['options']['buttons']
+
+
+def _build_index() -> IntentIndex:
+    """Index every button title, failing if one has no intent"""
+    index = IntentIndex()
+    index.add(NAVIGATION['back_to_main'], BACK_TO_MAIN)
+    index.add(NAVIGATION['talk_to_representative'], TALK_TO_REPRESENTATIVE)
+    index.add(WELCOME['moving_button'], START_FLOW, 'moving')
+    index.add(WELCOME['organization_button'], START_FLOW, 'organization')
+    index.add(WELCOME['other_button'], START_FLOW, 'support')
+    index.add('אריזת הבית', SELECT_MOVING_SERVICE, 'packing_only')
+    index.add('סידור בבית החדש', SELECT_MOVING_SERVICE, 'unpacking_only')
+    index.add('ליווי מלא - אריזה וסידור', SELECT_MOVING_SERVICE, 'both')
+    for title in ORGANIZATION_INITIAL['buttons'][:3]:
+        index.add(title, SELECT_ORGANIZATION_SERVICE, title)
+    index.add('כן, הפרטים נכונים', CONFIRM_DETAILS)
+    index.add('לא, צריך לתקן', CORRECT_DETAILS)
+    # The photo request button, and the short form users type
+    index.add(MEDIA_REQUEST_TEMPLATE['buttons'][0], SKIP_PHOTOS)
+    index.add('דלג', SKIP_PHOTOS)
+    index.add('כן', URGENT_SUPPORT, True)
+    index.add('לא', URGENT_SUPPORT, False)
+    for title in DEFAULT_TIME_SLOTS.values():
+        index.add(title, SELECT_SLOT, title)
+    index.add('לקבוע זמן אחר', RESCHEDULE)
+
+    missing = [title for title in _button_titles() if title not in index]
+    if missing:
+        raise ValueError(f"Button titles without an intent: {missing}")
+    return index
+
+
+# Shared index of every button title the bot sends
+INTENTS = _build_index()
@@ -0,0 +1,121 @@
+"""Declarative flow state machines compiled into integer-coded tables."""
+from typing import Dict, FrozenSet, Iterable, Mapping, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+
+class StateMachine:
+    """Compiled transition table of a business flow
+
+    A flow is declared once as a mapping of each state to the states it may
+    move to. Compiling assigns every state an integer code in declaration
+    order and turns the transitions into one bitmap row per state, so
+    checking a transition is two dict lookups and a bit test. Per-state
+    handlers and templates are compiled with table() into tuples indexed
+    by the same codes; table() rejects unknown or missing states, so the
+    flow code and the transition table cannot drift apart unnoticed.
+    """
+
+    __slots__ = ('name', 'states', 'codes', 'initial', '_rows')
+
+    def __init__(self, name: str, transitions: Mapping[str, Iterable[str]],
+                 global_targets: Iterable[str] = (), initial: str = 'initial',
+                 allow_self: bool = True):
+        """Compile a flow definition
+
+        Args:
+            name (str): Flow name, used in error messages
+            transitions (Mapping[str, Iterable[str]]): Every state with the states it may move to
+            global_targets (Iterable[str]): States reachable from every state
+            initial (str): State new conversations start in
+            allow_self (bool): Whether every state may stay in itself, e.g. to prompt again
+
+        Raises:
+            ValueError: If a target or the initial state is not declared
+        """
+        self.name = name
+        self.states: Tuple[str, ...] = tuple(transitions)
+        self.codes: Dict[str, int] = {state: code for code, state in enumerate(self.states)}
+        if initial not in self.codes:
+            raise ValueError(f"Initial state {initial!r} of flow {name!r} is not declared")
+        self.initial = initial
+
+        global_mask = self._mask(global_targets, 'global targets')
+        self._rows: Tuple[int, ...] = tuple(
+            self._mask(targets, f'targets of {state!r}') | global_mask | ((1 << code) if allow_self else 0)
+            for code, (state, targets) in enumerate(transitions.items())
+        )
+
+    def _mask(self, states: Iterable[str], what: str) -> int:
+        """Get the bitmap of a set of declared states"""
+        mask = 0
+        for state in states:
+            code = self.codes.get(state)
+            if code is None:
+                raise ValueError(f"Unknown state {state!r} in {what} of flow {self.name!r}")
+            mask |= 1 << code
+        return mask
+
+    def code(self, state: str) -> Optional[int]:
+        """Get the integer code of a state
+
+        Args:
+            state (str): State name
+
+        Returns:
+            Optional[int]: Code of the state, None if it is not declared
+        """
+        return self.codes.get(state)
+
+    def can_transition(self, from_state: str, to_state: str) -> bool:
+        """Check whether the flow may move between two states
+
+        Args:
+            from_state (str): Current state
+            to_state (str): Target state
+
+        Returns:
+            bool: True if both states are declared and the transition is allowed
+        """
+        from_code = self.codes.get(from_state)
+        to_code = self.codes.get(to_state)
+        if from_code is None or to_code is None:
+            return False
+        return bool(self._rows[from_code] >> to_code & 1)
+
+    def targets(self, state: str) -> FrozenSet[str]:
+        """Get the states a state may move to
+
+        Args:
+            state (str): State name
+
+        Returns:
+            FrozenSet[str]: Allowed target states, empty if the state is not declared
+        """
+        code = self.codes.get(state)
+        if code is None:
+            return frozenset()
+        row = self._rows[code]
+        return frozenset(target for target_code, target in enumerate(self.states) if row >> target_code & 1)
+
+    def table(self, entries: Mapping[str, T], default: Optional[T] = None,
+              complete: bool = True) -> Tuple[Optional[T], ...]:
+        """Compile per-state values into a tuple indexed by state code
+
+        Args:
+            entries (Mapping[str, T]): Value per state name
+            default (Optional[T]): Value of states without an entry
+            complete (bool): Whether every declared state needs an entry
+
+        Returns:
+            Tuple[Optional[T], ...]: Value per state code
+
+        Raises:
+            ValueError: If an entry names an unknown state, or one is missing while complete
+        """
+        unknown = set(entries) - set(self.codes)
+        if unknown:
+            raise ValueError(f"Unknown states {sorted(unknown)} in table of flow {self.name!r}")
+        missing = [state for state in self.states if state not in entries]
+        if complete and missing:
+            raise ValueError(f"States {missing} have no entry in table of flow {self.name!r}")
+        return tuple(entries.get(state, default) for state in self.states)
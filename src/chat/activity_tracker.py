@@ -0,0 +1,78 @@
+"""Compact storage for per-user conversation deadlines."""
+import sys
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class ActivityTracker:
+    """Array-backed map from user ID to a monotonic deadline
+
+    Deadlines are stored as raw doubles in a single array('d') and looked
+    up through a slot index keyed by interned user IDs, so updating a
+    deadline allocates nothing beyond the float it is given. Slots of
+    removed users are reused.
+    """
+
+    __slots__ = ('_slots', '_deadlines', '_free')
+
+    def __init__(self):
+        """Initialize an empty tracker"""
+        self._slots: Dict[str, int] = {}
+        self._deadlines = array('d')
+        self._free: List[int] = []
+
+    def get(self, user_id: str) -> Optional[float]:
+        """Get the deadline of a user
+
+        Args:
+            user_id (str): Unique identifier for the user
+
+        Returns:
+            Optional[float]: The deadline if the user is tracked, None otherwise
+        """
+        slot = self._slots.get(user_id)
+        return None if slot is None else self._deadlines[slot]
+
+    def set(self, user_id: str, deadline: float) -> None:
+        """Set the deadline of a user
+
+        Args:
+            user_id (str): Unique identifier for the user
+            deadline (float): Monotonic time after which the user is inactive
+        """
+        slot = self._slots.get(user_id)
+        if slot is not None:
+            self._deadlines[slot] = deadline
+        elif self._free:
+            slot = self._free.pop()
+            self._slots[sys.intern(user_id)] = slot
+            self._deadlines[slot] = deadline
+        else:
+            self._slots[sys.intern(user_id)] = len(self._deadlines)
+            self._deadlines.append(deadline)
+
+    def remove(self, user_id: str) -> None:
+        """Stop tracking a user
+
+        Args:
+            user_id (str): Unique identifier for the user
+        """
+        slot = self._slots.pop(user_id, None)
+        if slot is not None:
+            self._free.append(slot)
+
+    def items(self) -> Iterator[Tuple[str, float]]:
+        """Iterate over tracked users and their deadlines
+
+        Returns:
+            Iterator[Tuple[str, float]]: Pairs of user ID and deadline
+        """
+        deadlines = self._deadlines
+        for user_id, slot in list(self._slots.items()):
+            yield user_id, deadlines[slot]
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._slots
+
+    def __len__(self) -> int:
+        return len(self._slots)
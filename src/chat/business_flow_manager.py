@@ -1,11 +1,12 @@
 """Business flow management module."""
-from typing import Optional, Dict, Set
+from typing import Optional
 import logging
 from .state_manager import StateManager
 from ..whatsapp.label_manager import LabelManager
 from ..business.flows.abstract_business_flow import AbstractBusinessFlow
 from ..business.messages import NAVIGATION
 from ..config.whatsapp import LABELS
+from ..utils.state_monitor import StateTransitionMonitor
 
 logger = logging.getLogger(__name__)
 
@@ -16,76 +17,56 @@ class InvalidStateTransitionError(Exception):
 class BusinessFlowManager:
     """Responsible for coordinating business flows with state and label management"""
     
-    def __init__(self, state_manager: StateManager, label_manager: LabelManager):
+    def __init__(self, state_manager: StateManager, label_manager: LabelManager,
+                 monitor: Optional[StateTransitionMonitor] = None):
         """Initialize business flow manager
         
         Args:
             state_manager (StateManager): Manager for business flow states
             label_manager (LabelManager): Manager for WhatsApp labels
+            monitor (Optional[StateTransitionMonitor]): Receives every state transition, None to disable
         """
         self._state_manager = state_manager
         self._label_manager = label_manager
-        self._valid_transitions = self._initialize_valid_transitions()
+        self._record_transition = monitor.record_transition if monitor is not None else None
         
-    def _initialize_valid_transitions(self) -> Dict[str, Set[str]]:
-        """Initialize valid state transitions
-        
-        Returns:
-            Dict[str, Set[str]]: Mapping of valid transitions
-        """
-        return {
-            'initial': {'awaiting_packing_choice', 'awaiting_emergency_support'},
-            'awaiting_packing_choice': {'awaiting_customer_details', 'initial', 'awaiting_emergency_support'},
-            'awaiting_customer_details': {'awaiting_verification', 'initial', 'awaiting_emergency_support'},
-            'awaiting_verification': {'awaiting_photos', 'awaiting_customer_details', 'initial', 'awaiting_emergency_support'},
-            'awaiting_photos': {'awaiting_slot_selection', 'initial', 'awaiting_emergency_support'},
-            'awaiting_emergency_support': {'completed', 'awaiting_slot_selection'},
-            'awaiting_slot_selection': {'completed', 'initial', 'awaiting_emergency_support'},
-            'awaiting_reschedule': {'completed', 'initial', 'awaiting_emergency_support'},
-            'completed': {'awaiting_reschedule', 'initial', 'awaiting_emergency_support'}
-        }
-        
-    def _is_valid_state_transition(self, from_state: str, to_state: str) -> bool:
+    def _is_valid_state_transition(self, flow: AbstractBusinessFlow, from_state: str, to_state: str) -> bool:
         """Check if state transition is valid
         
         Args:
+            flow (AbstractBusinessFlow): Flow whose state machine defines the valid transitions
             from_state (str): Current state
             to_state (str): Target state
             
         Returns:
-            bool: True if transition is valid
+            bool: True if transition is valid, or the flow declares no state machine
         """
-        # Allow transition to initial state from any state
-        if to_state == 'initial':
-            return True
-            
-        # Allow transition to emergency support from any state
-        if to_state == 'awaiting_emergency_support':
-            return True
-            
-        # Check if transition is in valid transitions map
-        valid_transitions = self._valid_transitions.get(from_state, set())
-        return to_state in valid_transitions
+        machine = flow.state_machine
+        return machine is None or machine.can_transition(from_state, to_state)
         
-    def handle_state_transition(self, user_id: str, new_state: str) -> None:
+    def handle_state_transition(self, user_id: str, new_state: str, from_state: Optional[str] = None) -> None:
         """Handle business flow state transition and apply appropriate labels
         
         Args:
             user_id (str): Unique identifier for the user
             new_state (str): New state to transition to
+            from_state (Optional[str]): State before the input was handled, if the flow
+                already moved itself; None for the flow's current state
             
         Raises:
             InvalidStateTransitionError: If transition is invalid
         """
         flow = self._state_manager.get_state(user_id)
         if not flow:
-            logger.error(f"No active flow for user {user_id}")
+            logger.error("No active flow for user %s", user_id)
             return
             
-        current_state = flow.state
+        current_state = flow.state if from_state is None else from_state
         
         # Validate transition
-        if not self._is_valid_state_transition(current_state, new_state):
+        if not self._is_valid_state_transition(flow, current_state, new_state):
+            # Undo the move a flow may already have made while handling the input
+            flow.set_conversation_state(current_state)
             error_msg = f"Invalid state transition from {current_state} to {new_state}"
             logger.error(error_msg)
             raise InvalidStateTransitionError(error_msg)
@@ -94,7 +75,10 @@ class BusinessFlowManager:
         flow.set_conversation_state(new_state)
         
         # Log transition
-        logger.info(f"State transition for user {user_id}: {current_state} -> {new_state}")
+        logger.info("State transition for user %s: %s -> %s", user_id, current_state, new_state)
+        flow_name = flow.get_flow_name().lower()
+        if self._record_transition is not None:
+            self._record_transition(user_id, current_state, new_state, flow_name)
         
         try:
             # Handle global state transitions
@@ -111,12 +95,11 @@ class BusinessFlowManager:
                 self._label_manager.apply_label(user_id, 'waiting_call_before_quote')
                 
             # Apply flow-specific labels
-            flow_name = flow.get_flow_name().lower()
             if flow_name in ['moving', 'organization'] and new_state != 'initial':
                 self._label_manager.apply_label(user_id, flow_name)
                 
         except Exception as e:
-            logger.error(f"Error managing labels for user {user_id}: {str(e)}")
+            logger.error("Error managing labels for user %s: %s", user_id, e)
             raise
             
     def handle_support_request(self, user_id: str) -> None:
@@ -133,9 +116,14 @@ class BusinessFlowManager:
             # Update flow state if exists
             flow = self._state_manager.get_state(user_id)
             if flow:
+                if self._record_transition is not None:
+                    self._record_transition(
+                        user_id, flow.state, 'awaiting_emergency_support', flow.get_flow_name().lower()
+                    )
                 flow.set_conversation_state('awaiting_emergency_support')
-                logger.info(f"User {user_id} requested emergency support")
+                self._state_manager.save_state(user_id)
+                logger.info("User %s requested emergency support", user_id)
                 
         except Exception as e:
-            logger.error(f"Error handling support request for user {user_id}: {str(e)}")
+            logger.error("Error handling support request for user %s: %s", user_id, e)
             raise
\ No newline at end of file
@@ -1,22 +1,52 @@
-from typing import Optional, Dict, Any, List
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple, Union
 
 from ..business.flows.abstract_business_flow import AbstractBusinessFlow as BusinessFlow
 from ..business.flow_factory import BusinessFlowFactory
 from .state_manager import StateManager
+from .conversation_store import ConversationStore
 from ..whatsapp.label_manager import LabelManager
-from .timeout_manager import TimeoutManager
+from ..whatsapp.label_queue import LabelWriteBehindQueue
+from ..whatsapp.label_sync import LabelSyncEngine
+from ..whatsapp.config import BOT_LABELS
+from .timeout_manager import TimeoutManager, ExpirySweeper
 from .business_flow_manager import BusinessFlowManager
 from ..models.message_payload import MessagePayloadBuilder
 from ..config.responses.common import WELCOME
+from ..utils.state_monitor import StateTransitionMonitor
 
 class ConversationManager:
     """Main coordinator for all conversation-related operations"""
     
-    def __init__(self, timeout_minutes: int = 300):
-        self._state_manager = StateManager()
-        self._label_manager = LabelManager()
+    def __init__(self, timeout_minutes: int = 300, store: Optional[ConversationStore] = None,
+                 monitor: Optional[StateTransitionMonitor] = None,
+                 label_sync: Optional[Union[LabelSyncEngine, LabelWriteBehindQueue]] = None):
+        """Initialize the conversation manager
+        
+        Args:
+            timeout_minutes (int): Minutes of inactivity before a conversation expires
+            store (Optional[ConversationStore]): Persistent conversation backend, None for memory only
+            monitor (Optional[StateTransitionMonitor]): Receives state transitions, None to disable
+            label_sync (Optional[Union[LabelSyncEngine, LabelWriteBehindQueue]]): Pushes or queues
+                chat labels for WhatsApp, None to keep them local
+        """
+        self._state_manager = StateManager(store)
+        self._label_manager = LabelManager(label_sync)
         self._timeout_manager = TimeoutManager(timeout_minutes)
-        self._business_flow_manager = BusinessFlowManager(self._state_manager, self._label_manager)
+        self._monitor = monitor
+        self._business_flow_manager = BusinessFlowManager(self._state_manager, self._label_manager, monitor)
+        self._sweeper: Optional[ExpirySweeper] = None
+        self._restore_persisted_activity()
+        
+    def _restore_persisted_activity(self) -> None:
+        """Resume timeout tracking for conversations persisted by a previous run
+
+        The store is read once at startup; like the state cache, timeouts are
+        tracked by this process alone.
+        """
+        for user_id, updated_at in self._state_manager.iter_persisted_activity():
+            self._timeout_manager.restore_activity(user_id, datetime.fromtimestamp(updated_at))
+        self.cleanup_stale_conversations()
         
     def start_conversation(self, user_id: str, flow_type: str) -> None:
         """Start a new conversation with a specific business flow
@@ -29,10 +59,13 @@ class ConversationManager:
         if flow:
             # Set the recipient for the flow
             flow.set_recipient(user_id)
-            self._label_manager.remove_all_labels(user_id)
-            self._state_manager.set_state(user_id, flow)
-            self._timeout_manager.update_activity(user_id)
-            self._label_manager.apply_label(user_id, 'bot_new_conversation')
+            # The sweeper sees the new flow only together with its activity
+            with self._state_manager.lock:
+                self._label_manager.remove_all_labels(user_id)
+                self._state_manager.set_state(user_id, flow)
+                self._timeout_manager.update_activity(user_id)
+                self._label_manager.apply_label(user_id, 'bot_new_conversation')
+            self._label_manager.sync(user_id)
         
     def get_conversation(self, user_id: str) -> Optional[BusinessFlow]:
         """Retrieve the business flow for a user if active
@@ -43,8 +76,7 @@ class ConversationManager:
         Returns:
             Optional[BusinessFlow]: The business flow if active
         """
-        if self._timeout_manager.is_active(user_id):
-            self._timeout_manager.update_activity(user_id)
+        if self._timeout_manager.touch_if_active(user_id):
             return self._state_manager.get_state(user_id)
         return None
         
@@ -54,15 +86,98 @@ class ConversationManager:
         Args:
             user_id (str): Unique identifier for the user
         """
-        self._label_manager.remove_all_labels(user_id)
-        self._state_manager.remove_state(user_id)
-        self._timeout_manager.remove_activity(user_id)
+        with self._state_manager.lock:
+            self._label_manager.remove_all_labels(user_id)
+            self._state_manager.remove_state(user_id)
+            self._timeout_manager.remove_activity(user_id)
+        self._label_manager.sync(user_id)
+        
+    def expire_conversation(self, user_id: str) -> bool:
+        """Remove a timed out conversation
+        
+        Unlike remove_conversation only the bot's own labels are cleared, so
+        chats still waiting for staff keep their labels. The deadline is
+        checked again under the state lock, so a conversation restarted
+        since it was found stale is kept.
         
+        Args:
+            user_id (str): Unique identifier for the user
+            
+        Returns:
+            bool: True if the conversation was removed
+        """
+        with self._state_manager.lock:
+            if self._timeout_manager.is_active(user_id):
+                return False
+            for label in BOT_LABELS:
+                self._label_manager.remove_label(user_id, label)
+            self._state_manager.remove_state(user_id)
+            self._timeout_manager.remove_activity(user_id)
+        self._label_manager.sync(user_id)
+        return True
+
     def cleanup_stale_conversations(self) -> None:
         """Remove conversations that have timed out"""
         for user_id in self._timeout_manager.get_stale_users():
-            self.remove_conversation(user_id)
+            self.expire_conversation(user_id)
+
+    def _sweep(self) -> None:
+        """Expire stale conversations and write recorded transitions to disk"""
+        self.cleanup_stale_conversations()
+        if self._monitor is not None:
+            self._monitor.flush()
+
+    def start_expiry_sweeper(self, interval_seconds: float = 60.0) -> None:
+        """Remove timed out conversations periodically on a background thread
+
+        Each sweep also flushes the state monitor's transition log.
+        
+        Args:
+            interval_seconds (float): Seconds between sweeps
+        """
+        if self._sweeper is None:
+            self._sweeper = ExpirySweeper(self._sweep, interval_seconds)
+        self._sweeper.start()
+
+    def stop_expiry_sweeper(self) -> None:
+        """Stop the background expiry sweeper if running"""
+        if self._sweeper is not None:
+            self._sweeper.stop()
+            self._sweeper = None
+            
+    def get_active_counts(self) -> Dict[str, int]:
+        """Get the number of active conversations per flow name
+        
+        Returns:
+            Dict[str, int]: Conversations not yet removed, per flow name
+        """
+        return self._state_manager.get_active_counts()
+
+    def get_labelled_chats(self, label: str, offset: int = 0,
+                           limit: Optional[int] = None) -> List[Tuple[str, datetime]]:
+        """Get a page of the chats that currently have a label
+        
+        Args:
+            label (str): Label key, e.g. 'waiting_urgent_support'
+            offset (int): Chats to skip
+            limit (Optional[int]): Maximum number of chats, None for all
             
+        Returns:
+            List[Tuple[str, datetime]]: User ID and time the label was applied, oldest first
+        """
+        return self._label_manager.index.get_users(label, offset, limit)
+
+    def count_labelled_chats(self, label: str) -> int:
+        """Get the number of chats that currently have a label
+        
+        Args:
+            label (str): Label key
+            
+        Returns:
+            int: Chats with the label
+        """
+        return self._label_manager.index.count(label)
+
     def handle_support_request(self, user_id: str) -> None:
         """Handle a support request
         
@@ -70,15 +185,23 @@ class ConversationManager:
             user_id (str): Unique identifier for the user
         """
         self._business_flow_manager.handle_support_request(user_id)
+        self._label_manager.sync(user_id)
         
-    def update_conversation_state(self, user_id: str, new_state: str) -> None:
+    def update_conversation_state(self, user_id: str, new_state: str, from_state: Optional[str] = None) -> None:
         """Update conversation state
         
         Args:
             user_id (str): Unique identifier for the user
             new_state (str): New state to set
+            from_state (Optional[str]): State before handle_input moved the flow, None for its current state
         """
-        self._business_flow_manager.handle_state_transition(user_id, new_state)
+        try:
+            self._business_flow_manager.handle_state_transition(user_id, new_state, from_state)
+        finally:
+            # The flow was already mutated by handle_input, persist it either way
+            self._state_manager.save_state(user_id)
+            # The net label changes of the transition, sent or queued as one update
+            self._label_manager.sync(user_id)
         
     def handle_user_input(self, user_id: str, user_input: str) -> Optional[str]:
         """Handle user input for active conversation
@@ -95,8 +218,9 @@ class ConversationManager:
             # Ensure recipient is set (in case it was lost)
             if not flow.get_recipient():
                 flow.set_recipient(user_id)
+            previous_state = flow.state
             next_state = flow.handle_input(user_input)
-            self.update_conversation_state(user_id, next_state)
+            self.update_conversation_state(user_id, next_state, previous_state)
             return flow.get_next_message()
         # No active conversation, return welcome message
         welcome_msg = MessagePayloadBuilder.create_interactive_message(
@@ -0,0 +1,141 @@
+"""Storage backends for persisting conversation flow snapshots."""
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+# Flow snapshot as produced by AbstractBusinessFlow.to_snapshot
+ConversationRecord = Sequence[Any]
+
+
+class ConversationStore(ABC):
+    """Abstract storage backend for serialized business flows"""
+
+    @abstractmethod
+    def load(self, user_id: str) -> Optional[ConversationRecord]:
+        """Load the flow record of a user
+
+        Args:
+            user_id (str): Unique identifier for the user
+
+        Returns:
+            Optional[ConversationRecord]: The stored record if exists, None otherwise
+        """
+        pass
+
+    @abstractmethod
+    def save(self, user_id: str, record: ConversationRecord) -> None:
+        """Insert or replace the flow record of a user
+
+        Args:
+            user_id (str): Unique identifier for the user
+            record (ConversationRecord): Flow snapshot
+        """
+        pass
+
+    @abstractmethod
+    def delete(self, user_id: str) -> None:
+        """Delete the flow record of a user
+
+        Args:
+            user_id (str): Unique identifier for the user
+        """
+        pass
+
+    @abstractmethod
+    def iter_activity(self) -> Iterator[Tuple[str, float]]:
+        """Iterate over stored users and the time their record was last saved
+
+        Returns:
+            Iterator[Tuple[str, float]]: Pairs of user ID and epoch timestamp
+        """
+        pass
+
+    def close(self) -> None:
+        """Release resources held by the store"""
+        pass
+
+
+class InMemoryConversationStore(ConversationStore):
+    """Process-local store; records are lost on restart"""
+
+    def __init__(self):
+        """Initialize an empty store"""
+        self._records: Dict[str, Tuple[ConversationRecord, float]] = {}
+
+    def load(self, user_id: str) -> Optional[ConversationRecord]:
+        """Load the flow record of a user"""
+        entry = self._records.get(user_id)
+        return entry[0] if entry else None
+
+    def save(self, user_id: str, record: ConversationRecord) -> None:
+        """Insert or replace the flow record of a user"""
+        self._records[user_id] = (record, time.time())
+
+    def delete(self, user_id: str) -> None:
+        """Delete the flow record of a user"""
+        self._records.pop(user_id, None)
+
+    def iter_activity(self) -> Iterator[Tuple[str, float]]:
+        """Iterate over stored users and their last save time"""
+        for user_id, (_, updated_at) in list(self._records.items()):
+            yield user_id, updated_at
+
+
+class SQLiteConversationStore(ConversationStore):
+    """Embedded SQLite store that survives restarts; used by one bot process at a time"""
+
+    def __init__(self, path: str):
+        """Open (and create if needed) the conversation database
+
+        Args:
+            path (str): Path to the SQLite database file
+        """
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # WAL lets outside readers, e.g. a sqlite3 shell, proceed while a write is in progress
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS conversations ('
+            'user_id TEXT PRIMARY KEY, '
+            'record TEXT NOT NULL, '
+            'updated_at REAL NOT NULL)'
+        )
+
+    def load(self, user_id: str) -> Optional[ConversationRecord]:
+        """Load the flow record of a user"""
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT record FROM conversations WHERE user_id = ?', (user_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, user_id: str, record: ConversationRecord) -> None:
+        """Insert or replace the flow record of a user"""
+        encoded = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO conversations (user_id, record, updated_at) VALUES (?, ?, ?)',
+                (user_id, encoded, time.time())
+            )
+
+    def delete(self, user_id: str) -> None:
+        """Delete the flow record of a user"""
+        with self._lock:
+            self._connection.execute('DELETE FROM conversations WHERE user_id = ?', (user_id,))
+
+    def iter_activity(self) -> Iterator[Tuple[str, float]]:
+        """Iterate over stored users and their last save time"""
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT user_id, updated_at FROM conversations'
+            ).fetchall()
+        return iter(rows)
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            self._connection.close()
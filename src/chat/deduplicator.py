@@ -0,0 +1,198 @@
+"""Idempotency cache for webhook messages redelivered by the provider."""
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SeenMessageStore(ABC):
+    """Abstract persistent backend for seen message IDs"""
+
+    @abstractmethod
+    def add(self, message_id: str, seen_at: float) -> bool:
+        """Record a message ID unless it is already stored
+
+        Args:
+            message_id (str): Provider message ID
+            seen_at (float): Epoch time the message was first seen
+
+        Returns:
+            bool: True if the ID was added, False if it was already stored
+        """
+        pass
+
+    @abstractmethod
+    def discard(self, message_id: str) -> None:
+        """Forget a message ID
+
+        Args:
+            message_id (str): Provider message ID
+        """
+        pass
+
+    @abstractmethod
+    def purge(self, older_than: float) -> None:
+        """Delete IDs first seen before the given time
+
+        Args:
+            older_than (float): Epoch cutoff
+        """
+        pass
+
+    def close(self) -> None:
+        """Release resources held by the store"""
+        pass
+
+
+class SQLiteSeenMessageStore(SeenMessageStore):
+    """SQLite backend so deduplication survives restarts"""
+
+    def __init__(self, path: str):
+        """Open (and create if needed) the message ID database
+
+        Args:
+            path (str): Path to the SQLite database file
+        """
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS seen_messages ('
+            'message_id TEXT PRIMARY KEY, '
+            'seen_at REAL NOT NULL)'
+        )
+        self._connection.execute(
+            'CREATE INDEX IF NOT EXISTS seen_messages_seen_at ON seen_messages (seen_at)'
+        )
+
+    def add(self, message_id: str, seen_at: float) -> bool:
+        """Record a message ID unless it is already stored"""
+        with self._lock:
+            cursor = self._connection.execute(
+                'INSERT OR IGNORE INTO seen_messages (message_id, seen_at) VALUES (?, ?)',
+                (message_id, seen_at)
+            )
+        return cursor.rowcount == 1
+
+    def discard(self, message_id: str) -> None:
+        """Forget a message ID"""
+        with self._lock:
+            self._connection.execute('DELETE FROM seen_messages WHERE message_id = ?', (message_id,))
+
+    def purge(self, older_than: float) -> None:
+        """Delete IDs first seen before the given time"""
+        with self._lock:
+            self._connection.execute('DELETE FROM seen_messages WHERE seen_at < ?', (older_than,))
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            self._connection.close()
+
+
+class MessageDeduplicator:
+    """Bounded, TTL-evicting cache of message IDs that were already processed
+
+    IDs are kept in insertion order, which is also expiry order, so eviction
+    only ever looks at the oldest entries. When a SeenMessageStore is given,
+    it is consulted on cache misses so redeliveries are still recognized
+    after a restart.
+    """
+
+    def __init__(self,
+                 ttl_seconds: float = 86400,
+                 max_entries: int = 100000,
+                 store: Optional[SeenMessageStore] = None,
+                 clock: Callable[[], float] = time.time):
+        """Initialize the deduplicator
+
+        Args:
+            ttl_seconds (float): Seconds a message ID is remembered
+            max_entries (int): Maximum IDs kept in memory; the oldest are evicted first
+            store (Optional[SeenMessageStore]): Persistent backend, None for memory only
+            clock (Callable[[], float]): Epoch time source in seconds
+        """
+        self._ttl = ttl_seconds
+        self._max_entries = max_entries
+        self._store = store
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._last_purge = 0.0
+
+    def is_duplicate(self, message_id: str) -> bool:
+        """Check a message ID and remember it if it is new
+
+        Args:
+            message_id (str): Provider message ID
+
+        Returns:
+            bool: True if the message was seen within the TTL, False otherwise
+        """
+        now = self._clock()
+        with self._lock:
+            self._evict(now)
+            if message_id in self._seen:
+                self._hits += 1
+                logger.debug("Dropping redelivered message %s", message_id)
+                return True
+            if self._store is not None and not self._store.add(message_id, now):
+                # Seen by a previous run (expired IDs are purged periodically)
+                self._hits += 1
+                self._remember(message_id, now)
+                logger.debug("Dropping message %s seen before restart", message_id)
+                return True
+            self._misses += 1
+            self._remember(message_id, now)
+            return False
+
+    def forget(self, message_id: str) -> None:
+        """Forget a message ID so a redelivery is processed again, e.g. after a failure
+
+        Args:
+            message_id (str): Provider message ID
+        """
+        with self._lock:
+            self._seen.pop(message_id, None)
+            if self._store is not None:
+                self._store.discard(message_id)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get cache counters
+
+        Returns:
+            Dict[str, int]: Hits (duplicates dropped), misses and cached IDs
+        """
+        with self._lock:
+            return {'hits': self._hits, 'misses': self._misses, 'size': len(self._seen)}
+
+    def _remember(self, message_id: str, now: float) -> None:
+        """Add an ID to the in-memory cache, evicting the oldest beyond capacity"""
+        self._seen[message_id] = now + self._ttl
+        while len(self._seen) > self._max_entries:
+            self._seen.popitem(last=False)
+
+    def _evict(self, now: float) -> None:
+        """Drop expired IDs from the front of the cache"""
+        seen = self._seen
+        while seen:
+            message_id, expires_at = next(iter(seen.items()))
+            if expires_at > now:
+                break
+            seen.popitem(last=False)
+        # Keep the persistent table bounded, but not on every message
+        if self._store is not None and now - self._last_purge > min(self._ttl, 60.0):
+            self._purge_store(now)
+
+    def _purge_store(self, now: float) -> None:
+        """Delete expired IDs from the persistent backend"""
+        self._last_purge = now
+        self._store.purge(now - self._ttl)
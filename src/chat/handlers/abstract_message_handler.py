@@ -4,23 +4,31 @@ from typing import Dict, Any, List, Optional, TYPE_CHECKING
 from ...business.flow_factory import BusinessFlowFactory
 from ...business.flows.abstract_business_flow import AbstractBusinessFlow
 from ...models.message_payload import MessagePayloadBuilder
+from .welcome_handler import WelcomeHandler
+from ...whatsapp.utils.message_parser import get_button_title
+from ...utils.logger import get_trace_logger
 
 if TYPE_CHECKING:
     from ..conversation_manager import ConversationManager
 
+tracer = get_trace_logger(__name__)
+
 
 class AbstractMessageHandler(ABC):
     """Abstract base class for message handlers."""
 
-    def __init__(self, conversation_manager: "ConversationManager", flow_factory: BusinessFlowFactory):
+    def __init__(self, conversation_manager: "ConversationManager", flow_factory: BusinessFlowFactory,
+                 welcome_handler: Optional[WelcomeHandler] = None):
         """Initialize base handler
         
         Args:
             conversation_manager (ConversationManager): Manager for user conversations
             flow_factory (BusinessFlowFactory): Factory for creating business flow instances
+            welcome_handler (Optional[WelcomeHandler]): Shared welcome handler (a new one by default)
         """
         self._conversation_manager = conversation_manager
         self._flow_factory = flow_factory
+        self._welcome_handler = welcome_handler or WelcomeHandler(conversation_manager, flow_factory)
 
     @abstractmethod
     def handle(self, message: Dict[str, Any], base_payload: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -35,6 +43,27 @@ class AbstractMessageHandler(ABC):
         """
         pass
 
+    @staticmethod
+    def get_flow_input(message: Dict[str, Any]) -> Any:
+        """Extract the input a flow handles from an incoming message
+        
+        Args:
+            message (Dict[str, Any]): The incoming message
+            
+        Returns:
+            Any: Button title or text body, media data for media messages, else the message itself
+        """
+        title = get_button_title(message)
+        if title:
+            return title
+        text = message.get('text')
+        if isinstance(text, dict) and 'body' in text:
+            return text['body']
+        media = message.get(message.get('type') or '')
+        if isinstance(media, dict):
+            return media
+        return message
+
     def check_existing_conversation(self, recipient: str, message: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
         """Check if there's an existing conversation and handle the message
         
@@ -47,16 +76,28 @@ class AbstractMessageHandler(ABC):
         """
         flow = self._conversation_manager.get_conversation(recipient)
         if flow:
-            # Handle the input using the flow
-            next_state = flow.handle_input(message)
-            # Update the flow state
-            self._conversation_manager.update_conversation_state(recipient, next_state)
+            # Handle the input using the flow, which may move its state itself
+            previous_state = flow.state
+            next_state = flow.handle_input(self.get_flow_input(message))
+            # Validate the transition from the state the input arrived in
+            self._conversation_manager.update_conversation_state(recipient, next_state, previous_state)
             # Get the next message to send
             next_message = flow.get_next_message()
             if next_message:
                 return [self.create_flow_message(recipient, next_message)]
         return None
 
+    def create_welcome_messages(self, recipient: str) -> List[Dict[str, Any]]:
+        """Create the welcome message for a user without an active conversation
+        
+        Args:
+            recipient (str): The recipient's phone number
+            
+        Returns:
+            List[Dict[str, Any]]: List containing welcome message payload
+        """
+        return self._welcome_handler.handle_welcome(recipient)
+
     def create_flow_message(self, recipient: str, message: Any) -> Dict[str, Any]:
         """Create appropriate message type based on content
         
@@ -67,27 +108,20 @@ class AbstractMessageHandler(ABC):
         Returns:
             Dict[str, Any]: Message payload
         """
-        print("\n=== AbstractMessageHandler.create_flow_message() ===")
-        print(f"Recipient: {recipient}")
-        print(f"Message to format: {message}")
-        print(f"Message type: {type(message)}")
-
         # If message is already a formatted payload, return it as is
         if isinstance(message, dict) and 'messaging_product' in message:
-            print("Message is already a formatted payload, returning as is")
+            tracer.trace(recipient, "Flow message is already a payload: %s", message)
             return message
 
         # If message contains button definitions, create interactive message
         if isinstance(message, dict) and "buttons" in message:
-            print("Creating interactive message from button template")
             msg = MessagePayloadBuilder.create_interactive_message(recipient=recipient, **message)
-            print(f"Created interactive message: {msg}")
+            tracer.trace(recipient, "Created interactive message: %s", msg)
             return msg
 
         # Otherwise create text message
-        print("Creating text message")
         msg = MessagePayloadBuilder.create_text_message(recipient=recipient, body_text=str(message))
-        print(f"Created text message: {msg}")
+        tracer.trace(recipient, "Created text message: %s", msg)
         return msg
 
     def create_interactive_message(
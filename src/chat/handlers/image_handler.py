@@ -20,18 +20,9 @@ class ImageMessageHandler(AbstractMessageHandler):
         recipient = base_payload["to"]
 
         # Check for existing conversation first
-        conversation = self.conversation_manager.get_conversation(recipient)
-        if conversation:
-            try:
-                # Get response from service and ensure we return it
-                response = conversation.handle_response(message)
-                if response:
-                    return response
-            except Exception as e:
-                print(f"ERROR handling image in conversation: {e}")
-                # Just return empty list on error, let service handle retries
-                return []
-
+        conversation_response = self.check_existing_conversation(recipient, message)
+        if conversation_response is not None:
+            return conversation_response
 
         # If no active conversation, show the welcome message
         # Images without context should start a new conversation
@@ -1,18 +1,15 @@
 """Interactive message handler implementation."""
 from typing import Dict, Any, List
 from .abstract_message_handler import AbstractMessageHandler
-from .welcome_handler import WelcomeHandler
 from ...utils.errors import ConversationError
 from ...whatsapp.utils.message_parser import get_button_title
+from ...utils.logger import get_trace_logger, setup_logger
+from ...business.intents import INTENTS, BACK_TO_MAIN, TALK_TO_REPRESENTATIVE, START_FLOW
 
-from ...config.responses.common import NAVIGATION, GENERAL
+from ...config.responses.common import GENERAL
 
-# Mapping between Hebrew button titles and flow types
-FLOW_TYPE_MAPPING = {
-    'מעבר דירה': 'moving',
-    'סידור וארגון הבית': 'organization',
-    'אחר': 'support'
-}
+logger = setup_logger(__name__)
+tracer = get_trace_logger(__name__)
 
 
 class InteractiveMessageHandler(AbstractMessageHandler):
@@ -29,34 +26,29 @@ class InteractiveMessageHandler(AbstractMessageHandler):
             List[Dict[str, Any]]: List of message payloads to send
         """
         recipient = base_payload["to"]
-        print("\n=== InteractiveMessageHandler.handle() ===")
-        print(f"Incoming message: {message}")
-        print(f"Base payload: {base_payload}")
+        tracer.trace(recipient, "Handling interactive message: %s", message)
 
         # Check for existing conversation first for non-interactive messages
         if message.get('type') not in ['interactive', 'reply']:
             conversation_response = self.check_existing_conversation(recipient, message)
             if conversation_response is not None:
                 return conversation_response
-            return WelcomeHandler(self._conversation_manager, self._flow_factory).handle_welcome(recipient)
+            return self.create_welcome_messages(recipient)
 
         # Extract button selection
         selected_option = self._get_selected_option(message)
-        print(f"\nExtracted selected option: {selected_option}")
+        tracer.trace(recipient, "Selected option: %r", selected_option)
         if not selected_option:
-            print("No button selection found in message")
-            return WelcomeHandler(self._conversation_manager, self._flow_factory).handle_welcome(recipient)
+            return self.create_welcome_messages(recipient)
 
-        print("Processing selected option:", selected_option)
+        intent, payload = INTENTS.classify(selected_option)
 
         # Handle navigation actions first
-        if selected_option == NAVIGATION['back_to_main']:
-            print("User requested main menu")
+        if intent == BACK_TO_MAIN:
             self._conversation_manager.remove_conversation(recipient)
-            return WelcomeHandler(self._conversation_manager, self._flow_factory).handle_welcome(recipient)
+            return self.create_welcome_messages(recipient)
             
-        if selected_option == NAVIGATION['talk_to_representative']:
-            print("User requested support")
+        if intent == TALK_TO_REPRESENTATIVE:
             try:
                 # Start support conversation
                 self._conversation_manager.start_conversation(recipient, 'support')
@@ -65,41 +57,35 @@ class InteractiveMessageHandler(AbstractMessageHandler):
                     return [self.create_flow_message(recipient, flow.get_next_message())]
             except ConversationError:
                 pass
-            return WelcomeHandler(self._conversation_manager, self._flow_factory).handle_welcome(recipient)
+            return self.create_welcome_messages(recipient)
 
         # Try to handle the selected option as a flow type
-        if selected_option in FLOW_TYPE_MAPPING:
-            print(f"Found flow type mapping for: {selected_option}")
-            print(f"Mapped to flow type: {FLOW_TYPE_MAPPING[selected_option]}")
+        if intent == START_FLOW:
+            flow_type = payload
+            tracer.trace(recipient, "Starting %s flow", flow_type)
             try:
-                flow_type = FLOW_TYPE_MAPPING[selected_option]
                 
                 # Start new conversation with selected flow
                 self._conversation_manager.start_conversation(recipient, flow_type)
                 
                 # Get the flow and its first message
                 flow = self._conversation_manager.get_conversation(recipient)
-                print(f"\nCreated flow: {flow.get_flow_name() if flow else None}")
                 if flow:
-                    next_msg = flow.get_next_message()
-                    print(f"Flow's next message: {next_msg}")
-                    formatted_msg = self.create_flow_message(recipient, next_msg)
-                    print(f"Formatted flow message: {formatted_msg}")
-                    return [formatted_msg]
+                    return [self.create_flow_message(recipient, flow.get_next_message())]
                     
-                print("Failed to create flow")
+                logger.error("Failed to create %s flow for %s", flow_type, recipient)
                 return [self.create_text_message(recipient, GENERAL['error'])]
                     
             except ConversationError as e:
-                print(f"Error creating flow: {e}")
-                return WelcomeHandler(self._conversation_manager, self._flow_factory).handle_welcome(recipient)
+                logger.warning("Error creating flow for %s: %s", recipient, e)
+                return self.create_welcome_messages(recipient)
 
         # Check for existing conversation if no option was handled
         conversation_response = self.check_existing_conversation(recipient, message)
         if conversation_response is not None:
             return conversation_response
 
-        return WelcomeHandler(self._conversation_manager, self._flow_factory).handle_welcome(recipient)
+        return self.create_welcome_messages(recipient)
 
     def _get_selected_option(self, message: Dict[str, Any]) -> str:
         """Extract the selected option from an interactive message
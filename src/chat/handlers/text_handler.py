@@ -1,8 +1,11 @@
 """Text message handler implementation."""
 from typing import Dict, Any, List
 from .abstract_message_handler import AbstractMessageHandler
-from .welcome_handler import WelcomeHandler
 from ...config.responses.common import GENERAL
+from ...utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
 class TextMessageHandler(AbstractMessageHandler):
     """Handler for text messages."""
 
@@ -26,8 +29,8 @@ class TextMessageHandler(AbstractMessageHandler):
                 return conversation_response
 
             # For any other text message, show the welcome message
-            return WelcomeHandler(self._conversation_manager, self._flow_factory).handle_welcome(recipient)
+            return self.create_welcome_messages(recipient)
             
         except Exception as e:
-            print(f"Error handling text message: {str(e)}")
+            logger.exception("Error handling text message from %s: %s", recipient, e)
             return [self.create_text_message(recipient, GENERAL['error'])]
\ No newline at end of file
@@ -1,11 +1,23 @@
 """Welcome message handler implementation."""
 from typing import Dict, Any, List
 
-from ...models.message_payload import MessagePayloadBuilder
+from ...models.message_payload import CompiledTemplate
 from ...config.responses.common import WELCOME, NAVIGATION
 
 class WelcomeHandler:
     """Handles initial welcome messages and service selection."""
+
+    # Welcome payload skeleton, built once and shared by all handlers
+    _WELCOME_TEMPLATE = CompiledTemplate(
+        body_text=WELCOME['message'],
+        header_text=WELCOME['header'],
+        buttons=[
+            {"id": "moving", "title": WELCOME['moving_button']},
+            {"id": "organization", "title": WELCOME['organization_button']},
+            {"id": "other", "title": WELCOME['other_button']},
+            {"id": "help", "title": NAVIGATION['talk_to_representative']}
+        ]
+    )
     
     def __init__(self, conversation_manager, flow_factory):
         """Initialize WelcomeHandler with required dependencies.
@@ -26,17 +38,7 @@ class WelcomeHandler:
         Returns:
             Dict[str, Any]: Welcome message payload
         """
-        return MessagePayloadBuilder.create_interactive_message(
-            recipient=recipient,
-            body_text=WELCOME['message'],
-            header_text=WELCOME['header'],
-            buttons=[
-                {"id": "moving", "title": WELCOME['moving_button']},
-                {"id": "organization", "title": WELCOME['organization_button']},
-                {"id": "other", "title": WELCOME['other_button']},
-                {"id": "help", "title": NAVIGATION['talk_to_representative']}
-            ]
-        )
+        return self._WELCOME_TEMPLATE.render(recipient)
 
     def handle_welcome(self, recipient: str) -> List[Dict[str, Any]]:
         """Handle initial welcome for a user
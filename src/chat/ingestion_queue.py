@@ -0,0 +1,191 @@
+"""In-process work queue for asynchronous webhook ingestion."""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+from .dispatcher import ShardedDispatcher
+from ..utils.errors import WhatsAppBotError
+
+logger = logging.getLogger(__name__)
+
+# Routes a message and sends its replies, returning the send futures when
+# sending is pipelined
+HandleCallback = Callable[[Dict[str, Any]], Optional[List[Future]]]
+
+
+class IngestionQueueFullError(WhatsAppBotError):
+    """Raised when the ingestion queue cannot accept more messages"""
+    pass
+
+
+class IngestionMetrics:
+    """Thread-safe counters describing ingestion queue behaviour"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.max_depth = 0
+        self.latency_count = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+
+    def record_enqueue(self, depth: int) -> None:
+        """Record a successfully enqueued message
+
+        Args:
+            depth (int): Queue depth right after the message was enqueued
+        """
+        with self._lock:
+            self.enqueued += 1
+            if depth > self.max_depth:
+                self.max_depth = depth
+
+    def record_rejected(self, count: int) -> None:
+        """Record messages rejected because the queue was full
+
+        Args:
+            count (int): Number of rejected messages
+        """
+        with self._lock:
+            self.rejected += count
+
+    def record_done(self, latency: float, failed: bool) -> None:
+        """Record a message that finished processing
+
+        Args:
+            latency (float): Seconds between enqueue and the end of sending
+            failed (bool): Whether processing or sending raised an error
+        """
+        with self._lock:
+            if failed:
+                self.failed += 1
+            else:
+                self.processed += 1
+            self.latency_count += 1
+            self.latency_sum += latency
+            if latency > self.latency_max:
+                self.latency_max = latency
+
+    def snapshot(self, depth: int, workers: int) -> Dict[str, Any]:
+        """Get a consistent copy of the current metrics
+
+        Args:
+            depth (int): Current queue depth
+            workers (int): Number of worker threads
+
+        Returns:
+            Dict[str, Any]: Metric values
+        """
+        with self._lock:
+            avg_latency = (self.latency_sum / self.latency_count
+                           if self.latency_count else 0.0)
+            return {
+                'workers': workers,
+                'queue_depth': depth,
+                'max_queue_depth': self.max_depth,
+                'enqueued': self.enqueued,
+                'processed': self.processed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'avg_enqueue_to_send_seconds': avg_latency,
+                'max_enqueue_to_send_seconds': self.latency_max
+            }
+
+
+class WebhookIngestionQueue:
+    """Accepts webhook messages immediately and processes them in the background
+
+    Messages are handed to a ShardedDispatcher keyed by sender, so replies to
+    one user keep their order while different users are served in parallel.
+    """
+
+    def __init__(self, handle_message: HandleCallback, dispatcher: ShardedDispatcher):
+        """Initialize the ingestion queue
+
+        Args:
+            handle_message (HandleCallback): Routes a message and sends its replies,
+                optionally returning send futures when sending is pipelined; the
+                same callback the synchronous webhook uses
+            dispatcher (ShardedDispatcher): Dispatcher running the work per sender
+        """
+        self._handle = handle_message
+        self._dispatcher = dispatcher
+        self._metrics = IngestionMetrics()
+
+    def start(self) -> None:
+        """Start the dispatcher workers if they are not running yet"""
+        self._dispatcher.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the workers after the already queued messages are processed
+
+        Args:
+            timeout (Optional[float]): Seconds to wait for each worker to finish
+        """
+        self._dispatcher.stop(timeout)
+
+    def enqueue(self, messages: List[Dict[str, Any]]) -> int:
+        """Enqueue webhook messages for background processing
+
+        Args:
+            messages (List[Dict[str, Any]]): Messages from the webhook payload
+
+        Returns:
+            int: Number of enqueued messages
+
+        Raises:
+            IngestionQueueFullError: If a shard queue is full; remaining messages are not enqueued
+        """
+        for index, message in enumerate(messages):
+            sender = message.get('from', '').strip()
+            try:
+                self._dispatcher.submit(sender, self._handle_message, message,
+                                        time.monotonic(), block=False)
+            except queue.Full:
+                rejected = len(messages) - index
+                self._metrics.record_rejected(rejected)
+                raise IngestionQueueFullError(
+                    f"Ingestion queue is full, rejected {rejected} message(s)"
+                )
+            self._metrics.record_enqueue(self._dispatcher.queue_depth())
+        return len(messages)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get queue depth and enqueue-to-send latency metrics
+
+        Returns:
+            Dict[str, Any]: Metric values
+        """
+        return self._metrics.snapshot(self._dispatcher.queue_depth(),
+                                      self._dispatcher.num_shards)
+
+    def _handle_message(self, message: Dict[str, Any], enqueued_at: float) -> None:
+        """Route a queued message and send its responses
+
+        Args:
+            message (Dict[str, Any]): The incoming WhatsApp message
+            enqueued_at (float): Monotonic time the message was enqueued
+        """
+        try:
+            send_futures = self._handle(message)
+        except Exception as e:
+            logger.exception("Error processing queued message %s: %s", message.get('id'), e)
+            self._metrics.record_done(time.monotonic() - enqueued_at, True)
+            return
+
+        if not send_futures:
+            self._metrics.record_done(time.monotonic() - enqueued_at, False)
+            return
+
+        # Replies to one recipient complete in order, so the last one marks the end
+        def on_sent(_: Future) -> None:
+            failed = any(future.exception() is not None for future in send_futures)
+            self._metrics.record_done(time.monotonic() - enqueued_at, failed)
+
+        send_futures[-1].add_done_callback(on_sent)
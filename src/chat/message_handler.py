@@ -1,22 +1,34 @@
 """Core message processing logic for WhatsApp bot."""
-from typing import Dict, Any, List
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Any, List, Optional, Sequence
 from ..whatsapp.utils.validators import validate_sender
 from .router import MessageRouter
 from .conversation_manager import ConversationManager
+from .deduplicator import MessageDeduplicator
 from ..business.flow_factory import BusinessFlowFactory
 
 
 class MessageHandler:
     """Handles incoming WhatsApp messages."""
 
-    def __init__(self, conversation_manager: ConversationManager, flow_factory: BusinessFlowFactory):
+    def __init__(self, conversation_manager: ConversationManager, flow_factory: BusinessFlowFactory,
+                 deduplicator: Optional[MessageDeduplicator] = None, max_unsent: int = 1000):
         """Initialize MessageHandler.
         
         Args:
             conversation_manager (ConversationManager): Manager for user conversations
             flow_factory (BusinessFlowFactory): Factory for creating business flow instances
+            deduplicator (Optional[MessageDeduplicator]): Cache of processed message IDs (in-memory by default)
+            max_unsent (int): Most messages whose failed replies are kept for their redelivery
         """
         self.router = MessageRouter(conversation_manager, flow_factory)
+        self.deduplicator = deduplicator or MessageDeduplicator()
+        self.max_unsent = max_unsent
+        # Message ID -> replies that failed to send, resent on redelivery
+        self._unsent: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._unsent_lock = threading.Lock()
 
     def process_message(self, message: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Process incoming WhatsApp message and return appropriate response payload.
@@ -31,10 +43,84 @@ class MessageHandler:
         if not validate_sender(message):
             return []
 
+        # Drop redeliveries so flows do not advance twice, but resend
+        # the replies the first delivery failed to send
+        message_id = message.get('id')
+        if message_id and self.deduplicator.is_duplicate(message_id):
+            with self._unsent_lock:
+                return self._unsent.pop(message_id, [])
+
         # Create base payload with sender's number
         base_payload = {
             "to": message.get('from', '').strip(),
         }
 
         # Route message to appropriate handler
-        return self.router.route_message(message, base_payload)
\ No newline at end of file
+        try:
+            return self.router.route_message(message, base_payload)
+        except Exception:
+            # Let the provider's redelivery retry a message that failed
+            if message_id:
+                self.deduplicator.forget(message_id)
+            raise
+
+    def process_and_send(self, message: Dict[str, Any],
+                         send_responses: Callable[[List[Dict[str, Any]]], List[Future]]) -> List[Future]:
+        """Process a message, queue its replies and keep the ones that fail to send
+        
+        Args:
+            message (Dict[str, Any]): The incoming WhatsApp message
+            send_responses (Callable[[List[Dict[str, Any]]], List[Future]]): Queues replies
+                for sending, returning a send future per reply
+            
+        Returns:
+            List[Future]: Futures resolved when each reply has been sent
+        """
+        payloads = [payload for payload in self.process_message(message) if payload]
+        if not payloads:
+            return []
+        futures = send_responses(payloads)
+        # Replies that fail are resent when the provider redelivers the message
+        self.track_replies(message, payloads, futures)
+        return futures
+
+    def keep_unsent(self, message_id: Optional[str], payloads: List[Dict[str, Any]]) -> None:
+        """Keep replies that failed to send, so a redelivery of their message resends them
+        
+        Args:
+            message_id (Optional[str]): ID of the message the replies answer
+            payloads (List[Dict[str, Any]]): Unsent replies, in send order
+        """
+        if not message_id or not payloads:
+            return
+        with self._unsent_lock:
+            self._unsent[message_id] = list(payloads)
+            self._unsent.move_to_end(message_id)
+            while len(self._unsent) > self.max_unsent:
+                self._unsent.popitem(last=False)
+
+    def track_replies(self, message: Dict[str, Any], payloads: Sequence[Dict[str, Any]],
+                      futures: Sequence[Future]) -> None:
+        """Keep the replies of a message whose sends fail, once all of them have completed
+        
+        Args:
+            message (Dict[str, Any]): The message the replies answer
+            payloads (Sequence[Dict[str, Any]]): Replies queued for sending
+            futures (Sequence[Future]): Send future of each reply, in the same order
+        """
+        message_id = message.get('id')
+        if not message_id or not futures:
+            return
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def on_done(_):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            failed = [payload for payload, future in zip(payloads, futures) if future.exception() is not None]
+            self.keep_unsent(message_id, failed)
+
+        for future in futures:
+            future.add_done_callback(on_done)
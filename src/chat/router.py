@@ -1,9 +1,27 @@
 """Message routing functionality."""
-from typing import Dict, Any, List
-from .handlers import TextMessageHandler, InteractiveMessageHandler, ImageMessageHandler, VideoMessageHandler
+import time
+from typing import Dict, Any, List, Type
+from .handlers import (
+    AbstractMessageHandler,
+    TextMessageHandler,
+    InteractiveMessageHandler,
+    ImageMessageHandler,
+    VideoMessageHandler,
+    WelcomeHandler
+)
 from ..business.flow_factory import BusinessFlowFactory
 from .conversation_manager import ConversationManager
 from ..config.responses.common import GENERAL
+from ..utils.metrics import REGISTRY
+from ..utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+HANDLER_SECONDS = REGISTRY.histogram(
+    'whatsapp_bot_handler_seconds',
+    'Time spent handling an incoming message, by message type',
+    ('message_type',)
+)
 
 
 class MessageRouter:
@@ -19,14 +37,36 @@ class MessageRouter:
         self._conversation_manager = conversation_manager
         self._flow_factory = flow_factory
         
-        # Initialize handlers with new business flow factory
-        self.handlers = {
-            'text': TextMessageHandler(conversation_manager, flow_factory),
-            'interactive': InteractiveMessageHandler(conversation_manager, flow_factory),
-            'reply': InteractiveMessageHandler(conversation_manager, flow_factory),
-            'image': ImageMessageHandler(conversation_manager, flow_factory),
-            'video': VideoMessageHandler(conversation_manager, flow_factory)
-        }
+        # Handlers are stateless, so one instance of each (and of the welcome
+        # handler they share) serves every request
+        self._welcome_handler = WelcomeHandler(conversation_manager, flow_factory)
+        self.handlers: Dict[str, AbstractMessageHandler] = {}
+        self._handler_timers: Dict[str, Any] = {}
+        self.register_handler('text', TextMessageHandler)
+        self.register_handler('interactive', InteractiveMessageHandler)
+        self.register_handler('reply', InteractiveMessageHandler)
+        self.register_handler('image', ImageMessageHandler)
+        self.register_handler('video', VideoMessageHandler)
+        
+    def register_handler(self, message_type: str, handler_class: Type[AbstractMessageHandler]) -> AbstractMessageHandler:
+        """Register the handler for a message type, reusing an existing instance of the class
+        
+        Args:
+            message_type (str): Message type as found in the webhook payload
+            handler_class (Type[AbstractMessageHandler]): Handler class for the type
+            
+        Returns:
+            AbstractMessageHandler: The registered handler instance
+        """
+        handler = next(
+            (existing for existing in self.handlers.values() if type(existing) is handler_class),
+            None
+        )
+        if handler is None:
+            handler = handler_class(self._conversation_manager, self._flow_factory, self._welcome_handler)
+        self.handlers[message_type] = handler
+        self._handler_timers[message_type] = HANDLER_SECONDS.labels(message_type)
+        return handler
         
     def route_message(self, message: Dict[str, Any], base_payload: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Route message to appropriate handler based on message type.
@@ -44,18 +84,21 @@ class MessageRouter:
             handler = self.handlers.get(message_type)
             
             if handler:
+                started = time.perf_counter()
                 try:
                     return handler.handle(message, base_payload)
                 except Exception as e:
-                    print(f"Error in handler for type {message_type}: {str(e)}")
+                    logger.exception("Error in handler for type %s: %s", message_type, e)
                     return self._create_error_response(base_payload["to"], GENERAL['error'])
+                finally:
+                    self._handler_timers[message_type].observe(time.perf_counter() - started)
             
-            print(f"Unhandled message type: {message_type}")
+            logger.warning("Unhandled message type: %s", message_type)
             return self._create_error_response(base_payload["to"], 
                 "סוג ההודעה אינו נתמך כרגע")
             
         except Exception as e:
-            print(f"Error routing message: {str(e)}")
+            logger.exception("Error routing message: %s", e)
             return self._create_error_response(base_payload["to"], GENERAL['error'])
             
     def _create_error_response(self, recipient: str, message: str) -> List[Dict[str, Any]]:
@@ -68,7 +111,4 @@ class MessageRouter:
         Returns:
             List[Dict[str, Any]]: List containing error message payload
         """
-        return [TextMessageHandler(
-            self._conversation_manager,
-            self._flow_factory
-        ).create_text_message(recipient, message)]
\ No newline at end of file
+        return [self.handlers['text'].create_text_message(recipient, message)]
\ No newline at end of file
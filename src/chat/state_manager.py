@@ -1,61 +1,173 @@
-from typing import Dict, Optional
+import threading
+from typing import Dict, Iterator, Optional, Tuple
 
 from ..business.flows.abstract_business_flow import AbstractBusinessFlow
+from ..business.flow_factory import BusinessFlowFactory
+from .conversation_store import ConversationStore
 
 class StateManager:
-    """Responsible for managing business flow states"""
-    
-    def __init__(self):
-        """Initialize state manager"""
+    """Responsible for managing business flow states
+
+    Live flows are cached in memory. When a ConversationStore is configured,
+    every change is written through to it and flows missing from the cache
+    (e.g. after a restart) are restored from it on first access.
+
+    The cache is shared by the dispatcher shards and the expiry sweeper,
+    so it is only read and changed under a lock.
+
+    This is single-process only: cached flows are served without checking
+    the store, so a store must not be shared by bot processes running at
+    the same time. It lets conversations survive a restart, it does not
+    share them across workers.
+    """
+
+    def __init__(self, store: Optional[ConversationStore] = None):
+        """Initialize state manager
+
+        Args:
+            store (Optional[ConversationStore]): Persistent backend, None for memory only
+        """
         self._states: Dict[str, AbstractBusinessFlow] = {}
-        
+        self._store = store
+        # Cached flows per flow name, kept in step with _states
+        self._active_counts: Dict[str, int] = {}
+        # Guards the cache, the counts and the order of store writes
+        self._lock = threading.RLock()
+
+    @property
+    def lock(self) -> threading.RLock:
+        """Lock of the cache, held by callers that change a flow together with its activity"""
+        return self._lock
+
     def set_state(self, user_id: str, flow: AbstractBusinessFlow) -> None:
         """Set the business flow for a user
-        
+
         Args:
             user_id (str): Unique identifier for the user
             flow (AbstractBusinessFlow): The business flow instance
         """
-        self._states[user_id] = flow
-        
+        with self._lock:
+            self._cache(user_id, flow)
+            if self._store is not None:
+                self._store.save(user_id, flow.to_snapshot())
+
+    def save_state(self, user_id: str) -> None:
+        """Write the current state of a user's cached flow through to the store
+
+        Flows are mutated in place while handling input, so callers persist
+        them once the transition is complete.
+
+        Args:
+            user_id (str): Unique identifier for the user
+        """
+        with self._lock:
+            flow = self._states.get(user_id)
+            if flow is not None and self._store is not None:
+                self._store.save(user_id, flow.to_snapshot())
+
     def get_state(self, user_id: str) -> Optional[AbstractBusinessFlow]:
         """Get the current business flow for a user
-        
+
         Args:
             user_id (str): Unique identifier for the user
-            
+
         Returns:
             Optional[AbstractBusinessFlow]: The current flow if exists, None otherwise
         """
-        return self._states.get(user_id)
-        
+        with self._lock:
+            flow = self._states.get(user_id)
+            if flow is None and self._store is not None:
+                flow = self._restore(user_id)
+            return flow
+
     def remove_state(self, user_id: str) -> None:
         """Remove the business flow for a user
-        
+
         Args:
             user_id (str): Unique identifier for the user
         """
-        self._states.pop(user_id, None)
-        
+        with self._lock:
+            self._uncache(user_id)
+            if self._store is not None:
+                self._store.delete(user_id)
+
     def get_flow_state(self, user_id: str) -> Optional[str]:
         """Get the current state of a user's business flow
-        
+
         Args:
             user_id (str): Unique identifier for the user
-            
+
         Returns:
             Optional[str]: Current state if flow exists, None otherwise
         """
         flow = self.get_state(user_id)
         return flow.state if flow else None
-        
+
     def has_active_flow(self, user_id: str) -> bool:
         """Check if a user has an active business flow
-        
+
         Args:
             user_id (str): Unique identifier for the user
-            
+
         Returns:
             bool: True if user has an active flow, False otherwise
         """
-        return user_id in self._states
\ No newline at end of file
+        return self.get_state(user_id) is not None
+
+    def iter_persisted_activity(self) -> Iterator[Tuple[str, float]]:
+        """Iterate over persisted users and the epoch time their flow was last saved
+
+        Returns:
+            Iterator[Tuple[str, float]]: Pairs of user ID and epoch timestamp
+        """
+        if self._store is None:
+            return iter(())
+        return self._store.iter_activity()
+
+    def _restore(self, user_id: str) -> Optional[AbstractBusinessFlow]:
+        """Rebuild a user's flow from the store and cache it; the lock must be held
+
+        Args:
+            user_id (str): Unique identifier for the user
+
+        Returns:
+            Optional[AbstractBusinessFlow]: The restored flow if a record exists
+        """
+        snapshot = self._store.load(user_id)
+        if not snapshot:
+            return None
+        flow = BusinessFlowFactory.from_snapshot(snapshot)
+        if flow is not None:
+            self._cache(user_id, flow)
+        return flow
+
+    def get_active_counts(self) -> Dict[str, int]:
+        """Get the number of cached flows per flow name
+
+        Returns:
+            Dict[str, int]: Active conversations per flow name
+        """
+        with self._lock:
+            return dict(self._active_counts)
+
+    def _cache(self, user_id: str, flow: AbstractBusinessFlow) -> None:
+        """Cache a user's flow, replacing any previous one; the lock must be held
+
+        Args:
+            user_id (str): Unique identifier for the user
+            flow (AbstractBusinessFlow): The business flow instance
+        """
+        self._uncache(user_id)
+        self._states[user_id] = flow
+        name = flow.get_flow_name()
+        self._active_counts[name] = self._active_counts.get(name, 0) + 1
+
+    def _uncache(self, user_id: str) -> None:
+        """Drop a user's flow from the cache; the lock must be held
+
+        Args:
+            user_id (str): Unique identifier for the user
+        """
+        flow = self._states.pop(user_id, None)
+        if flow is not None:
+            self._active_counts[flow.get_flow_name()] -= 1
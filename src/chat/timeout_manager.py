@@ -1,53 +1,216 @@
-from datetime import datetime, timedelta
-from typing import Dict, Optional
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .activity_tracker import ActivityTracker
+
+logger = logging.getLogger(__name__)
 
 class TimeoutManager:
-    """Responsible for managing conversation timeouts"""
-    
-    def __init__(self, timeout_minutes: int = 300):  # Default timeout of 300 minutes (5 hours)
-        self._last_activity: Dict[str, datetime] = {}
-        self._timeout_minutes = timeout_minutes
-        
+    """Responsible for managing conversation timeouts
+
+    Each user has a monotonic deadline. Deadlines are indexed in a min-heap
+    holding at most one live entry per user, so finding expired users costs
+    O(expired log n) instead of a scan over every tracked user. Refreshing
+    activity only updates the deadline; the heap entry is pushed back with
+    the new deadline when it surfaces early.
+    """
+
+    def __init__(self, timeout_minutes: int = 300,  # Default timeout of 300 minutes (5 hours)
+                 clock: Callable[[], float] = time.monotonic,
+                 tracker: Optional[ActivityTracker] = None):
+        """Initialize timeout manager
+
+        Args:
+            timeout_minutes (int): Minutes of inactivity before a conversation expires
+            clock (Callable[[], float]): Monotonic time source in seconds
+            tracker (Optional[ActivityTracker]): Deadline storage backend (a new one by default)
+        """
+        self._timeout_seconds = timeout_minutes * 60.0
+        self._clock = clock
+        self._lock = threading.Lock()
+        # Current deadline of every tracked user
+        self._deadlines = tracker if tracker is not None else ActivityTracker()
+        # Expiry index; an entry is live only while it matches _scheduled
+        self._heap: List[Tuple[float, str]] = []
+        self._scheduled: Dict[str, float] = {}
+
     def update_activity(self, user_id: str) -> None:
         """Update the last activity time for a user
-        
+
         Args:
             user_id (str): Unique identifier for the user
         """
-        self._last_activity[user_id] = datetime.now()
-        
+        with self._lock:
+            self._set_deadline(user_id, self._clock() + self._timeout_seconds)
+
+    def restore_activity(self, user_id: str, last_active: datetime) -> None:
+        """Restore a known last activity time, e.g. for a conversation loaded from storage
+
+        Args:
+            user_id (str): Unique identifier for the user
+            last_active (datetime): Time of the user's last activity
+        """
+        idle_seconds = (datetime.now() - last_active).total_seconds()
+        with self._lock:
+            self._set_deadline(user_id, self._clock() + self._timeout_seconds - idle_seconds)
+
     def is_active(self, user_id: str) -> bool:
         """Check if a conversation is still active (not timed out)
-        
+
         Args:
             user_id (str): Unique identifier for the user
-            
+
         Returns:
             bool: True if the conversation is active, False otherwise
         """
-        last_active = self._last_activity.get(user_id)
-        if not last_active:
-            return False
-            
-        current_time = datetime.now()
-        return (current_time - last_active) <= timedelta(minutes=self._timeout_minutes)
-        
+        deadline = self._deadlines.get(user_id)
+        return deadline is not None and self._clock() <= deadline
+
+    def touch_if_active(self, user_id: str) -> bool:
+        """Extend an active conversation, reading the clock once
+
+        Equivalent to is_active followed by update_activity when active.
+
+        Args:
+            user_id (str): Unique identifier for the user
+
+        Returns:
+            bool: True if the conversation was active and has been extended
+        """
+        now = self._clock()
+        with self._lock:
+            deadline = self._deadlines.get(user_id)
+            if deadline is None or now > deadline:
+                return False
+            # Pushing the deadline later never needs a new heap entry
+            self._deadlines.set(user_id, now + self._timeout_seconds)
+            return True
+
     def remove_activity(self, user_id: str) -> None:
         """Remove activity tracking for a user
-        
+
         Args:
             user_id (str): Unique identifier for the user
         """
-        self._last_activity.pop(user_id, None)
-        
+        with self._lock:
+            self._deadlines.remove(user_id)
+            # The heap entry goes stale and is dropped when it surfaces
+            self._scheduled.pop(user_id, None)
+            self._compact_if_needed()
+
     def get_stale_users(self) -> list[str]:
         """Get list of users with stale conversations
-        
+
+        Users are taken off the expiry index as they are returned; they stay
+        inactive until their activity is updated or removed.
+
         Returns:
             list[str]: List of user IDs with stale conversations
         """
-        current_time = datetime.now()
-        return [
-            user_id for user_id, last_active in self._last_activity.items()
-            if (current_time - last_active) > timedelta(minutes=self._timeout_minutes)
-        ]
\ No newline at end of file
+        now = self._clock()
+        stale = []
+        with self._lock:
+            while self._heap and self._heap[0][0] < now:
+                deadline, user_id = heapq.heappop(self._heap)
+                if self._scheduled.get(user_id) != deadline:
+                    continue
+                del self._scheduled[user_id]
+                current = self._deadlines.get(user_id)
+                if current is None:
+                    continue
+                if current >= now:
+                    # Activity was refreshed since this entry was pushed
+                    self._schedule(user_id, current)
+                else:
+                    stale.append(user_id)
+        return stale
+
+    def next_deadline(self) -> Optional[float]:
+        """Get the earliest scheduled deadline
+
+        Returns:
+            Optional[float]: Clock time of the next possible expiry, None if no users are tracked
+        """
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def _set_deadline(self, user_id: str, deadline: float) -> None:
+        """Record a user's deadline, scheduling it if the index would miss it
+
+        Args:
+            user_id (str): Unique identifier for the user
+            deadline (float): Clock time after which the conversation expires
+        """
+        self._deadlines.set(user_id, deadline)
+        scheduled = self._scheduled.get(user_id)
+        # A later deadline is picked up when the earlier entry surfaces
+        if scheduled is None or deadline < scheduled:
+            self._schedule(user_id, deadline)
+
+    def _schedule(self, user_id: str, deadline: float) -> None:
+        """Push a live heap entry for a user
+
+        Args:
+            user_id (str): Unique identifier for the user
+            deadline (float): Clock time of the entry
+        """
+        self._scheduled[user_id] = deadline
+        heapq.heappush(self._heap, (deadline, user_id))
+        self._compact_if_needed()
+
+    def _compact_if_needed(self) -> None:
+        """Drop stale heap entries once they outnumber the live ones"""
+        if len(self._heap) > 2 * len(self._scheduled) + 64:
+            self._heap = [(deadline, user_id) for user_id, deadline in self._scheduled.items()]
+            heapq.heapify(self._heap)
+
+
+class ExpirySweeper:
+    """Background thread that periodically expires stale conversations"""
+
+    def __init__(self, sweep: Callable[[], None], interval_seconds: float = 60.0,
+                 name: str = 'conversation-sweeper'):
+        """Initialize the sweeper
+
+        Args:
+            sweep (Callable[[], None]): Called on every tick to remove expired conversations
+            interval_seconds (float): Seconds between sweeps
+            name (str): Name of the sweeper thread
+        """
+        self._sweep = sweep
+        self._interval = interval_seconds
+        self._name = name
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the sweeper thread if it is not running yet"""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the sweeper thread
+
+        Args:
+            timeout (Optional[float]): Seconds to wait for the thread to finish
+        """
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        """Sweep until stopped; a failing sweep must not kill the thread"""
+        while not self._stop_event.wait(self._interval):
+            try:
+                self._sweep()
+            except Exception:
+                logger.exception("Conversation expiry sweep failed")
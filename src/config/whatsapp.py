@@ -35,6 +35,8 @@ if DEBUG_PHONE_NUMBER:
 else:
     logger.warning("DEBUG_PHONE_NUMBER not set - Processing messages from all numbers")
 
+_NORMALIZED_DEBUG_NUMBER: str = DEBUG_PHONE_NUMBER.strip().replace("+", "")
+
 def is_debug_number(phone_number: str) -> bool:
     """Check if a phone number is the debug phone number.
     
@@ -44,13 +46,12 @@ def is_debug_number(phone_number: str) -> bool:
     Returns:
         True if DEBUG_PHONE_NUMBER is not set, or if number matches DEBUG_PHONE_NUMBER
     """
-    if not DEBUG_PHONE_NUMBER:
-        logger.warning("DEBUG_PHONE_NUMBER not set - allowing all numbers")
+    # Unset means all numbers are allowed; this is warned about once at import
+    if not _NORMALIZED_DEBUG_NUMBER:
         return True
         
-    normalized_debug = DEBUG_PHONE_NUMBER.strip().replace("+", "")
     normalized_phone = phone_number.strip().replace("+", "")
-    match = normalized_phone == normalized_debug
+    match = normalized_phone == _NORMALIZED_DEBUG_NUMBER
     
     if not match:
         logger.debug("Number %s does not match debug number %s",
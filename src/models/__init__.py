@@ -6,12 +6,15 @@ from .webhook_payload import (
     MediaMessagePayload,
     InteractiveMessagePayload
 )
-from .message_payload import MessagePayloadBuilder
+from .message_payload import MessagePayloadBuilder, CompiledTemplate, PreparedPayload, encode_payload
 
 __all__ = [
     'BaseWebhookPayload',
     'TextMessagePayload',
     'MediaMessagePayload',
     'InteractiveMessagePayload',
-    'MessagePayloadBuilder'
+    'MessagePayloadBuilder',
+    'CompiledTemplate',
+    'PreparedPayload',
+    'encode_payload'
 ]
\ No newline at end of file
@@ -1,5 +1,7 @@
 """Message payload builder for creating standardized message payloads."""
-from typing import Dict, Any, List, Optional
+import json
+from string import Formatter
+from typing import Dict, Any, List, Optional, Tuple
 
 class MessagePayloadBuilder:
     """Builds message payloads for different types of messages."""
@@ -90,4 +92,255 @@ class MessagePayloadBuilder:
             "to": recipient,
             "body": body_text,
             "no_link_preview": True  # Equivalent to preview_url: False
-        }
\ No newline at end of file
+        }
+
+    @staticmethod
+    def create_label_update(recipient: str, add: List[str], remove: List[str]) -> Dict[str, Any]:
+        """Create a label update payload for the labels endpoint
+
+        Args:
+            recipient (str): The chat's phone number
+            add (List[str]): Label IDs to apply
+            remove (List[str]): Label IDs to remove
+
+        Returns:
+            Dict[str, Any]: Label update payload dictionary
+        """
+        return {
+            "messaging_product": "whatsapp",
+            "type": "labels",
+            "to": recipient,
+            "labels": {
+                "add": add,
+                "remove": remove
+            }
+        }
+
+
+def encode_payload(payload: Dict[str, Any]) -> bytes:
+    """Encode a payload as a compact UTF-8 JSON request body
+
+    Args:
+        payload (Dict[str, Any]): Message payload
+
+    Returns:
+        bytes: JSON body, taken as is from prepared payloads
+    """
+    if isinstance(payload, PreparedPayload):
+        return payload.encoded
+    return _encode_json(payload)
+
+
+_FORMATTER = Formatter()
+_TEXT_SECTIONS = ('header', 'body', 'footer')
+
+# Shared encoder; json.dumps would build a new one per call for non-default options
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+def _encode_json(value: Any) -> bytes:
+    """Encode a value as compact UTF-8 JSON (Hebrew text stays 2 bytes per letter)"""
+    return _JSON_ENCODER.encode(value).encode('utf-8')
+
+
+class PreparedPayload(dict):
+    """Payload dict carrying its pre-encoded JSON request body.
+
+    Every dict method that changes top-level keys drops the cached body so
+    it is re-encoded on demand; nested values must not be mutated.
+    """
+
+    __slots__ = ('_encoded',)
+
+    def __init__(self, payload: Dict[str, Any], encoded: Optional[bytes] = None):
+        """Wrap a payload and its encoded body
+
+        Args:
+            payload (Dict[str, Any]): Message payload
+            encoded (Optional[bytes]): JSON body matching the payload, None to encode lazily
+        """
+        super().__init__(payload)
+        self._encoded = encoded
+
+    @property
+    def encoded(self) -> bytes:
+        """UTF-8 JSON body of the payload"""
+        if self._encoded is None:
+            self._encoded = _encode_json(dict(self))
+        return self._encoded
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._encoded = None
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        self._encoded = None
+        super().__delitem__(key)
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        self._encoded = None
+        super().update(*args, **kwargs)
+
+    def pop(self, *args: Any) -> Any:
+        self._encoded = None
+        return super().pop(*args)
+
+    def popitem(self) -> Tuple[str, Any]:
+        self._encoded = None
+        return super().popitem()
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        if key not in self:
+            self._encoded = None
+        return super().setdefault(key, default)
+
+    def clear(self) -> None:
+        self._encoded = None
+        super().clear()
+
+    def __ior__(self, other: Any) -> "PreparedPayload":
+        self._encoded = None
+        return super().__ior__(other)
+
+
+class CompiledTemplate:
+    """Interactive message template pre-built into a payload skeleton.
+
+    The skeleton is built once by MessagePayloadBuilder. Rendering copies
+    only the top-level dict, sets the recipient and re-creates the sections
+    whose text has placeholders; the remaining nested parts (e.g. buttons)
+    are shared between payloads and must be treated as read-only.
+
+    The skeleton's JSON is also encoded once and split into UTF-8 fragments
+    around the recipient and each placeholder, so a rendered payload's
+    request body is the constant fragments joined with the encoded values;
+    the template text itself is never encoded again.
+    """
+
+    __slots__ = ('_skeleton', '_dynamic_sections', '_fields', '_fragments')
+
+    def __init__(
+        self,
+        body_text: str,
+        header_text: str = None,
+        footer_text: str = None,
+        buttons: List[Dict[str, str]] = None
+    ):
+        """Compile an interactive message template
+
+        Args:
+            body_text (str): Message body text, may contain str.format fields
+            header_text (str, optional): Message header text, may contain str.format fields
+            footer_text (str, optional): Message footer text, may contain str.format fields
+            buttons (List[Dict[str, str]], optional): List of button objects with 'id' and 'title'
+        """
+        self._skeleton = MessagePayloadBuilder.create_interactive_message(
+            recipient=None,
+            body_text=body_text,
+            header_text=header_text,
+            footer_text=footer_text,
+            buttons=buttons
+        )
+        self._dynamic_sections: Tuple[Tuple[str, str], ...] = tuple(
+            (section, self._skeleton[section]['text'])
+            for section in self._skeleton  # Document order, as encoded
+            if section in _TEXT_SECTIONS and _has_fields(self._skeleton[section]['text'])
+        )
+        self._fields, self._fragments = self._encode_fragments()
+
+    @classmethod
+    def from_template(cls, template: Dict[str, Any]) -> "CompiledTemplate":
+        """Compile a response template with 'header', 'body', 'footer' and button titles
+
+        Button titles are taken from 'buttons', or from 'options' for templates
+        that group them there, and get their index as quick reply ID.
+
+        Args:
+            template (Dict[str, Any]): Response template
+
+        Returns:
+            CompiledTemplate: The compiled template
+        """
+        titles = template.get('buttons')
+        if titles is None:
+            titles = template.get('options', {}).get('buttons')
+        buttons = [
+            {"id": str(idx), "title": title}  # WhatsApp requires unique IDs
+            for idx, title in enumerate(titles)
+        ] if titles else None
+        return cls(
+            body_text=template.get('body', ''),
+            header_text=template.get('header', ''),
+            footer_text=template.get('footer', ''),
+            buttons=buttons
+        )
+
+    def render(self, recipient: str, **fields: Any) -> "PreparedPayload":
+        """Create a payload for a recipient
+
+        Args:
+            recipient (str): The recipient's phone number
+            **fields: Values for the placeholders in the template text
+
+        Returns:
+            PreparedPayload: Message payload dictionary with its encoded body
+        """
+        payload = PreparedPayload(self._skeleton)
+        dict.__setitem__(payload, "to", recipient)
+        for section, text in self._dynamic_sections:
+            dict.__setitem__(payload, section, {"text": text.format(**fields)})
+
+        fragments = self._fragments
+        parts = [fragments[0], _encode_json(recipient), fragments[1]]
+        for index, (name, conversion, spec) in enumerate(self._fields, 2):
+            value = _FORMATTER.convert_field(fields[name], conversion)
+            # Inside an already quoted JSON string, so drop the value's own quotes
+            parts.append(_encode_json(format(value, spec))[1:-1])
+            parts.append(fragments[index])
+        payload._encoded = b''.join(parts)
+        return payload
+
+    def _encode_fragments(self) -> Tuple[Tuple[Tuple[str, Optional[str], str], ...], Tuple[bytes, ...]]:
+        """Encode the skeleton with markers in its slots and split it around them
+
+        The first slot is the recipient; the others are the placeholders of the
+        dynamic sections, in document order.
+
+        Returns:
+            Tuple: Placeholder (name, conversion, format spec) triples and the
+                constant fragments; slot i goes between fragments i and i + 1
+        """
+        fields = []
+        probe = dict(self._skeleton)
+        probe["to"] = '\x00to\x00'
+        markers = [_encode_json(probe["to"])]
+        for section, text in self._dynamic_sections:
+            pieces = []
+            for literal, name, spec, conversion in _FORMATTER.parse(text):
+                pieces.append(literal)
+                if name is not None:
+                    marker = '\x00field%d\x00' % len(fields)
+                    fields.append((name, conversion, spec or ''))
+                    markers.append(_encode_json(marker)[1:-1])
+                    pieces.append(marker)
+            probe[section] = {"text": ''.join(pieces)}
+
+        remaining = _encode_json(probe)
+        fragments = []
+        for marker in markers:
+            head, remaining = remaining.split(marker, 1)
+            fragments.append(head)
+        fragments.append(remaining)
+        return tuple(fields), tuple(fragments)
+
+
+def _has_fields(text: str) -> bool:
+    """Check whether a text contains str.format fields
+
+    Args:
+        text (str): Text to inspect
+
+    Returns:
+        bool: True if the text has at least one replacement field
+    """
+    return any(field is not None for _, field, _, _ in _FORMATTER.parse(text))
@@ -0,0 +1,160 @@
+"""Unit tests for the asyncio WhatsApp client and its background loop."""
+import asyncio
+import aiohttp
+import pytest
+from ..models.message_payload import MessagePayloadBuilder, encode_payload
+from ..utils.errors import WhatsAppAPIError, WhatsAppRateLimitError
+from ..whatsapp import async_client
+from ..whatsapp.async_client import AsyncWhatsAppClient, BackgroundEventLoop
+from ..whatsapp.config import get_api_url
+from ..whatsapp.rate_limiter import RateLimiter, RetryPolicy
+
+TEXT_PAYLOAD = MessagePayloadBuilder.create_text_message('972500000001', 'שלום')
+
+class FakeResponse:
+    """aiohttp response stub"""
+
+    def __init__(self, status, headers=None):
+        self.status = status
+        self.headers = headers or {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def json(self, content_type=None):
+        return {'sent': True}
+
+    async def text(self):
+        return 'error'
+
+    def raise_for_status(self):
+        raise aiohttp.ClientResponseError(None, (), status=self.status)
+
+
+class FakeSession:
+    """aiohttp session stub answering posts from a list of statuses or errors"""
+
+    def __init__(self, responses=None, **kwargs):
+        self.responses = list(responses or [])
+        self.kwargs = kwargs
+        self.posts = []
+        self.closed = False
+
+    def post(self, url, data=None):
+        self.posts.append((url, data))
+        response = self.responses.pop(0) if self.responses else 200
+        if isinstance(response, Exception):
+            raise response
+        return FakeResponse(*response) if isinstance(response, tuple) else FakeResponse(response)
+
+    async def close(self):
+        self.closed = True
+
+
+class TestAsyncWhatsAppClient:
+    """Test cases for pooled sending, retries and error mapping"""
+
+    @pytest.fixture
+    def client(self):
+        """Client without backoff delays"""
+        return AsyncWhatsAppClient(
+            rate_limiter=RateLimiter(recipient_rate=1000, recipient_burst=1000),
+            retry_policy=RetryPolicy(max_retries=2, base_delay=0.001, max_delay=0.001)
+        )
+
+    def test_session_is_reused_and_closed(self, client, monkeypatch):
+        """Test sends share one pooled session until the client is closed"""
+        sessions = []
+
+        def create_session(**kwargs):
+            sessions.append(FakeSession(**kwargs))
+            return sessions[-1]
+
+        monkeypatch.setattr(async_client.aiohttp, 'ClientSession', create_session)
+        monkeypatch.setattr(async_client.aiohttp, 'TCPConnector', lambda **kwargs: kwargs)
+
+        async def run():
+            async with client:
+                results = await client.send_messages([TEXT_PAYLOAD, {}, TEXT_PAYLOAD])
+            await client.send_message(TEXT_PAYLOAD)
+            await client.close()
+            return results
+
+        assert asyncio.run(run()) == [{'sent': True}, {'sent': True}]
+        assert len(sessions) == 2
+        assert len(sessions[0].posts) == 2 and sessions[0].closed
+        assert sessions[0].kwargs['connector']['limit'] == client._max_connections
+        assert sessions[0].posts[0][1] == encode_payload(TEXT_PAYLOAD)
+        assert sessions[1].closed
+
+    def test_retries_server_errors(self, client):
+        """Test 5xx responses and connection errors are retried"""
+        client._session = FakeSession([503, aiohttp.ClientConnectionError('reset'), 200])
+
+        assert asyncio.run(client.send_message(TEXT_PAYLOAD)) == {'sent': True}
+        assert len(client._session.posts) == 3
+
+    def test_persistent_rate_limit_raises(self, client):
+        """Test a 429 that outlasts the retries raises with the server's retry hint"""
+        client._session = FakeSession([429, 429, (429, {'Retry-After': '0.01'})])
+
+        with pytest.raises(WhatsAppRateLimitError) as error:
+            asyncio.run(client.send_message(TEXT_PAYLOAD))
+        assert error.value.status_code == 429
+        assert error.value.retry_after == 0.01
+        assert len(client._session.posts) == 3
+
+    def test_unreachable_api_raises(self, client):
+        """Test connection errors that outlast the retries raise WhatsAppAPIError"""
+        client._session = FakeSession([aiohttp.ClientConnectionError('down')] * 3)
+
+        with pytest.raises(WhatsAppAPIError):
+            asyncio.run(client.send_message(TEXT_PAYLOAD))
+
+    def test_client_errors_are_not_retried(self, client):
+        """Test non-retryable error responses raise at once"""
+        client._session = FakeSession([400])
+
+        with pytest.raises(aiohttp.ClientResponseError):
+            asyncio.run(client.send_message(TEXT_PAYLOAD))
+        assert len(client._session.posts) == 1
+
+
+class TestBackgroundEventLoop:
+    """Test cases for the long-lived sender loop"""
+
+    def test_coroutines_share_one_loop(self):
+        """Test submitted coroutines run on the same loop until it is stopped"""
+        async def current_loop():
+            return asyncio.get_running_loop()
+
+        background = BackgroundEventLoop()
+        first = background.submit(current_loop()).result(timeout=1)
+        second = background.submit(current_loop()).result(timeout=1)
+        background.stop(timeout=1)
+
+        assert first is second
+        assert background._thread is None
+
+
+class TestAsyncWebhook:
+    """Test cases for replies sent through /hook/async"""
+
+    def test_replies_are_sent_through_the_async_client(self, monkeypatch):
+        """Test the async webhook routes a message and posts its reply on the pooled session"""
+        import app as app_module
+
+        session = FakeSession()
+        monkeypatch.setattr(app_module.async_whatsapp_client, '_session', session)
+        # Label updates go through the synchronous client
+        monkeypatch.setattr(app_module.whatsapp_client.session, 'post', lambda *args, **kwargs: None)
+
+        message = {'id': 'async-1', 'from': '972500000009', 'type': 'text', 'text': {'body': 'שלום'}}
+        response = app_module.app.test_client().post('/hook/async', json={'messages': [message]})
+
+        assert response.status_code == 200
+        assert [url for url, _ in session.posts] == [get_api_url('interactive')]
+        assert b'972500000009' in session.posts[0][1]
@@ -0,0 +1,68 @@
+"""Unit tests for persistent conversation storage."""
+import pytest
+from ..chat.conversation_store import InMemoryConversationStore, SQLiteConversationStore
+from ..chat.conversation_manager import ConversationManager
+from ..chat.state_manager import StateManager
+from ..business.flows.moving_flow import MovingFlow
+
+class TestConversationStore:
+    """Test cases for conversation storage backends"""
+
+    @pytest.fixture(params=['memory', 'sqlite'])
+    def store(self, request, tmp_path):
+        """Store fixture covering every backend"""
+        if request.param == 'memory':
+            store = InMemoryConversationStore()
+        else:
+            store = SQLiteConversationStore(str(tmp_path / 'conversations.db'))
+        yield store
+        store.close()
+
+    @pytest.fixture
+    def flow(self):
+        """Moving flow with collected details"""
+        flow = MovingFlow()
+        flow.set_recipient('972500000001')
+        flow.handle_input('אריזת הבית')
+        flow.handle_input('רחוב הרצל 5, תל אביב')
+        flow.set_flow_data('source', 'webhook')
+        return flow
+
+    def test_save_load_delete(self, store, flow):
+        """Test snapshots round-trip through the store"""
+        store.save('972500000001', flow.to_snapshot())
+
+        restored = MovingFlow.from_snapshot(store.load('972500000001'))
+        assert restored.state == 'awaiting_verification'
+        assert restored._service_type == 'packing_only'
+        assert restored.get_flow_data() == {'source': 'webhook'}
+        assert [user for user, _ in store.iter_activity()] == ['972500000001']
+
+        store.delete('972500000001')
+        assert store.load('972500000001') is None
+
+    def test_state_manager_restores_flow(self, store, flow):
+        """Test a new state manager rebuilds flows from the store"""
+        StateManager(store).set_state('972500000001', flow)
+
+        restored = StateManager(store).get_state('972500000001')
+        assert isinstance(restored, MovingFlow)
+        assert restored.state == 'awaiting_verification'
+        assert restored.get_recipient() == '972500000001'
+        assert restored._customer_details == 'רחוב הרצל 5, תל אביב'
+
+    def test_flows_have_no_instance_dict(self, flow):
+        """Test flows are slotted and share their handler tables"""
+        assert not hasattr(flow, '__dict__')
+        assert MovingFlow()._STATE_HANDLERS is flow._STATE_HANDLERS
+
+    def test_conversation_survives_restart(self, tmp_path):
+        """Test conversations stay active after the process restarts"""
+        path = str(tmp_path / 'conversations.db')
+        manager = ConversationManager(store=SQLiteConversationStore(path))
+        manager.start_conversation('972500000001', 'moving')
+
+        restarted = ConversationManager(store=SQLiteConversationStore(path))
+        flow = restarted.get_conversation('972500000001')
+        assert flow is not None
+        assert flow.get_flow_name() == 'moving'
@@ -0,0 +1,62 @@
+"""Unit tests for webhook message deduplication."""
+import pytest
+from ..chat.deduplicator import MessageDeduplicator, SQLiteSeenMessageStore
+
+class FakeClock:
+    """Manually advanced epoch clock"""
+
+    def __init__(self):
+        self.now = 1700000000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestMessageDeduplicator:
+    """Test cases for the message ID idempotency cache"""
+
+    @pytest.fixture
+    def clock(self):
+        """Clock fixture"""
+        return FakeClock()
+
+    def test_detects_redelivery(self, clock):
+        """Test the second delivery of a message is reported as duplicate"""
+        dedup = MessageDeduplicator(ttl_seconds=60, clock=clock)
+
+        assert not dedup.is_duplicate('msg1')
+        assert dedup.is_duplicate('msg1')
+        assert not dedup.is_duplicate('msg2')
+        assert dedup.get_stats() == {'hits': 1, 'misses': 2, 'size': 2}
+
+    def test_ttl_and_capacity_eviction(self, clock):
+        """Test IDs are evicted after the TTL and beyond capacity"""
+        dedup = MessageDeduplicator(ttl_seconds=60, max_entries=2, clock=clock)
+        dedup.is_duplicate('msg1')
+        clock.now += 61
+        assert not dedup.is_duplicate('msg1')
+
+        dedup.is_duplicate('msg2')
+        dedup.is_duplicate('msg3')
+        assert dedup.get_stats()['size'] == 2
+        assert not dedup.is_duplicate('msg1')
+
+    def test_forget(self, clock):
+        """Test forgotten IDs are processed again"""
+        dedup = MessageDeduplicator(clock=clock)
+        dedup.is_duplicate('msg1')
+        dedup.forget('msg1')
+        assert not dedup.is_duplicate('msg1')
+
+    def test_persistent_store_survives_restart(self, clock, tmp_path):
+        """Test IDs recorded by a previous run are still recognized"""
+        path = str(tmp_path / 'dedup.db')
+        first = MessageDeduplicator(ttl_seconds=60, store=SQLiteSeenMessageStore(path), clock=clock)
+        assert not first.is_duplicate('msg1')
+
+        restarted = MessageDeduplicator(ttl_seconds=60, store=SQLiteSeenMessageStore(path), clock=clock)
+        assert restarted.is_duplicate('msg1')
+
+        clock.now += 120
+        restarted = MessageDeduplicator(ttl_seconds=60, store=SQLiteSeenMessageStore(path), clock=clock)
+        assert not restarted.is_duplicate('msg1')
@@ -0,0 +1,102 @@
+"""Unit tests for the sharded message dispatcher and ingestion queue."""
+import threading
+from concurrent.futures import Future
+import pytest
+from ..chat.dispatcher import ShardedDispatcher
+from ..chat.ingestion_queue import WebhookIngestionQueue, IngestionQueueFullError
+
+class TestShardedDispatcher:
+    """Test cases for per-user ordered dispatching"""
+
+    @pytest.fixture
+    def dispatcher(self):
+        """Dispatcher fixture"""
+        dispatcher = ShardedDispatcher(num_shards=4)
+        dispatcher.start()
+        yield dispatcher
+        dispatcher.stop(timeout=1)
+
+    def test_same_key_runs_in_order(self, dispatcher):
+        """Test work for one user is applied in submission order"""
+        applied = []
+        futures = [
+            dispatcher.submit('972500000001', applied.append, index)
+            for index in range(200)
+        ]
+        for future in futures:
+            future.result(timeout=1)
+
+        assert applied == list(range(200))
+
+    def test_same_key_maps_to_same_shard(self, dispatcher):
+        """Test shard selection is stable for a key"""
+        assert dispatcher.shard_for('972500000001') == dispatcher.shard_for('972500000001')
+
+    def test_different_keys_run_in_parallel(self, dispatcher):
+        """Test users on different shards do not block each other"""
+        keys = ['user_a', 'user_b']
+        while dispatcher.shard_for(keys[0]) == dispatcher.shard_for(keys[1]):
+            keys[1] += '_'
+        release = threading.Event()
+
+        blocked = dispatcher.submit(keys[0], release.wait, 2)
+        # Completes while the first shard is still blocked
+        assert dispatcher.submit(keys[1], lambda: 'done').result(timeout=1) == 'done'
+
+        release.set()
+        assert blocked.result(timeout=1) is True
+
+    def test_exception_is_set_on_future(self, dispatcher):
+        """Test errors are reported through the returned future"""
+        def fail():
+            raise ValueError('boom')
+
+        with pytest.raises(ValueError):
+            dispatcher.submit('user', fail).result(timeout=1)
+
+
+class TestWebhookIngestionQueue:
+    """Test cases for the asynchronous ingestion queue"""
+
+    def test_messages_are_processed_and_measured(self):
+        """Test enqueued messages are routed, sent and counted"""
+        sent = []
+        dispatcher = ShardedDispatcher(num_shards=2)
+        ingestion = WebhookIngestionQueue(
+            lambda message: sent.append({'to': message['from'], 'body': message['id']}),
+            dispatcher
+        )
+        ingestion.start()
+
+        messages = [{'id': str(i), 'from': 'user'} for i in range(5)]
+        assert ingestion.enqueue(messages) == 5
+        ingestion.stop(timeout=1)
+
+        assert [payload['body'] for payload in sent] == ['0', '1', '2', '3', '4']
+        metrics = ingestion.get_metrics()
+        assert metrics['enqueued'] == 5
+        assert metrics['processed'] == 5
+        assert metrics['queue_depth'] == 0
+
+    def test_full_queue_rejects(self):
+        """Test a full shard queue rejects instead of blocking the webhook"""
+        # Workers are not started, so the queue fills up
+        dispatcher = ShardedDispatcher(num_shards=1, max_queue_size=1)
+        ingestion = WebhookIngestionQueue(lambda message: None, dispatcher)
+
+        with pytest.raises(IngestionQueueFullError):
+            ingestion.enqueue([{'from': 'user'}, {'from': 'user'}])
+        assert ingestion.get_metrics()['rejected'] == 1
+
+    def test_latency_recorded_after_pipelined_send(self):
+        """Test latency covers sends that complete after the worker moves on"""
+        send_future = Future()
+        dispatcher = ShardedDispatcher(num_shards=1)
+        ingestion = WebhookIngestionQueue(lambda message: [send_future], dispatcher)
+        ingestion.start()
+        ingestion.enqueue([{'from': 'user'}])
+        ingestion.stop(timeout=1)
+        assert ingestion.get_metrics()['processed'] == 0
+
+        send_future.set_result({})
+        assert ingestion.get_metrics()['processed'] == 1
@@ -0,0 +1,80 @@
+"""Unit tests for vectorized flow analytics."""
+from datetime import datetime, timedelta
+import pytest
+from ..utils.flow_analytics import FlowAnalytics
+from ..utils.state_monitor import StateTransition, StateTransitionMonitor
+
+START = datetime(2024, 1, 1, 12, 0, 0)
+
+def _transitions(rows):
+    """Build transitions from (user, from, to, minutes after START, duration minutes) rows"""
+    return [
+        StateTransition(
+            user_id=user, from_state=from_state, to_state=to_state,
+            timestamp=START + timedelta(minutes=minutes), flow_type='moving',
+            duration=timedelta(minutes=duration) if duration else None
+        )
+        for user, from_state, to_state, minutes, duration in rows
+    ]
+
+class TestFlowAnalytics:
+    """Test cases for funnels, dwell times, drop-off and cohorts"""
+
+    @pytest.fixture
+    def analytics(self):
+        """Three users: one completes, one stops at photos, one stops at the start"""
+        return FlowAnalytics.from_transitions(_transitions([
+            ('user1', 'initial', 'awaiting_packing_choice', 0, None),
+            ('user1', 'awaiting_packing_choice', 'awaiting_photos', 2, 2),
+            ('user1', 'awaiting_photos', 'completed', 6, 4),
+            ('user2', 'initial', 'awaiting_packing_choice', 1, None),
+            ('user2', 'awaiting_packing_choice', 'awaiting_photos', 11, 10),
+            ('user3', 'initial', 'awaiting_packing_choice', 60 * 24 * 8, None),
+        ]))
+
+    def test_funnel(self, analytics):
+        """Test users are counted at each step they reached in order"""
+        funnel = analytics.funnel(['initial', 'awaiting_packing_choice', 'awaiting_photos', 'completed'])
+
+        assert [step['users'] for step in funnel] == [3, 3, 2, 1]
+        assert funnel[2]['conversion'] == pytest.approx(2 / 3)
+        assert funnel[3]['conversion_from_start'] == pytest.approx(1 / 3)
+
+    def test_dwell_percentiles(self, analytics):
+        """Test percentiles of time spent per state"""
+        dwell = analytics.dwell_percentiles(percentiles=(50, 100))
+
+        assert dwell['awaiting_packing_choice'] == {'count': 2, 'p50': 360.0, 'p100': 600.0}
+        assert dwell['awaiting_photos']['p50'] == 240.0
+        assert 'initial' not in dwell
+
+    def test_drop_off(self, analytics):
+        """Test abandonment is counted in the last state of idle users"""
+        drop_off = analytics.drop_off(abandon_after=timedelta(days=1))
+
+        assert drop_off['awaiting_photos'] == {'entered': 2, 'abandoned': 1, 'rate': 0.5}
+        # user3 was active at the reference time (the latest transition)
+        assert drop_off['awaiting_packing_choice']['abandoned'] == 0
+        assert drop_off['completed']['abandoned'] == 0
+
+    def test_cohorts(self, analytics):
+        """Test completion is broken down by the period users started in"""
+        cohorts = analytics.cohorts(period=timedelta(days=7))
+
+        assert [(c['users'], c['completed']) for c in cohorts] == [(2, 1), (1, 0)]
+        assert cohorts[0]['completion_rate'] == 0.5
+
+    def test_flow_metrics_match_monitor(self):
+        """Test batch flow metrics equal the monitor's incremental ones"""
+        times = iter([START + timedelta(minutes=i * 3) for i in range(5)])
+        monitor = StateTransitionMonitor(clock=lambda: next(times))
+        for user_id, from_state, to_state in [
+            ('user1', 'initial', 'awaiting_packing_choice'),
+            ('user1', 'awaiting_packing_choice', 'awaiting_verification'),
+            ('user1', 'awaiting_verification', 'completed'),
+            ('user2', 'initial', 'awaiting_packing_choice'),
+            ('user2', 'awaiting_packing_choice', 'initial'),
+        ]:
+            monitor.log_transition(user_id, from_state, to_state, 'moving')
+
+        assert monitor.get_analytics().flow_metrics('moving') == monitor.get_flow_metrics('moving')
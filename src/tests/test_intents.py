@@ -0,0 +1,74 @@
+"""Unit tests for the button title intent index."""
+import unicodedata
+import pytest
+from ..business.intents import (
+    INTENTS,
+    NO_INTENT,
+    IntentIndex,
+    normalize_title,
+    START_FLOW,
+    SELECT_MOVING_SERVICE,
+    SELECT_SLOT,
+    SKIP_PHOTOS,
+    TALK_TO_REPRESENTATIVE
+)
+from ..business.messages import NAVIGATION, DEFAULT_TIME_SLOTS
+from ..business.flows.moving_flow import MovingFlow
+from ..chat.handlers.abstract_message_handler import AbstractMessageHandler
+
+class TestIntentIndex:
+    """Test cases for classifying titles"""
+
+    def test_titles_map_to_intent_and_payload(self):
+        """Test configured titles classify to their intent with payload"""
+        slot = list(DEFAULT_TIME_SLOTS.values())[2]
+        assert INTENTS.classify('מעבר דירה') == (START_FLOW, 'moving')
+        assert INTENTS.classify('ליווי מלא - אריזה וסידור') == (SELECT_MOVING_SERVICE, 'both')
+        assert INTENTS.classify(NAVIGATION['talk_to_representative']) == (TALK_TO_REPRESENTATIVE, None)
+        assert INTENTS.classify(slot) == (SELECT_SLOT, slot)
+        assert INTENTS.classify('מעדיפים לדלג') == (SKIP_PHOTOS, None)
+        assert INTENTS.classify('free text') is NO_INTENT
+        assert INTENTS.classify({'id': 'media'}) is NO_INTENT
+
+    def test_whitespace_and_unicode_variants_match(self):
+        """Test padding, repeated spaces, direction marks and normalization forms are tolerated"""
+        title = NAVIGATION['back_to_main']
+        variants = [
+            f'  {title}\n',
+            title.replace(' ', '  '),
+            '\u200f' + title + '\u200e',
+            unicodedata.normalize('NFD', title),
+            title.replace(' ', '\u00a0'),
+        ]
+        for variant in variants:
+            assert INTENTS.classify(variant) == INTENTS.classify(title)
+        assert normalize_title(' Yes PLEASE ') == 'yes please'
+
+    def test_conflicting_titles_are_rejected(self):
+        """Test a title cannot be indexed with two intents"""
+        index = IntentIndex()
+        index.add('כן', 'yes')
+        index.add(' כן ', 'yes')
+        with pytest.raises(ValueError):
+            index.add('כן', 'no')
+
+
+class TestFlowInput:
+    """Test cases for the input flows receive"""
+
+    def test_message_input_extraction(self):
+        """Test buttons, text and media messages yield title, body and media data"""
+        photo = {'id': 'p1', 'mime_type': 'image/jpeg'}
+        assert AbstractMessageHandler.get_flow_input(
+            {'type': 'interactive', 'interactive': {'button_reply': {'title': 'דלג'}}}) == 'דלג'
+        assert AbstractMessageHandler.get_flow_input({'type': 'text', 'text': {'body': 'שלום'}}) == 'שלום'
+        assert AbstractMessageHandler.get_flow_input({'type': 'image', 'image': photo}) == photo
+
+    def test_flow_accepts_normalized_buttons(self):
+        """Test the moving flow follows buttons whose titles arrive with extra marks"""
+        flow = MovingFlow()
+        assert flow.handle_input('\u200fאריזת הבית ') == 'awaiting_packing_choice'
+        assert flow._service_type == 'packing_only'
+
+        flow._conversation_state = 'awaiting_photos'
+        assert flow.handle_input('מעדיפים  לדלג') == 'awaiting_slot_selection'
@@ -0,0 +1,56 @@
+"""Unit tests for the bidirectional label index."""
+from datetime import datetime, timedelta
+import pytest
+from ..chat.conversation_manager import ConversationManager
+from ..whatsapp.label_index import LabelIndex
+
+class TestLabelIndex:
+    """Test cases for lookups by user and by label"""
+
+    @pytest.fixture
+    def index(self):
+        """Index fixture whose clock advances a minute per call"""
+        times = (datetime(2024, 1, 1) + timedelta(minutes=i) for i in range(1000))
+        return LabelIndex(clock=lambda: next(times))
+
+    def test_both_directions_stay_consistent(self, index):
+        """Test adds and removes are reflected by user and by label"""
+        index.add('1', 'waiting_urgent_support')
+        index.add('1', 'moving')
+        index.add('2', 'waiting_urgent_support')
+        index.remove('1', 'waiting_urgent_support')
+
+        assert set(index.get_labels('1')) == {'moving'}
+        assert [user for user, _ in index.get_users('waiting_urgent_support')] == ['2']
+        assert index.get_counts() == {'moving': 1, 'waiting_urgent_support': 1}
+
+        index.remove_all('1')
+        index.remove('2', 'waiting_urgent_support')
+        assert '1' not in index
+        assert index.get_counts() == {}
+        assert index.get_users('moving') == []
+
+    def test_pages_keep_application_order_and_time(self, index):
+        """Test pages list chats oldest first and re-applying keeps the original time"""
+        for user in ('a', 'b', 'c', 'd'):
+            index.add(user, 'waiting_call_before_quote')
+        index.add('a', 'waiting_call_before_quote')
+
+        first = index.get_users('waiting_call_before_quote', limit=2)
+        second = index.get_users('waiting_call_before_quote', offset=2, limit=2)
+
+        assert first == [('a', datetime(2024, 1, 1, 0, 0)), ('b', datetime(2024, 1, 1, 0, 1))]
+        assert [user for user, _ in second] == ['c', 'd']
+        assert index.count('waiting_call_before_quote') == 4
+
+    def test_label_manager_and_conversations_use_the_index(self):
+        """Test labels applied through conversations can be listed by label"""
+        manager = ConversationManager()
+        manager.start_conversation('123', 'moving')
+        manager.handle_support_request('456')
+
+        assert [user for user, _ in manager.get_labelled_chats('bot_new_conversation')] == ['123']
+        assert manager.count_labelled_chats('waiting_urgent_support') == 1
+
+        manager.remove_conversation('123')
+        assert manager.get_labelled_chats('bot_new_conversation') == []
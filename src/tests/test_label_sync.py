@@ -0,0 +1,212 @@
+"""Unit tests for label sync with the WhatsApp labels endpoint."""
+import pytest
+from ..chat.conversation_manager import ConversationManager
+from ..whatsapp.label_manager import LabelManager
+from ..whatsapp.label_queue import LabelWriteBehindQueue
+from ..whatsapp.label_sync import LabelSyncEngine
+from ..whatsapp.utils.validators import validate_outbound_payload
+
+LABEL_IDS = {
+    'bot_new_conversation': 'L1',
+    'waiting_urgent_support': 'L2',
+    'waiting_call_before_quote': 'L3',
+    'moving': 'L4',
+    'organization': '',
+}
+
+class TestLabelSync:
+    """Test cases for label diffing and call merging"""
+
+    @pytest.fixture
+    def sent(self):
+        """Payloads sent by the engine"""
+        return []
+
+    @pytest.fixture
+    def engine(self, sent):
+        """Engine fixture recording payloads instead of sending them"""
+        return LabelSyncEngine(sent.append, LABEL_IDS)
+
+    def test_first_sync_resets_other_managed_labels(self, engine, sent):
+        """Test an unknown remote state is cleared of every undesired label with an ID"""
+        assert engine.sync('123', {'moving', 'organization'})
+
+        assert len(sent) == 1
+        assert validate_outbound_payload(sent[0]) == 'labels'
+        assert sent[0]['to'] == '123'
+        assert sent[0]['labels'] == {'add': ['L4'], 'remove': ['L1', 'L2', 'L3']}
+        assert engine.get_remote_labels('123') == frozenset({'moving'})
+
+    def test_only_net_changes_are_sent(self, engine, sent):
+        """Test known remote state yields the net diff, or no call at all"""
+        engine.sync('123', {'bot_new_conversation'})
+        sent.clear()
+
+        assert not engine.sync('123', {'bot_new_conversation'})
+        assert engine.sync('123', {'bot_new_conversation', 'moving'})
+
+        assert sent == [{
+            'messaging_product': 'whatsapp',
+            'type': 'labels',
+            'to': '123',
+            'labels': {'add': ['L4'], 'remove': []}
+        }]
+        assert engine.get_stats() == {'calls': 2, 'skipped': 1, 'tracked_chats': 1}
+
+    def test_manager_merges_changes_into_one_call(self, engine, sent):
+        """Test remove_all_labels followed by apply_label costs a single call"""
+        manager = LabelManager(engine)
+        manager.apply_label('123', 'bot_new_conversation')
+        manager.sync('123')
+        sent.clear()
+
+        manager.remove_all_labels('123')
+        manager.apply_label('123', 'waiting_urgent_support')
+        assert manager.sync('123') == 1
+        assert sent[0]['labels'] == {'add': ['L2'], 'remove': ['L1']}
+
+        # Changes that cancel out send nothing
+        manager.remove_all_labels('123')
+        manager.apply_label('123', 'waiting_urgent_support')
+        assert manager.sync('123') == 0
+        assert len(sent) == 1
+        assert manager.get_pending_users() == set()
+
+    def test_failed_sync_is_retried(self, sent):
+        """Test a failed call leaves the user dirty and the remote state unchanged"""
+        def fail_once(payload):
+            if not sent:
+                sent.append(None)
+                raise ConnectionError("API down")
+            sent.append(payload)
+
+        engine = LabelSyncEngine(fail_once, LABEL_IDS)
+        manager = LabelManager(engine)
+        manager.apply_label('123', 'moving')
+
+        assert manager.sync() == 0
+        assert manager.get_pending_users() == {'123'}
+        assert engine.get_remote_labels('123') is None
+
+        assert manager.sync() == 1
+        assert sent[1]['labels']['add'] == ['L4']
+        assert manager.get_pending_users() == set()
+
+    def test_conversation_manager_syncs_after_transitions(self, engine, sent):
+        """Test starting and removing a conversation each send one label call"""
+        manager = ConversationManager(label_sync=engine)
+        manager.start_conversation('123', 'moving')
+        manager.remove_conversation('123')
+
+        assert [payload['labels'] for payload in sent] == [
+            {'add': ['L1'], 'remove': ['L2', 'L3', 'L4']},
+            {'add': [], 'remove': ['L1']},
+        ]
+
+    def test_expiry_keeps_staff_labels(self, engine, sent):
+        """Test the expiry sweep clears bot labels but keeps chats waiting for staff listed"""
+        manager = ConversationManager(timeout_minutes=0, label_sync=engine)
+        manager.start_conversation('123', 'moving')
+        manager.start_conversation('456', 'moving')
+        manager.handle_support_request('456')
+        del sent[:]
+
+        manager._sweep()
+
+        assert manager.get_conversation('123') is None
+        assert manager.get_conversation('456') is None
+        assert [(payload['to'], payload['labels']) for payload in sent] == [
+            ('123', {'add': [], 'remove': ['L1']}),
+        ]
+        assert manager.get_labelled_chats('bot_new_conversation') == []
+        assert [user for user, _ in manager.get_labelled_chats('waiting_urgent_support')] == ['456']
+
+
+class TestLabelWriteBehindQueue:
+    """Test cases for deferred, merged and retried label pushes"""
+
+    @pytest.fixture
+    def clock(self):
+        """Manually advanced monotonic clock"""
+        now = [100.0]
+        clock = lambda: now[0]
+        clock.advance = lambda seconds: now.__setitem__(0, now[0] + seconds)
+        return clock
+
+    @pytest.fixture
+    def sent(self):
+        """Payloads sent by the engine"""
+        return []
+
+    @pytest.fixture
+    def queue(self, sent, clock):
+        """Queue fixture driven by run_pending instead of a worker thread"""
+        return LabelWriteBehindQueue(LabelSyncEngine(sent.append, LABEL_IDS),
+                                     hold_seconds=5.0, retry_delay=1.0, clock=clock)
+
+    def test_updates_are_held_until_release(self, queue, sent, clock):
+        """Test nothing is pushed before the reply, and merged changes go out as one call"""
+        manager = LabelManager(queue)
+        manager.apply_label('123', 'bot_new_conversation')
+        manager.sync('123')
+        manager.remove_all_labels('123')
+        manager.apply_label('123', 'waiting_urgent_support')
+        manager.sync('123')
+
+        assert queue.run_pending() == 0
+        assert queue.get_pending()[0]['labels'] == ['waiting_urgent_support']
+
+        queue.release('123')
+        assert queue.run_pending() == 1
+        assert len(sent) == 1
+        assert sent[0]['labels'] == {'add': ['L2'], 'remove': ['L1', 'L3', 'L4']}
+        assert queue.get_stats()['merged'] == 1
+
+    def test_unreleased_updates_are_pushed_after_hold(self, queue, sent, clock):
+        """Test changes without a reply are pushed once the hold time passed"""
+        queue.sync('123', {'moving'})
+        clock.advance(5.0)
+
+        assert queue.run_pending() == 1
+        assert sent[0]['to'] == '123'
+
+    def test_failed_push_is_retried_with_backoff(self, sent, clock):
+        """Test failed pushes back off exponentially until they succeed"""
+        failures = [2]
+        def flaky(payload):
+            if failures[0]:
+                failures[0] -= 1
+                raise ConnectionError("API down")
+            sent.append(payload)
+
+        queue = LabelWriteBehindQueue(LabelSyncEngine(flaky, LABEL_IDS), retry_delay=1.0,
+                                      max_attempts=3, clock=clock)
+        queue.sync('123', {'moving'})
+        queue.release('123')
+        assert queue.run_pending() == 0
+        assert queue.get_pending()[0]['attempts'] == 1
+        assert queue.get_pending()[0]['last_error'] == "API down"
+
+        # Still backing off
+        assert queue.run_pending() == 0
+        clock.advance(1.0)
+        assert queue.run_pending() == 0
+        clock.advance(2.0)
+        assert queue.run_pending() == 1
+        assert sent[0]['labels']['add'] == ['L4']
+        assert queue.get_pending() == []
+        assert queue.get_stats()['retried'] == 2
+
+    def test_flush_with_worker(self, sent):
+        """Test the worker thread pushes released updates and flush waits for them"""
+        queue = LabelWriteBehindQueue(LabelSyncEngine(sent.append, LABEL_IDS), hold_seconds=60.0)
+        queue.start()
+        try:
+            queue.sync('123', {'moving'})
+            queue.sync('456', {'organization', 'bot_new_conversation'})
+            assert queue.flush(timeout=5.0)
+        finally:
+            queue.stop(timeout=5.0)
+
+        assert sorted(payload['to'] for payload in sent) == ['123', '456']
+        assert queue.get_stats()['pending'] == 0
@@ -0,0 +1,129 @@
+"""Unit tests for per-user trace logging."""
+import json
+import logging
+import queue
+import pytest
+from ..utils.logger import (
+    TraceLogger, set_trace_users, enable_trace, disable_trace, is_traced, TRACE_ALL_USERS,
+    BoundedQueueHandler, JsonLinesFormatter, APP_LOGGER_NAME, LOG_QUEUE_SIZE, configure_logging
+)
+
+class RecordingHandler(logging.Handler):
+    """Handler keeping emitted records"""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class TestTraceLogger:
+    """Test cases for hot-path trace logging"""
+
+    @pytest.fixture
+    def handler(self):
+        """Recording handler attached to the trace logger"""
+        handler = RecordingHandler()
+        logger = logging.getLogger('tests.trace')
+        logger.addHandler(handler)
+        yield handler
+        logger.removeHandler(handler)
+        set_trace_users([])
+
+    @pytest.fixture
+    def tracer(self, handler):
+        """Trace logger fixture"""
+        return TraceLogger('tests.trace')
+
+    def test_untraced_users_are_not_formatted(self, tracer, handler):
+        """Test traces of other users are dropped without formatting arguments"""
+        class Unformattable:
+            def __repr__(self):
+                raise AssertionError("formatted")
+
+        enable_trace('972500000001')
+        tracer.trace('972500000002', "payload %r", Unformattable())
+        assert handler.records == []
+
+    def test_traced_user_bypasses_level(self, tracer, handler):
+        """Test traces of enabled users are emitted at DEBUG even when the logger is at INFO"""
+        logging.getLogger('tests.trace').setLevel(logging.INFO)
+        enable_trace('972500000001')
+        tracer.trace('972500000001', "state %s", 'initial')
+
+        record, = handler.records
+        assert record.levelno == logging.DEBUG
+        assert record.user_id == '972500000001'
+        assert record.getMessage() == '[972500000001] state initial'
+
+    def test_toggle_and_wildcard(self):
+        """Test tracing can be switched per user and for everyone"""
+        enable_trace('972500000001')
+        assert is_traced('972500000001')
+        disable_trace('972500000001')
+        assert not is_traced('972500000001')
+
+        set_trace_users([TRACE_ALL_USERS])
+        assert is_traced('972500000003')
+        set_trace_users([])
+
+
+class TestQueueLogging:
+    """Test cases for the queued logging backend"""
+
+    def _record(self, msg, *args):
+        return logging.LogRecord('tests.queue', logging.INFO, __file__, 1, msg, args, None)
+
+    def test_drop_on_overflow(self):
+        """Test a full queue drops and counts records instead of blocking"""
+        handler = BoundedQueueHandler(queue.Queue(1), overflow='drop')
+        handler.handle(self._record('first'))
+        handler.handle(self._record('second'))
+
+        assert handler.queue.qsize() == 1
+        assert handler.dropped == 1
+
+    def test_message_resolved_before_queueing(self):
+        """Test arguments mutated after logging do not change the queued message"""
+        handler = BoundedQueueHandler(queue.Queue(10))
+        payload = {'to': '972500000001'}
+        handler.handle(self._record('payload %s', payload))
+        payload['to'] = 'changed'
+
+        assert handler.queue.get_nowait().getMessage() == "payload {'to': '972500000001'}"
+
+    def test_invalid_overflow_mode(self):
+        """Test unknown overflow modes are rejected"""
+        with pytest.raises(ValueError):
+            BoundedQueueHandler(queue.Queue(1), overflow='spill')
+
+    def test_json_lines_format(self):
+        """Test records are formatted as single JSON lines with context"""
+        record = self._record('שלום %s', 'עולם')
+        record.user_id = '972500000001'
+        line = JsonLinesFormatter().format(record)
+
+        assert '\n' not in line
+        entry = json.loads(line)
+        assert entry['message'] == 'שלום עולם'
+        assert entry['user_id'] == '972500000001'
+        assert entry['level'] == 'INFO'
+
+
+class TestApplicationLogger:
+    """Test cases for the shared application package logger"""
+
+    @pytest.mark.skipif(LOG_QUEUE_SIZE <= 0, reason="logging is synchronous")
+    def test_plain_module_logger_reaches_queue(self, monkeypatch):
+        """Test a module using logging.getLogger(__name__) logs through the queue"""
+        handler, = [h for h in configure_logging().handlers if isinstance(h, BoundedQueueHandler)]
+        queued = []
+        monkeypatch.setattr(handler, 'enqueue', queued.append)
+
+        module_logger = logging.getLogger(f'{APP_LOGGER_NAME}.tests.plain_module')
+        assert not module_logger.handlers
+        module_logger.info("routed %s", 'message')
+
+        assert [record.getMessage() for record in queued] == ['routed message']
@@ -0,0 +1,94 @@
+"""Unit tests for message handling and redelivery."""
+import pytest
+from ..business.flow_factory import BusinessFlowFactory
+from ..chat.conversation_manager import ConversationManager
+from ..chat.dispatcher import ShardedDispatcher
+from ..chat.ingestion_queue import WebhookIngestionQueue
+from ..chat.message_handler import MessageHandler
+from ..config.responses.common import WELCOME
+from ..utils.errors import WhatsAppRateLimitError
+from ..whatsapp.send_queue import OutboundSendQueue
+
+class TestMessageHandler:
+    """Test cases for deduplicated message processing"""
+
+    @pytest.fixture
+    def handler(self):
+        """Message handler fixture"""
+        return MessageHandler(ConversationManager(), BusinessFlowFactory())
+
+    @pytest.fixture
+    def message(self):
+        """Text message fixture"""
+        return {'id': 'msg1', 'type': 'text', 'from': '972500000001', 'text': {'body': 'שלום'}}
+
+    def test_redelivery_is_dropped(self, handler, message):
+        """Test a redelivered message whose replies were sent gets no reply"""
+        assert handler.process_message(message)
+        assert handler.process_message(dict(message)) == []
+
+    def test_rate_limited_reply_is_resent_on_redelivery(self, handler, message):
+        """Test a reply that failed to send is sent when the message is redelivered"""
+        sent = []
+        rate_limited = [True]
+
+        def send(payload):
+            if rate_limited[0]:
+                raise WhatsAppRateLimitError("Rate limited", status_code=429)
+            sent.append(payload)
+            return {}
+
+        send_queue = OutboundSendQueue(send)
+
+        def deliver(delivered):
+            futures = handler.process_and_send(
+                delivered, lambda payloads: [send_queue.enqueue(payload) for payload in payloads]
+            )
+            assert send_queue.flush(timeout=5)
+            return futures
+
+        futures = deliver(message)
+        assert isinstance(futures[0].exception(), WhatsAppRateLimitError)
+        assert sent == []
+
+        rate_limited[0] = False
+        deliver(dict(message))
+        assert len(sent) == 1
+        assert sent[0]['body']['text'] == WELCOME['message']
+
+        # Once sent, a further redelivery is dropped again
+        assert deliver(dict(message)) == []
+        assert len(sent) == 1
+
+    def test_failed_reply_is_resent_in_queue_mode(self, handler, message):
+        """Test the ingestion queue keeps failed replies for the redelivery of their message"""
+        sent = []
+        failing = [True]
+
+        def send(payload):
+            if failing[0]:
+                raise WhatsAppRateLimitError("Rate limited", status_code=429)
+            sent.append(payload)
+            return {}
+
+        send_queue = OutboundSendQueue(send)
+        ingestion = WebhookIngestionQueue(
+            lambda delivered: handler.process_and_send(
+                delivered, lambda payloads: [send_queue.enqueue(payload) for payload in payloads]
+            ),
+            ShardedDispatcher(num_shards=1)
+        )
+        ingestion.start()
+
+        ingestion.enqueue([message])
+        ingestion.stop(timeout=5)
+        assert send_queue.flush(timeout=5)
+        assert sent == []
+        assert ingestion.get_metrics()['failed'] == 1
+
+        failing[0] = False
+        ingestion.start()
+        ingestion.enqueue([dict(message)])
+        ingestion.stop(timeout=5)
+        assert send_queue.flush(timeout=5)
+        assert [payload['body']['text'] for payload in sent] == [WELCOME['message']]
@@ -0,0 +1,63 @@
+"""Unit tests for compiled and pre-encoded message payloads."""
+import json
+import pytest
+from ..models.message_payload import CompiledTemplate, MessagePayloadBuilder, encode_payload
+
+class TestCompiledTemplate:
+    """Test cases for compiled payload templates"""
+
+    @pytest.fixture
+    def template(self):
+        """Template with placeholders in several sections"""
+        return CompiledTemplate(
+            body_text='שלום {name}, "{slot}"\nתודה',
+            header_text='{name}',
+            footer_text='קבוע',
+            buttons=[{"id": "0", "title": 'כן'}]
+        )
+
+    def test_render_matches_builder(self, template):
+        """Test rendered payloads equal those built by MessagePayloadBuilder"""
+        payload = template.render('972500000001', name='דנה', slot='מחר')
+
+        assert payload == MessagePayloadBuilder.create_interactive_message(
+            recipient='972500000001',
+            body_text='שלום דנה, "מחר"\nתודה',
+            header_text='דנה',
+            footer_text='קבוע',
+            buttons=[{"id": "0", "title": 'כן'}]
+        )
+
+    def test_encoded_body_matches_payload(self, template):
+        """Test the pre-encoded body decodes to the payload, escaping included"""
+        payload = template.render('972500000001', name='a"b\\c', slot='\n')
+
+        assert json.loads(payload.encoded.decode('utf-8')) == payload
+        # Hebrew is sent as UTF-8 rather than \\u escapes
+        assert 'שלום'.encode('utf-8') in payload.encoded
+
+    def test_mutation_drops_cached_body(self, template):
+        """Test changing a prepared payload re-encodes its body"""
+        payload = template.render('972500000001', name='x', slot='y')
+        payload['to'] = '972500000002'
+
+        assert json.loads(encode_payload(payload))['to'] == '972500000002'
+
+    @pytest.mark.parametrize('mutate', [
+        lambda payload: payload.setdefault('extra', 1),
+        lambda payload: payload.popitem(),
+        lambda payload: payload.clear(),
+        lambda payload: payload.__ior__({'to': '972500000002'}),
+    ])
+    def test_every_mutator_drops_cached_body(self, template, mutate):
+        """Test each dict mutator keeps the encoded body in step with the payload"""
+        payload = template.render('972500000001', name='x', slot='y')
+        payload.encoded
+        mutate(payload)
+
+        assert json.loads(encode_payload(payload)) == dict(payload)
+
+    def test_encode_plain_payload(self):
+        """Test payloads not built from templates are encoded on demand"""
+        payload = MessagePayloadBuilder.create_text_message('972500000001', 'שלום')
+        assert json.loads(encode_payload(payload)) == payload
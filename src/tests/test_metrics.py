@@ -0,0 +1,80 @@
+"""Unit tests for the metrics registry and its exported sources."""
+import pytest
+from ..business.flows.moving_flow import MovingFlow
+from ..chat.state_manager import StateManager
+from ..utils.metrics import MetricsRegistry
+from ..utils.state_monitor import StateTransitionMonitor
+
+class TestMetricsRegistry:
+    """Test cases for metrics and their text format"""
+
+    @pytest.fixture
+    def registry(self):
+        """Registry fixture"""
+        return MetricsRegistry()
+
+    def test_histogram_buckets_are_cumulative(self, registry):
+        """Test observations land in every bucket whose bound they do not exceed"""
+        histogram = registry.histogram('latency_seconds', 'Latency', ('route',), buckets=(0.1, 1.0))
+        timer = histogram.labels('/hook')
+        for value in (0.05, 0.1, 0.5, 3.0):
+            timer.observe(value)
+
+        text = registry.render()
+        assert '# TYPE latency_seconds histogram' in text
+        assert 'latency_seconds_bucket{route="/hook",le="0.1"} 2' in text
+        assert 'latency_seconds_bucket{route="/hook",le="1"} 3' in text
+        assert 'latency_seconds_bucket{route="/hook",le="+Inf"} 4' in text
+        assert 'latency_seconds_sum{route="/hook"} 3.65' in text
+        assert 'latency_seconds_count{route="/hook"} 4' in text
+
+    def test_counter_gauge_and_labels(self, registry):
+        """Test unlabelled metrics, label escaping and child reuse"""
+        registry.counter('requests_total', 'Requests').inc(2)
+        gauge = registry.gauge('depth', 'Depth', ('queue',))
+        assert gauge.labels('a"b') is gauge.labels('a"b')
+        gauge.labels('a"b').set(5)
+
+        text = registry.render()
+        assert 'requests_total 2' in text
+        assert 'depth{queue="a\\"b"} 5' in text
+        with pytest.raises(ValueError):
+            registry.counter('requests_total', 'Again')
+        with pytest.raises(ValueError):
+            gauge.labels()
+
+    def test_callback_metric(self, registry):
+        """Test callback metrics are read at render time"""
+        counts = {('moving',): 1}
+        registry.callback('active', 'Active', 'gauge', ('flow',), lambda: counts)
+        counts[('organization',)] = 2
+
+        text = registry.render()
+        assert 'active{flow="moving"} 1' in text
+        assert 'active{flow="organization"} 2' in text
+
+
+class TestMetricSources:
+    """Test cases for counts exported from application components"""
+
+    def test_state_manager_active_counts(self):
+        """Test active conversation counts follow set and remove"""
+        manager = StateManager()
+        manager.set_state('user1', MovingFlow())
+        manager.set_state('user2', MovingFlow())
+        manager.set_state('user2', MovingFlow())
+        assert manager.get_active_counts() == {'moving': 2}
+
+        manager.remove_state('user1')
+        manager.remove_state('user1')
+        assert manager.get_active_counts() == {'moving': 1}
+
+    def test_monitor_transition_counts(self):
+        """Test transition totals include recorded transitions"""
+        monitor = StateTransitionMonitor()
+        monitor.record_transition('user1', 'initial', 'awaiting_packing_choice', 'moving')
+        monitor.log_transition('user2', 'initial', 'awaiting_packing_choice', 'moving')
+
+        assert monitor.get_transition_counts() == {
+            ('moving', 'initial', 'awaiting_packing_choice'): 2
+        }
@@ -129,4 +129,32 @@ class TestMovingFlow:
         # Test support request from any state
         for state in states:
             flow._conversation_state = state
-            assert flow.handle_input(NAVIGATION['talk_to_representative']) == 'awaiting_emergency_support'
\ No newline at end of file
+            assert flow.handle_input(NAVIGATION['talk_to_representative']) == 'awaiting_emergency_support'
+
+    def test_next_message_payloads(self, flow):
+        """Test replies are rendered from the compiled templates"""
+        flow.set_recipient('972500000001')
+        flow.handle_input('אריזת הבית')
+        flow._customer_details = 'רחוב הרצל 5, תל אביב'
+        flow._selected_time_slot = 'מחר בבוקר'
+
+        for state in flow._STATE_HANDLERS:
+            flow._conversation_state = state
+            payload = flow.get_next_message()
+            assert payload['to'] == '972500000001'
+            assert payload['body']['text']
+            assert '{' not in payload['body']['text']
+
+        flow._conversation_state = 'awaiting_verification'
+        payload = flow.get_next_message()
+        assert flow._customer_details in payload['body']['text']
+        assert payload['action']['buttons'][0]['title'] == 'כן, הפרטים נכונים'
+
+    def test_compiled_payloads_are_independent(self, flow):
+        """Test rendering for one recipient does not leak into another"""
+        other = MovingFlow()
+        flow.set_recipient('972500000001')
+        other.set_recipient('972500000002')
+        first, second = flow.get_next_message(), other.get_next_message()
+        assert (first['to'], second['to']) == ('972500000001', '972500000002')
+        assert first['action'] == second['action']
@@ -0,0 +1,118 @@
+"""Unit tests for WhatsApp API rate limiting and retries."""
+import pytest
+from ..whatsapp.rate_limiter import RateLimiter, RetryPolicy, parse_retry_after
+from ..whatsapp.client import WhatsAppClient
+from ..utils.errors import WhatsAppRateLimitError
+
+class FakeClock:
+    """Manually advanced monotonic clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeResponse:
+    """Minimal stand-in for requests.Response"""
+
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = ''
+
+    def json(self):
+        return {'status': self.status_code}
+
+    def raise_for_status(self):
+        pass
+
+
+class TestRateLimiter:
+    """Test cases for the token-bucket rate limiter"""
+
+    @pytest.fixture
+    def clock(self):
+        """Clock fixture"""
+        return FakeClock()
+
+    def test_burst_then_wait(self, clock):
+        """Test messages beyond the burst are held back, not rejected"""
+        limiter = RateLimiter(global_rate=10, global_burst=2, recipient_rate=100,
+                              recipient_burst=100, clock=clock)
+
+        assert limiter.reserve('user') == 0
+        assert limiter.reserve('user') == 0
+        assert limiter.reserve('user') == pytest.approx(0.1)
+        # Later callers queue up behind earlier reservations
+        assert limiter.reserve('user') == pytest.approx(0.2)
+
+        clock.now += 1
+        assert limiter.reserve('user') == 0
+
+    def test_per_recipient_limit(self, clock):
+        """Test one busy recipient does not slow down others"""
+        limiter = RateLimiter(global_rate=100, global_burst=100, recipient_rate=1,
+                              recipient_burst=1, clock=clock)
+
+        assert limiter.reserve('user1') == 0
+        assert limiter.reserve('user1') == pytest.approx(1.0)
+        assert limiter.reserve('user2') == 0
+
+    def test_headers_hold_all_senders(self, clock):
+        """Test rate-limit response headers pause sending"""
+        limiter = RateLimiter(global_rate=100, global_burst=100, recipient_rate=100,
+                              recipient_burst=100, clock=clock)
+
+        assert limiter.update_from_headers({'Retry-After': '3'}) == 3
+        assert limiter.reserve('user') == pytest.approx(3)
+
+        clock.now += 3
+        assert limiter.update_from_headers({'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '2'}) == 2
+        assert limiter.reserve('other') == pytest.approx(2)
+
+    def test_parse_retry_after(self):
+        """Test Retry-After parsing"""
+        assert parse_retry_after('5') == 5
+        assert parse_retry_after(None) is None
+        assert parse_retry_after('soon') is None
+
+    def test_backoff_is_bounded(self):
+        """Test jittered backoff stays within its bounds"""
+        policy = RetryPolicy(base_delay=1, max_delay=4)
+        for attempt in range(6):
+            assert 0 <= policy.backoff(attempt) <= 4
+        assert policy.backoff(0, retry_after=10) == 10
+
+
+class TestClientRetries:
+    """Test cases for retrying API calls in WhatsAppClient"""
+
+    @pytest.fixture
+    def payload(self):
+        """Text message payload fixture"""
+        return {'messaging_product': 'whatsapp', 'to': 'user', 'body': 'hi'}
+
+    def _client(self, responses, monkeypatch):
+        sleeps = []
+        monkeypatch.setattr('src.whatsapp.client.time.sleep', sleeps.append)
+        limiter = RateLimiter(global_rate=1000, global_burst=1000, recipient_rate=1000, recipient_burst=1000)
+        client = WhatsAppClient(rate_limiter=limiter, retry_policy=RetryPolicy(max_retries=2, base_delay=0.01))
+        calls = iter(responses)
+        client.session.post = lambda url, **kwargs: next(calls)
+        return client, sleeps
+
+    def test_retries_server_errors(self, payload, monkeypatch):
+        """Test 5xx responses are retried with backoff"""
+        client, sleeps = self._client([FakeResponse(503), FakeResponse(200)], monkeypatch)
+
+        assert client.send_message(payload) == {'status': 200}
+        assert len(sleeps) == 1
+
+    def test_rate_limit_exhausted(self, payload, monkeypatch):
+        """Test persistent 429 responses raise a rate limit error"""
+        client, _ = self._client([FakeResponse(429, {'Retry-After': '0'})] * 3, monkeypatch)
+
+        with pytest.raises(WhatsAppRateLimitError):
+            client.send_message(payload)
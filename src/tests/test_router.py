@@ -0,0 +1,34 @@
+"""Unit tests for message routing."""
+import pytest
+from ..business.flow_factory import BusinessFlowFactory
+from ..chat.conversation_manager import ConversationManager
+from ..chat.router import MessageRouter
+from ..config.responses.common import WELCOME
+
+class TestMessageRouter:
+    """Test cases for the message router and its handler registry"""
+
+    @pytest.fixture
+    def router(self):
+        """Router fixture"""
+        return MessageRouter(ConversationManager(), BusinessFlowFactory())
+
+    def test_handlers_are_shared(self, router):
+        """Test handlers and the welcome handler are built once"""
+        assert router.handlers['interactive'] is router.handlers['reply']
+        welcome_handlers = {id(handler._welcome_handler) for handler in router.handlers.values()}
+        assert len(welcome_handlers) == 1
+
+    @pytest.mark.parametrize('message_type', ['text', 'image', 'video'])
+    def test_welcome_without_conversation(self, router, message_type):
+        """Test users without a conversation get the welcome message"""
+        payloads = router.route_message({'type': message_type}, {'to': '972500000001'})
+
+        assert len(payloads) == 1
+        assert payloads[0]['to'] == '972500000001'
+        assert payloads[0]['body']['text'] == WELCOME['message']
+
+    def test_unsupported_type(self, router):
+        """Test unsupported message types get a text error reply"""
+        payloads = router.route_message({'type': 'sticker'}, {'to': '972500000001'})
+        assert payloads[0]['body'] == 'סוג ההודעה אינו נתמך כרגע'
@@ -0,0 +1,99 @@
+"""Unit tests for the outbound send queue."""
+import threading
+import time
+import pytest
+from ..whatsapp.send_queue import OutboundSendQueue, SendQueueFullError
+
+class TestOutboundSendQueue:
+    """Test cases for pipelined outbound sending"""
+
+    def test_per_recipient_order(self):
+        """Test payloads to one recipient are sent in queue order"""
+        sent = []
+        lock = threading.Lock()
+
+        def send(payload):
+            time.sleep(0.001)
+            with lock:
+                sent.append((payload['to'], payload['seq']))
+            return {'ok': True}
+
+        send_queue = OutboundSendQueue(send, max_in_flight=4)
+        for seq in range(20):
+            for recipient in ('user1', 'user2', 'user3'):
+                send_queue.enqueue({'to': recipient, 'seq': seq})
+
+        assert send_queue.flush(timeout=5)
+        for recipient in ('user1', 'user2', 'user3'):
+            assert [seq for to, seq in sent if to == recipient] == list(range(20))
+        assert send_queue.pending_count == 0
+
+    def test_in_flight_is_bounded(self):
+        """Test no more than max_in_flight requests run at once"""
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def send(payload):
+            with lock:
+                active.append(payload)
+                peak.append(len(active))
+            time.sleep(0.005)
+            with lock:
+                active.remove(payload)
+            return {}
+
+        send_queue = OutboundSendQueue(send, max_in_flight=2)
+        for index in range(10):
+            send_queue.enqueue({'to': f'user{index}'})
+
+        assert send_queue.flush(timeout=5)
+        assert max(peak) <= 2
+
+    def test_backpressure_when_full(self):
+        """Test enqueue blocks and times out while the queue is full"""
+        release = threading.Event()
+        send_queue = OutboundSendQueue(lambda payload: release.wait(2), max_in_flight=1, max_pending=1)
+        first = send_queue.enqueue({'to': 'user'})
+
+        with pytest.raises(SendQueueFullError):
+            send_queue.enqueue({'to': 'user'}, timeout=0.05)
+
+        release.set()
+        assert first.result(timeout=1) is True
+        assert send_queue.flush(timeout=1)
+
+    def test_send_error_is_reported_on_future(self):
+        """Test a failed send resolves its future with the error and keeps the lane moving"""
+        def send(payload):
+            if payload['fail']:
+                raise RuntimeError('api down')
+            return {'sent': True}
+
+        send_queue = OutboundSendQueue(send)
+        failed = send_queue.enqueue({'to': 'user', 'fail': True})
+        succeeded = send_queue.enqueue({'to': 'user', 'fail': False})
+
+        with pytest.raises(RuntimeError):
+            failed.result(timeout=1)
+        assert succeeded.result(timeout=1) == {'sent': True}
+
+    def test_base_exception_releases_lane(self):
+        """Test a send aborted by a BaseException still fails its future and frees the lane"""
+        class Abort(BaseException):
+            pass
+
+        def send(payload):
+            if payload['abort']:
+                raise Abort()
+            return {'sent': True}
+
+        send_queue = OutboundSendQueue(send)
+        aborted = send_queue.enqueue({'to': 'user', 'abort': True})
+        succeeded = send_queue.enqueue({'to': 'user', 'abort': False})
+
+        with pytest.raises(Abort):
+            aborted.result(timeout=1)
+        assert succeeded.result(timeout=1) == {'sent': True}
+        assert send_queue.flush(timeout=1)
+        assert send_queue.pending_count == 0
@@ -0,0 +1,85 @@
+"""Unit tests for compiled flow state machines."""
+import pytest
+from ..business.state_machine import StateMachine
+from ..business.flows.moving_flow import MovingFlow
+from ..business.flows.moving.states import MOVING_STATE_MACHINE
+from ..business.messages import NAVIGATION, DEFAULT_TIME_SLOTS
+from ..chat.business_flow_manager import InvalidStateTransitionError
+from ..chat.conversation_manager import ConversationManager
+
+class TestStateMachine:
+    """Test cases for compiling and querying transition tables"""
+
+    @pytest.fixture
+    def machine(self):
+        """Small machine fixture"""
+        return StateMachine('test', {
+            'initial': ('details',),
+            'details': ('done',),
+            'done': (),
+        }, global_targets=('initial',))
+
+    def test_codes_and_transitions(self, machine):
+        """Test declaration order codes, self loops, global targets and unknown states"""
+        assert [machine.code(state) for state in ('initial', 'details', 'done')] == [0, 1, 2]
+        assert machine.can_transition('initial', 'details')
+        assert machine.can_transition('details', 'details')
+        assert machine.can_transition('done', 'initial')
+        assert not machine.can_transition('initial', 'done')
+        assert not machine.can_transition('initial', 'unknown')
+        assert machine.targets('details') == {'initial', 'details', 'done'}
+
+    def test_definition_errors_fail_compilation(self, machine):
+        """Test unknown targets and incomplete or unknown table entries are rejected"""
+        with pytest.raises(ValueError):
+            StateMachine('broken', {'initial': ('missing',)})
+        with pytest.raises(ValueError):
+            machine.table({'initial': 1, 'details': 2})
+        with pytest.raises(ValueError):
+            machine.table({'initial': 1, 'details': 2, 'done': 3, 'extra': 4})
+        assert machine.table({'details': 'x'}, complete=False) == (None, 'x', None)
+
+    def test_moving_flow_tables_follow_the_machine(self):
+        """Test the moving flow's handlers are compiled in state code order"""
+        assert MovingFlow.state_machine is MOVING_STATE_MACHINE
+        assert len(MovingFlow._HANDLER_TABLE) == len(MOVING_STATE_MACHINE.states)
+        for state, handler in MovingFlow._STATE_HANDLERS.items():
+            assert MovingFlow._HANDLER_TABLE[MOVING_STATE_MACHINE.code(state)] is handler
+
+    def test_moving_flow_only_makes_declared_transitions(self):
+        """Test every state handler outcome is a transition the machine allows"""
+        inputs = [
+            'invalid', 'רחוב הרצל 5, תל אביב', 'כן, הפרטים נכונים', 'לא, צריך לתקן', 'דלג', 'כן',
+            'לקבוע זמן אחר', list(DEFAULT_TIME_SLOTS.values())[0], 'אריזת הבית',
+            NAVIGATION['back_to_main'], NAVIGATION['talk_to_representative']
+        ]
+        for state in MOVING_STATE_MACHINE.states:
+            for user_input in inputs:
+                flow = MovingFlow()
+                flow._service_type = 'packing_only'
+                flow._conversation_state = state
+                next_state = flow.handle_input(user_input)
+                assert MOVING_STATE_MACHINE.can_transition(state, next_state), (state, user_input, next_state)
+
+
+class TestFlowManagerValidation:
+    """Test cases for transition validation in conversations"""
+
+    def test_conversation_validates_from_the_previous_state(self):
+        """Test a conversation can walk the flow although the flow moves itself"""
+        manager = ConversationManager()
+        manager.start_conversation('123', 'moving')
+        manager.handle_user_input('123', 'אריזת הבית')
+        manager.handle_user_input('123', 'קצר')
+        manager.handle_user_input('123', 'רחוב הרצל 5, תל אביב')
+
+        assert manager.get_conversation('123').state == 'awaiting_verification'
+
+    def test_invalid_transition_is_rolled_back(self):
+        """Test an undeclared transition raises and leaves the flow where it was"""
+        manager = ConversationManager()
+        manager.start_conversation('123', 'moving')
+
+        with pytest.raises(InvalidStateTransitionError):
+            manager.update_conversation_state('123', 'completed')
+        assert manager.get_conversation('123').state == 'initial'
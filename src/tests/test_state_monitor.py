@@ -1,6 +1,7 @@
 """Unit tests for state transition monitoring."""
 import pytest
 from datetime import datetime, timedelta
+from ..chat.conversation_manager import ConversationManager
 from ..utils.state_monitor import StateTransitionMonitor, StateTransition
 
 class TestStateTransitionMonitor:
@@ -111,4 +112,117 @@ class TestStateTransitionMonitor:
         
         # Second transition should have ~5 minute duration
         duration = datetime.strptime(history[1]['duration'], '%H:%M:%S')
-        assert duration.minute == 5
\ No newline at end of file
+        assert duration.minute == 5
+
+class TestBoundedStateTransitionMonitor:
+    """Test cases for the monitor's bounded history and rollups"""
+
+    @pytest.fixture
+    def clock(self):
+        """Settable clock fixture"""
+        class Clock:
+            now = datetime(2024, 1, 1, 12, 0, 0)
+
+            def __call__(self):
+                return self.now
+        return Clock()
+
+    @pytest.fixture
+    def monitor(self, clock):
+        """Monitor with small limits and a controlled clock"""
+        return StateTransitionMonitor(
+            max_user_history=3,
+            bucket_seconds=60,
+            retention=timedelta(minutes=10),
+            clock=clock
+        )
+
+    def test_user_history_is_bounded(self, monitor):
+        """Test only the latest transitions of a user are kept"""
+        for i in range(5):
+            monitor.log_transition('user1', f's{i}', f's{i + 1}', 'moving')
+
+        history = monitor.get_user_flow_history('user1')
+        assert [h['from_state'] for h in history] == ['s2', 's3', 's4']
+        # Rollups still count every transition
+        assert monitor.get_flow_metrics('moving')['total_transitions'] == 5
+
+    def test_rollups_across_buckets(self, monitor, clock):
+        """Test metrics aggregate buckets and honour the time window"""
+        monitor.log_transition('user1', 'initial', 'awaiting_packing_choice', 'moving')
+        clock.now += timedelta(minutes=2)
+        monitor.log_transition('user1', 'awaiting_packing_choice', 'completed', 'moving')
+        monitor.log_transition('user2', 'initial', 'awaiting_packing_choice', 'moving')
+
+        metrics = monitor.get_flow_metrics('moving')
+        assert metrics['total_users'] == 2
+        assert metrics['completion_rate'] == 0.5
+        assert metrics['avg_state_duration'] == '0:02:00'
+        assert metrics['common_paths'][0] == {'path': 'initial->awaiting_packing_choice', 'count': 2}
+        assert metrics['state_distribution']['awaiting_packing_choice']['total_duration'] == '0:02:00'
+
+        recent = monitor.get_flow_metrics('moving', start_time=clock.now)
+        assert recent['total_transitions'] == 2
+        assert monitor.get_flow_metrics('organization') == {}
+
+    def test_retention_drops_old_data(self, monitor, clock):
+        """Test buckets and idle users past retention are dropped"""
+        monitor.log_transition('user1', 'initial', 'awaiting_packing_choice', 'moving')
+        clock.now += timedelta(minutes=15)
+        monitor.log_transition('user2', 'initial', 'awaiting_packing_choice', 'moving')
+
+        metrics = monitor.get_flow_metrics('moving')
+        assert metrics['total_users'] == 1
+        assert monitor.get_user_flow_history('user1') == []
+        assert 'user1' not in monitor._user_states
+
+
+class TestRecordedTransitions:
+    """Test cases for the lock-free recording path and its hook"""
+
+    def test_recorded_transitions_are_folded_on_query(self):
+        """Test recorded transitions show up in history and metrics"""
+        monitor = StateTransitionMonitor()
+        monitor.record_transition('user1', 'initial', 'awaiting_packing_choice', 'moving')
+        monitor.record_transition('user1', 'awaiting_packing_choice', 'completed', 'moving')
+
+        assert len(monitor._pending) == 2
+        assert len(monitor.get_user_flow_history('user1')) == 2
+        assert monitor.get_flow_metrics('moving')['completion_rate'] == 1.0
+        assert not monitor._pending
+
+    def test_full_queue_is_folded_by_recorder(self):
+        """Test the recorder folds the queue once it reaches max_pending"""
+        monitor = StateTransitionMonitor(max_pending=3)
+        for i in range(3):
+            monitor.record_transition('user1', f's{i}', f's{i + 1}', 'moving')
+
+        assert not monitor._pending
+        assert len(monitor._user_history['user1']) == 3
+
+    def test_sampling_keeps_whole_users(self):
+        """Test sampling keeps or skips all transitions of a user"""
+        assert StateTransitionMonitor(sample_rate=0.0)._sample_threshold == 0
+        monitor = StateTransitionMonitor(sample_rate=0.5)
+        users = [f'user{i}' for i in range(200)]
+        for user_id in users:
+            monitor.record_transition(user_id, 'initial', 'awaiting_packing_choice', 'moving')
+            monitor.record_transition(user_id, 'awaiting_packing_choice', 'completed', 'moving')
+
+        kept = [user_id for user_id in users if monitor.get_user_flow_history(user_id)]
+        assert 50 < len(kept) < 150
+        assert all(len(monitor.get_user_flow_history(user_id)) == 2 for user_id in kept)
+
+    def test_flow_manager_reports_transitions(self):
+        """Test BusinessFlowManager records the transitions it handles"""
+        monitor = StateTransitionMonitor()
+        manager = ConversationManager(monitor=monitor)
+        manager.start_conversation('972500000001', 'moving')
+        manager.update_conversation_state('972500000001', 'awaiting_packing_choice')
+        manager.handle_support_request('972500000001')
+
+        history = monitor.get_user_flow_history('972500000001')
+        assert [(h['from_state'], h['to_state'], h['flow_type']) for h in history] == [
+            ('initial', 'awaiting_packing_choice', 'moving'),
+            ('awaiting_packing_choice', 'awaiting_emergency_support', 'moving')
+        ]
@@ -0,0 +1,150 @@
+"""Unit tests for conversation timeout tracking."""
+import time
+import pytest
+from datetime import datetime, timedelta
+from ..chat.timeout_manager import TimeoutManager, ExpirySweeper
+from ..chat.activity_tracker import ActivityTracker
+from ..chat.conversation_manager import ConversationManager
+
+class FakeClock:
+    """Manually advanced monotonic clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTimeoutManager:
+    """Test cases for heap-based conversation expiry"""
+
+    @pytest.fixture
+    def clock(self):
+        """Clock fixture"""
+        return FakeClock()
+
+    @pytest.fixture
+    def manager(self, clock):
+        """Timeout manager with a one minute timeout"""
+        return TimeoutManager(timeout_minutes=1, clock=clock)
+
+    def test_expiry(self, manager, clock):
+        """Test users expire once their deadline passes"""
+        manager.update_activity('user1')
+        clock.now += 30
+        manager.update_activity('user2')
+
+        assert manager.get_stale_users() == []
+        clock.now += 31
+        assert manager.get_stale_users() == ['user1']
+        assert not manager.is_active('user1')
+        assert manager.is_active('user2')
+        # Returned users are not reported twice
+        assert manager.get_stale_users() == []
+
+    def test_refresh_postpones_expiry(self, manager, clock):
+        """Test refreshed activity keeps a user active past the old deadline"""
+        manager.update_activity('user')
+        clock.now += 50
+        manager.update_activity('user')
+        clock.now += 50
+
+        assert manager.get_stale_users() == []
+        clock.now += 11
+        assert manager.get_stale_users() == ['user']
+
+    def test_removed_users_are_skipped(self, manager, clock):
+        """Test removed users are never reported as stale"""
+        manager.update_activity('user')
+        manager.remove_activity('user')
+        clock.now += 120
+
+        assert manager.get_stale_users() == []
+        assert manager.next_deadline() is None
+
+    def test_restore_activity(self, manager):
+        """Test restored activity keeps the original deadline"""
+        manager.restore_activity('old', datetime.now() - timedelta(minutes=5))
+        manager.restore_activity('recent', datetime.now())
+
+        assert manager.get_stale_users() == ['old']
+        assert manager.is_active('recent')
+
+    def test_touch_if_active(self, manager, clock):
+        """Test touching extends active users and ignores expired ones"""
+        manager.update_activity('user')
+        clock.now += 50
+        assert manager.touch_if_active('user')
+        clock.now += 50
+        assert manager.get_stale_users() == []
+        clock.now += 61
+        assert not manager.touch_if_active('user')
+        assert not manager.touch_if_active('unknown')
+
+    def test_heap_stays_bounded(self, manager, clock):
+        """Test frequent refreshes do not grow the expiry index"""
+        for _ in range(1000):
+            clock.now += 1
+            manager.update_activity('user')
+        assert len(manager._heap) == 1
+
+
+class TestExpirySweeper:
+    """Test cases for the background expiry sweeper"""
+
+    def test_sweeps_until_stopped(self):
+        """Test the sweep callback runs periodically on the sweeper thread"""
+        calls = []
+        sweeper = ExpirySweeper(lambda: calls.append(1), interval_seconds=0.01)
+        sweeper.start()
+        try:
+            for _ in range(200):
+                if len(calls) >= 2:
+                    break
+                time.sleep(0.01)
+        finally:
+            sweeper.stop(timeout=1)
+        assert len(calls) >= 2
+
+
+class TestActivityTracker:
+    """Test cases for the array-backed deadline storage"""
+
+    def test_slots_are_reused(self):
+        """Test removed users free their slot for new users"""
+        tracker = ActivityTracker()
+        tracker.set('user1', 1.0)
+        tracker.set('user2', 2.0)
+        tracker.remove('user1')
+        tracker.set('user3', 3.0)
+
+        assert len(tracker._deadlines) == 2
+        assert tracker.get('user1') is None
+        assert dict(tracker.items()) == {'user2': 2.0, 'user3': 3.0}
+
+
+class TestConversationExpiry:
+    """Test cases for expiring conversations that race with new messages"""
+
+    def test_restarted_conversation_is_not_expired(self):
+        """Test a conversation restarted after the sweep found it stale survives the sweep"""
+        clock = FakeClock()
+        manager = ConversationManager(timeout_minutes=1)
+        manager._timeout_manager = TimeoutManager(timeout_minutes=1, clock=clock)
+        manager.start_conversation('972500000001', 'moving')
+        clock.now += 61
+
+        stale = manager._timeout_manager.get_stale_users()
+        # A shard restarts the conversation before the sweeper expires it
+        manager.start_conversation('972500000001', 'moving')
+
+        assert stale == ['972500000001']
+        assert not manager.expire_conversation('972500000001')
+        assert manager.get_conversation('972500000001') is not None
+        assert manager.count_labelled_chats('bot_new_conversation') == 1
+
+        clock.now += 61
+        manager.cleanup_stale_conversations()
+        assert manager.get_conversation('972500000001') is None
+        assert manager.get_active_counts() == {'moving': 0}
@@ -0,0 +1,106 @@
+"""Unit tests for the columnar transition log."""
+import math
+import os
+from datetime import datetime, timedelta
+import pytest
+from ..chat.conversation_manager import ConversationManager
+from ..utils.state_monitor import StateTransitionMonitor
+from ..utils.transition_log import ColumnarTransitionLog
+
+class TestColumnarTransitionLog:
+    """Test cases for appending to and mapping the transition log"""
+
+    @pytest.fixture
+    def log(self, tmp_path):
+        """Log fixture with a small flush batch"""
+        log = ColumnarTransitionLog(str(tmp_path / 'transitions'), flush_every=2)
+        yield log
+        log.close()
+
+    def test_append_and_read(self, log):
+        """Test transitions come back as interned, equal length columns"""
+        now = datetime(2024, 1, 1, 12, 0, 0)
+        log.append(now, 'user1', 'moving', 'initial', 'awaiting_packing_choice', None)
+        log.append(now, 'user2', 'moving', 'initial', 'awaiting_packing_choice', 1.5)
+        log.append(now, 'user1', 'moving', 'awaiting_packing_choice', 'completed', 60.0)
+
+        columns = log.read()
+        assert len(columns) == 3
+        assert columns.users == ['user1', 'user2']
+        assert columns.states == ['initial', 'awaiting_packing_choice', 'completed']
+        assert list(columns['user']) == [0, 1, 0]
+        assert list(columns['to_state']) == [1, 1, 2]
+        assert math.isnan(columns['duration'][0]) and columns['duration'][2] == 60.0
+        assert columns['timestamp'][0] == now.timestamp()
+
+        window = columns.window_mask('moving', start_time=now, end_time=now)
+        assert window.sum() == 3
+        assert columns.window_mask('organization').sum() == 0
+
+    def test_rejected_value_leaves_columns_aligned(self, log):
+        """Test a row with an invalid value is not partially appended"""
+        now = datetime(2024, 1, 1, 12, 0, 0)
+        with pytest.raises(ValueError):
+            log.append(now, 'user1', 'moving', 'initial', 'bad\nstate', 1.0)
+        log.append(now, 'user2', 'moving', 'initial', 'completed', None)
+
+        columns = log.read()
+        assert len(columns) == 1
+        assert {len(columns[name]) for name in ('timestamp', 'duration', 'user', 'flow',
+                                                'from_state', 'to_state')} == {1}
+        assert columns.users[columns['user'][0]] == 'user2'
+
+    def test_reopen_drops_partial_rows(self, tmp_path):
+        """Test reopening keeps complete rows and drops a torn last write"""
+        directory = str(tmp_path / 'transitions')
+        log = ColumnarTransitionLog(directory)
+        log.append(datetime(2024, 1, 1), 'user1', 'moving', 'initial', 'completed', None)
+        log.close()
+        # Simulate a crash midway through writing the next batch
+        with open(os.path.join(directory, 'timestamp.col'), 'ab') as f:
+            f.write(b'\0' * 8)
+
+        reopened = ColumnarTransitionLog(directory)
+        columns = reopened.read()
+        assert len(columns) == 1
+        assert columns.users == ['user1']
+        reopened.close()
+
+    def test_monitor_metrics_from_log(self, tmp_path):
+        """Test the monitor computes flow metrics from the log over exact windows"""
+        clock_times = iter([datetime(2024, 1, 1, 12, 0, 0) + timedelta(minutes=i) for i in range(4)])
+        log = ColumnarTransitionLog(str(tmp_path / 'transitions'))
+        monitor = StateTransitionMonitor(clock=lambda: next(clock_times), event_log=log)
+        monitor.log_transition('user1', 'initial', 'awaiting_packing_choice', 'moving')
+        monitor.record_transition('user1', 'awaiting_packing_choice', 'completed', 'moving')
+        monitor.log_transition('user2', 'initial', 'awaiting_packing_choice', 'moving')
+        monitor.log_transition('user2', 'awaiting_packing_choice', 'initial', 'moving')
+
+        metrics = monitor.get_flow_metrics('moving')
+        assert metrics['total_users'] == 2
+        assert metrics['total_transitions'] == 4
+        assert metrics['completion_rate'] == 0.5
+        assert metrics['avg_state_duration'] == '0:01:00'
+        assert metrics['common_paths'][0] == {'path': 'initial->awaiting_packing_choice', 'count': 2}
+        assert metrics['state_distribution']['awaiting_packing_choice']['total_duration'] == '0:02:00'
+
+        late = monitor.get_flow_metrics('moving', start_time=datetime(2024, 1, 1, 12, 2, 0))
+        assert late['total_transitions'] == 2
+        assert late['total_users'] == 1
+        log.close()
+
+    def test_sweep_and_close_write_recorded_transitions(self, tmp_path):
+        """Test recorded transitions reach disk on each sweep and on close"""
+        directory = str(tmp_path / 'transitions')
+        monitor = StateTransitionMonitor(event_log=ColumnarTransitionLog(directory))
+        manager = ConversationManager(monitor=monitor)
+        monitor.record_transition('user1', 'initial', 'awaiting_packing_choice', 'moving')
+
+        manager._sweep()
+        assert os.path.getsize(os.path.join(directory, 'timestamp.col')) == 8
+
+        monitor.record_transition('user1', 'awaiting_packing_choice', 'completed', 'moving')
+        monitor.close()
+        reopened = ColumnarTransitionLog(directory)
+        assert len(reopened.read()) == 2
+        reopened.close()
@@ -8,4 +8,16 @@ class ServiceCreationError(WhatsAppBotError):
 
 class ConversationError(WhatsAppBotError):
     """Raised for conversation-related errors"""
-    pass
\ No newline at end of file
+    pass
+
+class WhatsAppAPIError(WhatsAppBotError):
+    """Raised when the WhatsApp API keeps failing after all retries"""
+    
+    def __init__(self, message: str, status_code: int = None, retry_after: float = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+class WhatsAppRateLimitError(WhatsAppAPIError):
+    """Raised when the WhatsApp API still rate limits after all retries"""
+    pass
@@ -0,0 +1,356 @@
+"""Batch funnel analytics over state transition history with NumPy."""
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .transition_log import COLUMNS, ColumnarTransitionLog, TransitionColumns
+
+if TYPE_CHECKING:
+    from .state_monitor import StateTransition
+
+# State a flow ends in; users who reached it are not counted as dropped off
+COMPLETED_STATE = 'completed'
+
+
+class FlowAnalytics:
+    """Funnel, dwell time, drop-off and cohort analytics for transition history
+
+    Every computation is a handful of vectorized passes over the columns
+    (masking, sorting by user, bincount and reduceat), so it scales to
+    millions of transitions without creating Python objects per row.
+    Times are epoch seconds of the naive local datetimes the monitor uses.
+    """
+
+    def __init__(self, columns: TransitionColumns):
+        """
+        Wrap transition columns.
+
+        Args:
+            columns (TransitionColumns): History as equal length arrays
+        """
+        self._columns = columns
+
+    @classmethod
+    def from_log(cls, log: ColumnarTransitionLog) -> "FlowAnalytics":
+        """
+        Analyze the history kept in a columnar log.
+
+        Args:
+            log (ColumnarTransitionLog): Log to map
+
+        Returns:
+            FlowAnalytics: Analytics over the memory-mapped columns
+        """
+        return cls(log.read())
+
+    @classmethod
+    def from_transitions(cls, transitions: Iterable["StateTransition"]) -> "FlowAnalytics":
+        """
+        Load transition records into arrays.
+
+        Args:
+            transitions (Iterable[StateTransition]): Records to analyze
+
+        Returns:
+            FlowAnalytics: Analytics over the loaded records
+        """
+        tables: Dict[str, Dict[str, int]] = {'users': {}, 'flows': {}, 'states': {}}
+
+        def intern(table: str, value: str) -> int:
+            codes = tables[table]
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(codes)
+            return code
+
+        rows = [
+            (
+                t.timestamp.timestamp(),
+                t.duration.total_seconds() if t.duration else np.nan,
+                intern('users', t.user_id),
+                intern('flows', t.flow_type),
+                intern('states', t.from_state),
+                intern('states', t.to_state)
+            )
+            for t in transitions
+        ]
+        columns = {
+            name: np.fromiter((row[index] for row in rows), dtype=dtype, count=len(rows))
+            for index, (name, (_, dtype)) in enumerate(COLUMNS.items())
+        }
+        return cls(TransitionColumns(
+            columns, list(tables['users']), list(tables['flows']), list(tables['states'])
+        ))
+
+    def _select(self, flow_type: Optional[str], start_time: Optional[datetime],
+                end_time: Optional[datetime]) -> Dict[str, np.ndarray]:
+        """
+        Copy the rows of a flow within a time window.
+
+        Args:
+            flow_type: Flow to select, None for all
+            start_time: Inclusive start of the window
+            end_time: Inclusive end of the window
+
+        Returns:
+            Dict[str, np.ndarray]: Selected rows per column
+        """
+        mask = self._columns.window_mask(flow_type, start_time, end_time)
+        return {name: self._columns[name][mask] for name in COLUMNS}
+
+    @staticmethod
+    def _group_by_user(rows: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Order rows by user and time.
+
+        Args:
+            rows: Selected rows per column
+
+        Returns:
+            Tuple: Row order, and the start and end offsets of each user's run in that order
+        """
+        # Two stable passes instead of a lexsort: the log is already in time
+        # order, and user codes sort by radix
+        order = np.argsort(rows['timestamp'], kind='stable')
+        order = order[np.argsort(rows['user'][order], kind='stable')]
+        users = rows['user'][order]
+        boundaries = np.flatnonzero(users[1:] != users[:-1]) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(order)]))
+        return order, starts, ends
+
+    def _state_code(self, state: str) -> int:
+        """Get the code of a state, -1 if it never occurred (matches no rows)"""
+        code = self._columns.state_code(state)
+        return -1 if code is None else code
+
+    def flow_metrics(self, flow_type: str,
+                     start_time: Optional[datetime] = None,
+                     end_time: Optional[datetime] = None) -> Dict:
+        """
+        Compute the metrics of StateTransitionMonitor.get_flow_metrics.
+
+        Args:
+            flow_type: Type of business flow
+            start_time: Start of time window
+            end_time: End of time window
+
+        Returns:
+            Dict: total_users, total_transitions, completion_rate, avg_state_duration,
+                common_paths and state_distribution; empty without transitions
+        """
+        rows = self._select(flow_type, start_time, end_time)
+        total_transitions = len(rows['timestamp'])
+        if not total_transitions:
+            return {}
+
+        states = self._columns.states
+        num_states = len(states)
+        total_users = int(np.count_nonzero(np.bincount(rows['user'])))
+        completions = int(np.count_nonzero(rows['to_state'] == self._state_code(COMPLETED_STATE)))
+        durations = rows['duration'].astype(np.float64)
+        timed = ~np.isnan(durations)
+        duration_count = int(np.count_nonzero(timed))
+
+        # Paths as from_code * number of states + to_code; ties keep first occurrence order
+        path_codes = rows['from_state'].astype(np.int64) * num_states + rows['to_state']
+        paths, first_rows, path_counts = np.unique(path_codes, return_index=True, return_counts=True)
+        top = np.lexsort((first_rows, -path_counts))[:10]
+        common_paths = [
+            {'path': f"{states[path // num_states]}->{states[path % num_states]}",
+             'count': int(count)}
+            for path, count in zip(paths[top], path_counts[top])
+        ]
+
+        from_states = rows['from_state'][timed]
+        state_seconds = np.bincount(from_states, weights=durations[timed], minlength=num_states)
+        state_counts = np.bincount(from_states, minlength=num_states)
+        state_distribution = {
+            states[state]: {
+                'total_duration': str(timedelta(seconds=float(state_seconds[state]))),
+                'avg_duration': str(timedelta(seconds=float(state_seconds[state] / state_counts[state])))
+            }
+            for state in np.flatnonzero(state_counts)
+        }
+
+        avg_duration = (timedelta(seconds=float(durations[timed].sum()) / duration_count)
+                        if duration_count else timedelta())
+        return {
+            'total_users': total_users,
+            'total_transitions': total_transitions,
+            'completion_rate': completions / total_users,
+            'avg_state_duration': str(avg_duration),
+            'common_paths': common_paths,
+            'state_distribution': state_distribution
+        }
+
+    def funnel(self, steps: Sequence[str], flow_type: Optional[str] = None,
+               start_time: Optional[datetime] = None,
+               end_time: Optional[datetime] = None) -> List[Dict]:
+        """
+        Count users reaching each step of a funnel in order.
+
+        A user is first seen in a state when they enter it or, for states
+        such as 'initial' that are never entered by a transition, when they
+        leave it. A user reaches a step if they reached the previous one and
+        were first seen in this step no earlier.
+
+        Args:
+            steps: States of the funnel in order
+            flow_type: Flow to analyze, None for all
+            start_time: Start of time window
+            end_time: End of time window
+
+        Returns:
+            List[Dict]: Per step: step, users, conversion from the previous step and from the first
+        """
+        rows = self._select(flow_type, start_time, end_time)
+        num_users = len(self._columns.users)
+        reached = np.ones(num_users, dtype=bool)
+        previous_seen = np.full(num_users, -np.inf)
+        first_count = 0
+        result = []
+        for index, step in enumerate(steps):
+            code = self._state_code(step)
+            first_seen = np.full(num_users, np.inf)
+            for column in ('to_state', 'from_state'):
+                in_step = rows[column] == code
+                np.minimum.at(first_seen, rows['user'][in_step], rows['timestamp'][in_step])
+            reached &= np.isfinite(first_seen) & (first_seen >= previous_seen)
+            previous_seen = first_seen
+            users = int(np.count_nonzero(reached))
+            if index == 0:
+                first_count = users
+            previous_users = result[-1]['users'] if result else users
+            result.append({
+                'step': step,
+                'users': users,
+                'conversion': users / previous_users if previous_users else 0.0,
+                'conversion_from_start': users / first_count if first_count else 0.0
+            })
+        return result
+
+    def dwell_percentiles(self, flow_type: Optional[str] = None,
+                          percentiles: Sequence[float] = (50, 90, 99),
+                          start_time: Optional[datetime] = None,
+                          end_time: Optional[datetime] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Compute percentiles of the time spent in each state.
+
+        Args:
+            flow_type: Flow to analyze, None for all
+            percentiles: Percentiles to compute, 0-100
+            start_time: Start of time window
+            end_time: End of time window
+
+        Returns:
+            Dict[str, Dict[str, float]]: Per state: count and seconds per 'p<percentile>'
+        """
+        rows = self._select(flow_type, start_time, end_time)
+        durations = rows['duration'].astype(np.float64)
+        timed = ~np.isnan(durations)
+        states = rows['from_state'][timed]
+        durations = durations[timed]
+        # Grouping by state is enough, np.percentile partitions each group itself
+        order = np.argsort(states, kind='stable')
+        states = states[order]
+        durations = durations[order]
+        boundaries = np.flatnonzero(states[1:] != states[:-1]) + 1
+
+        result = {}
+        for group_states, group in zip(np.split(states, boundaries), np.split(durations, boundaries)):
+            if not len(group):
+                continue
+            values = np.percentile(group, percentiles)
+            stats = {'count': int(len(group))}
+            stats.update({f"p{p:g}": float(value) for p, value in zip(percentiles, values)})
+            result[self._columns.states[group_states[0]]] = stats
+        return result
+
+    def drop_off(self, flow_type: Optional[str] = None,
+                 abandon_after: timedelta = timedelta(hours=24),
+                 now: Optional[datetime] = None,
+                 terminal_states: Sequence[str] = (COMPLETED_STATE,),
+                 start_time: Optional[datetime] = None,
+                 end_time: Optional[datetime] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Count users who abandoned the flow in each state.
+
+        A user abandoned a state if it is the state of their latest
+        transition, it is not terminal, and nothing happened for at least
+        abandon_after.
+
+        Args:
+            flow_type: Flow to analyze, None for all
+            abandon_after: Inactivity after which a user counts as gone
+            now: Reference time, the latest transition by default
+            terminal_states: States that end the flow
+            start_time: Start of time window
+            end_time: End of time window
+
+        Returns:
+            Dict[str, Dict[str, float]]: Per entered state: entered, abandoned and rate
+        """
+        rows = self._select(flow_type, start_time, end_time)
+        if not len(rows['timestamp']):
+            return {}
+        num_states = len(self._columns.states)
+        order, _, ends = self._group_by_user(rows)
+        last = order[ends - 1]
+        last_states = rows['to_state'][last]
+        now_timestamp = now.timestamp() if now else float(rows['timestamp'].max())
+        terminal = np.isin(last_states, [self._state_code(state) for state in terminal_states])
+        idle = now_timestamp - rows['timestamp'][last] >= abandon_after.total_seconds()
+        abandoned = np.bincount(last_states[idle & ~terminal], minlength=num_states)
+
+        # Distinct (user, state) entries
+        seen = np.zeros((len(self._columns.users), num_states), dtype=bool)
+        seen[rows['user'], rows['to_state']] = True
+        entered = seen.sum(axis=0)
+        return {
+            self._columns.states[state]: {
+                'entered': int(entered[state]),
+                'abandoned': int(abandoned[state]),
+                'rate': float(abandoned[state] / entered[state])
+            }
+            for state in np.flatnonzero(entered)
+        }
+
+    def cohorts(self, flow_type: Optional[str] = None,
+                period: timedelta = timedelta(days=7),
+                start_time: Optional[datetime] = None,
+                end_time: Optional[datetime] = None) -> List[Dict]:
+        """
+        Break completion down by cohorts of users who started in the same period.
+
+        Args:
+            flow_type: Flow to analyze, None for all
+            period: Cohort width, aligned to the epoch
+            start_time: Start of time window
+            end_time: End of time window
+
+        Returns:
+            List[Dict]: Per cohort, oldest first: cohort_start, users, completed and completion_rate
+        """
+        rows = self._select(flow_type, start_time, end_time)
+        if not len(rows['timestamp']):
+            return []
+        order, starts, _ = self._group_by_user(rows)
+        first_seen = rows['timestamp'][order][starts]
+        completed_rows = (rows['to_state'] == self._state_code(COMPLETED_STATE))[order]
+        completed = np.logical_or.reduceat(completed_rows, starts)
+
+        period_seconds = period.total_seconds()
+        cohort_keys, cohort_index = np.unique(np.floor(first_seen / period_seconds), return_inverse=True)
+        users = np.bincount(cohort_index)
+        completions = np.bincount(cohort_index, weights=completed)
+        return [
+            {
+                'cohort_start': datetime.fromtimestamp(key * period_seconds).isoformat(),
+                'users': int(count),
+                'completed': int(done),
+                'completion_rate': float(done / count)
+            }
+            for key, count, done in zip(cohort_keys, users, completions)
+        ]
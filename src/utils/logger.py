@@ -1,34 +1,341 @@
 """Logging utilities for the application."""
+import atexit
+import copy
+import json
 import logging
+import os
+import queue
 import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional
+
+# Level of application loggers; DEBUG output is off unless asked for
+LOG_LEVEL: str = os.getenv('LOG_LEVEL', 'INFO').strip().upper()
+
+# Records queued for the background writer; 0 writes synchronously in the caller
+LOG_QUEUE_SIZE: int = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+# What a full queue does to the caller: 'drop' the record or 'block' until there is room
+LOG_OVERFLOW: str = os.getenv('LOG_OVERFLOW', 'drop').strip().lower()
+# Optional JSON-lines file sink with size-based rotation
+LOG_JSON_FILE: str = os.getenv('LOG_JSON_FILE', '')
+LOG_FILE_MAX_BYTES: int = int(os.getenv('LOG_FILE_MAX_BYTES', 10 * 1024 * 1024))
+LOG_FILE_BACKUPS: int = int(os.getenv('LOG_FILE_BACKUPS', 5))
+
+_TEXT_FORMATTER = logging.Formatter(
+    '%(asctime)s - %(levelname)s - %(name)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+# Package logger of the application; module loggers from getLogger(__name__)
+# inherit its level and handlers
+APP_LOGGER_NAME = __name__.split('.')[0]
+
+# Wildcard for DEBUG_TRACE_USERS that traces every user
+TRACE_ALL_USERS = '*'
+
+def _parse_trace_users(value: str) -> FrozenSet[str]:
+    """Parse a comma separated list of user IDs"""
+    return frozenset(user.strip() for user in value.split(',') if user.strip())
+
+# Users whose messages are traced on hot paths. Replaced as a whole, never
+# mutated, so readers need no lock.
+_trace_users: FrozenSet[str] = _parse_trace_users(os.getenv('DEBUG_TRACE_USERS', ''))
+
+class JsonLinesFormatter(logging.Formatter):
+    """Formats records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """
+        Format a record as a JSON line.
+
+        Args:
+            record (logging.LogRecord): The record to format
+
+        Returns:
+            str: JSON object with time, level, logger, message and context fields
+        """
+        entry: Dict[str, Any] = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName
+        }
+        user_id = getattr(record, 'user_id', None)
+        if user_id is not None:
+            entry['user_id'] = user_id
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class BoundedQueueHandler(QueueHandler):
+    """Queue handler that never lets a slow sink stall the caller unnoticed
+
+    Records go to a bounded in-memory queue drained by a QueueListener
+    thread. When the queue is full, records are dropped (and counted) or
+    the caller blocks until there is room, depending on the overflow mode.
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]", overflow: str = 'drop'):
+        """
+        Initialize the handler.
+
+        Args:
+            log_queue (queue.Queue): Bounded queue shared with the listener
+            overflow (str): 'drop' or 'block' when the queue is full
+        """
+        if overflow not in ('drop', 'block'):
+            raise ValueError(f"Unknown log overflow mode: {overflow}")
+        super().__init__(log_queue)
+        self._block = overflow == 'block'
+        self._dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    @property
+    def dropped(self) -> int:
+        """Number of records dropped because the queue was full"""
+        return self._dropped
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Snapshot a record for another thread, leaving sink formatting to the listener.
+
+        Args:
+            record (logging.LogRecord): The record to queue
+
+        Returns:
+            logging.LogRecord: Copy with its message resolved and exception rendered
+        """
+        record = copy.copy(record)
+        # Resolve now, arguments may be mutated once the caller moves on
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _TEXT_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """
+        Put a record on the queue according to the overflow mode.
+
+        Args:
+            record (logging.LogRecord): The prepared record
+        """
+        if self._block:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self._dropped += 1
+
+
+_sink_handlers: Optional[List[logging.Handler]] = None
+_queue_handler: Optional[BoundedQueueHandler] = None
+_listener: Optional[QueueListener] = None
+_backend_lock = threading.Lock()
+_app_logger_configured = False
+
+def _create_sinks() -> List[logging.Handler]:
+    """Create the handlers that actually write records"""
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setLevel(logging.DEBUG)
+    console_handler.setFormatter(_TEXT_FORMATTER)
+    sinks: List[logging.Handler] = [console_handler]
+
+    if LOG_JSON_FILE:
+        file_handler = RotatingFileHandler(
+            LOG_JSON_FILE,
+            maxBytes=LOG_FILE_MAX_BYTES,
+            backupCount=LOG_FILE_BACKUPS,
+            encoding='utf-8'
+        )
+        file_handler.setLevel(logging.DEBUG)
+        file_handler.setFormatter(JsonLinesFormatter())
+        sinks.append(file_handler)
+    return sinks
+
+def _get_backend_handlers() -> List[logging.Handler]:
+    """Get the shared handlers for application loggers, starting the listener once"""
+    global _sink_handlers, _queue_handler, _listener
+    with _backend_lock:
+        if _sink_handlers is None:
+            _sink_handlers = _create_sinks()
+            if LOG_QUEUE_SIZE > 0:
+                _queue_handler = BoundedQueueHandler(queue.Queue(LOG_QUEUE_SIZE), LOG_OVERFLOW)
+                _queue_handler.setLevel(logging.DEBUG)
+                _listener = QueueListener(_queue_handler.queue, *_sink_handlers, respect_handler_level=True)
+                _listener.start()
+                atexit.register(shutdown_logging)
+        return [_queue_handler] if _queue_handler is not None else list(_sink_handlers)
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the background writer"""
+    global _listener
+    with _backend_lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+
+def get_logging_stats() -> Dict[str, int]:
+    """
+    Get counters of the logging backend.
+
+    Returns:
+        Dict[str, int]: Queued records and records dropped on overflow
+    """
+    if _queue_handler is None:
+        return {'queued': 0, 'dropped': 0}
+    return {'queued': _queue_handler.queue.qsize(), 'dropped': _queue_handler.dropped}
+
+def configure_logging() -> logging.Logger:
+    """
+    Install the shared handlers and level on the application package logger once.
+
+    Every module logger under the package, including plain
+    logging.getLogger(__name__) ones, propagates to it.
+
+    Returns:
+        logging.Logger: The application package logger
+    """
+    global _app_logger_configured
+    app_logger = logging.getLogger(APP_LOGGER_NAME)
+    if not _app_logger_configured:
+        handlers = _get_backend_handlers()
+        with _backend_lock:
+            if not _app_logger_configured:
+                app_logger.setLevel(LOG_LEVEL)
+                # Traces bypass the logger level, so the handlers accept everything
+                for handler in handlers:
+                    app_logger.addHandler(handler)
+                _app_logger_configured = True
+    return app_logger
 
 def setup_logger(name: str) -> logging.Logger:
     """
     Create a logger with consistent formatting and handlers.
-    
+
+    Records are written by a background thread (see LOG_QUEUE_SIZE and
+    LOG_OVERFLOW), so a slow stdout consumer does not stall the caller.
+
     Args:
         name (str): The name for the logger, typically __name__ of the module
-        
+
     Returns:
         logging.Logger: Configured logger instance
     """
+    configure_logging()
     logger = logging.getLogger(name)
-    
+
+    # Application modules inherit the package logger's handlers
+    if name == APP_LOGGER_NAME or name.startswith(APP_LOGGER_NAME + '.'):
+        return logger
+
     # Only add handlers if they haven't been added already
     if not logger.handlers:
-        logger.setLevel(logging.DEBUG)
-        
-        # Console handler
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(logging.DEBUG)
-        
-        # Format with timestamp, level, and module name
-        formatter = logging.Formatter(
-            '%(asctime)s - %(levelname)s - %(name)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
+        logger.setLevel(LOG_LEVEL)
+        for handler in _get_backend_handlers():
+            logger.addHandler(handler)
+
+    return logger
+
+def set_trace_users(user_ids: Iterable[str]) -> None:
+    """
+    Replace the set of users traced on hot paths.
+
+    Args:
+        user_ids (Iterable[str]): User IDs to trace, or TRACE_ALL_USERS for everyone
+    """
+    global _trace_users
+    _trace_users = frozenset(user_ids)
+
+def enable_trace(user_id: str) -> None:
+    """
+    Start tracing a user's messages.
+
+    Args:
+        user_id (str): Unique identifier for the user
+    """
+    set_trace_users(_trace_users | {user_id})
+
+def disable_trace(user_id: str) -> None:
+    """
+    Stop tracing a user's messages.
+
+    Args:
+        user_id (str): Unique identifier for the user
+    """
+    set_trace_users(_trace_users - {user_id})
+
+def is_traced(user_id: str) -> bool:
+    """
+    Check whether a user's messages are traced.
+
+    Args:
+        user_id (str): Unique identifier for the user
+
+    Returns:
+        bool: True if the user (or every user) is traced
+    """
+    users = _trace_users
+    return bool(users) and (user_id in users or TRACE_ALL_USERS in users)
+
+
+class TraceLogger:
+    """Per-user debug tracing for hot paths.
+
+    A trace call for an untraced user is a set lookup: nothing is formatted
+    and no record is created. Arguments are formatted lazily with %-style
+    placeholders, so callers pass payloads as arguments rather than building
+    f-strings. Records of traced users are emitted at DEBUG whatever the
+    logger level, and carry the user ID in `record.user_id`.
+    """
+
+    __slots__ = ('_logger',)
+
+    def __init__(self, name: str):
+        """
+        Initialize the trace logger.
+
+        Args:
+            name (str): The name for the logger, typically __name__ of the module
+        """
+        self._logger = setup_logger(name)
+
+    def trace(self, user_id: str, msg: str, *args: Any) -> None:
+        """
+        Log a debug trace for a user if tracing is on for them.
+
+        Args:
+            user_id (str): User the message concerns
+            msg (str): %-style format string
+            *args: Values for the format string
+        """
+        users = _trace_users
+        if not users or (user_id not in users and TRACE_ALL_USERS not in users):
+            return
+        record = self._logger.makeRecord(
+            self._logger.name, logging.DEBUG, '(trace)', 0,
+            '[%s] ' + msg, (user_id, *args), None, extra={'user_id': user_id}
         )
-        console_handler.setFormatter(formatter)
-        
-        logger.addHandler(console_handler)
-    
-    return logger
\ No newline at end of file
+        self._logger.handle(record)
+
+def get_trace_logger(name: str) -> TraceLogger:
+    """
+    Create a per-user trace logger.
+
+    Args:
+        name (str): The name for the logger, typically __name__ of the module
+
+    Returns:
+        TraceLogger: Trace logger writing through setup_logger's handlers
+    """
+    return TraceLogger(name)
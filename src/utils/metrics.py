@@ -0,0 +1,405 @@
+"""In-process metrics exported in the Prometheus text format."""
+import math
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Mapping, Sequence, Tuple
+
+# Upper bounds in seconds, suited to request and API call latencies
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# Content type of the text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LabelValues = Tuple[str, ...]
+
+def _escape_label_value(value: str) -> str:
+    """Escape a label value for the text format"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """Format label pairs as {name="value",...}, or nothing without labels"""
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{_escape_label_value(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+def _format_value(value: float) -> str:
+    """Format a sample value, including the special float values"""
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if math.isnan(value):
+        return 'NaN'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _CounterChild:
+    """Counter for one label combination"""
+
+    __slots__ = ('_value', '_lock')
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """
+        Increase the counter.
+
+        Args:
+            amount (float): Non-negative amount to add
+        """
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        """Current value"""
+        return self._value
+
+
+class _GaugeChild:
+    """Gauge for one label combination"""
+
+    __slots__ = ('_value', '_lock')
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        """
+        Set the gauge.
+
+        Args:
+            value (float): New value
+        """
+        self._value = float(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        """
+        Increase (or with a negative amount, decrease) the gauge.
+
+        Args:
+            amount (float): Amount to add
+        """
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        """
+        Decrease the gauge.
+
+        Args:
+            amount (float): Amount to subtract
+        """
+        self.inc(-amount)
+
+    @property
+    def value(self) -> float:
+        """Current value"""
+        return self._value
+
+
+class _HistogramChild:
+    """Histogram for one label combination, with buckets allocated up front"""
+
+    __slots__ = ('_upper_bounds', '_counts', '_sum', '_lock')
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self._upper_bounds = upper_bounds
+        # One slot per bound plus the +Inf overflow slot
+        self._counts: List[int] = [0] * (len(upper_bounds) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """
+        Record an observation.
+
+        Args:
+            value (float): Observed value, e.g. seconds
+        """
+        index = bisect_left(self._upper_bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """
+        Get consistent cumulative bucket counts and the sum.
+
+        Returns:
+            Tuple[List[int], float]: Cumulative count per bound (the last is +Inf) and the sum
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = 0
+        for index, count in enumerate(counts):
+            cumulative += count
+            counts[index] = cumulative
+        return counts, total
+
+
+class _Metric:
+    """Base class of metrics with a fixed set of label names"""
+
+    metric_type = ''
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        """
+        Initialize the metric.
+
+        Args:
+            name (str): Metric name
+            documentation (str): Help text
+            label_names (Sequence[str]): Names of the labels, empty for an unlabelled metric
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_names: Tuple[str, ...] = tuple(label_names)
+        self._children: Dict[LabelValues, object] = {}
+        self._lock = threading.Lock()
+        if not self.label_names:
+            self._unlabelled = self.labels()
+
+    def labels(self, *values: str):
+        """
+        Get the child for a label combination, creating it on first use.
+
+        Callers on hot paths should look children up once and keep them.
+
+        Args:
+            *values (str): One value per label name
+
+        Returns:
+            The counter, gauge or histogram child for the labels
+        """
+        if len(values) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {values}")
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def collect(self) -> List[str]:
+        """
+        Render the samples of the metric.
+
+        Returns:
+            List[str]: Sample lines in the text format
+        """
+        with self._lock:
+            children = list(self._children.items())
+        lines = []
+        for values, child in children:
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values: LabelValues, child) -> List[str]:
+        return [f"{self.name}{_format_labels(self.label_names, values)} {_format_value(child.value)}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    metric_type = 'counter'
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """
+        Increase an unlabelled counter.
+
+        Args:
+            amount (float): Non-negative amount to add
+        """
+        self._unlabelled.inc(amount)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+
+    metric_type = 'gauge'
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        """
+        Set an unlabelled gauge.
+
+        Args:
+            value (float): New value
+        """
+        self._unlabelled.set(value)
+
+
+class Histogram(_Metric):
+    """Distribution of observations over fixed buckets"""
+
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        """
+        Initialize the histogram.
+
+        Args:
+            name (str): Metric name
+            documentation (str): Help text
+            label_names (Sequence[str]): Names of the labels, empty for an unlabelled metric
+            buckets (Iterable[float]): Bucket upper bounds; +Inf is implied
+        """
+        self._upper_bounds = tuple(sorted(float(bound) for bound in buckets if not math.isinf(bound)))
+        super().__init__(name, documentation, label_names)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self._upper_bounds)
+
+    def observe(self, value: float) -> None:
+        """
+        Record an observation on an unlabelled histogram.
+
+        Args:
+            value (float): Observed value
+        """
+        self._unlabelled.observe(value)
+
+    def _render_child(self, values: LabelValues, child: _HistogramChild) -> List[str]:
+        counts, total = child.snapshot()
+        bucket_names = self.label_names + ('le',)
+        lines = [
+            f"{self.name}_bucket{_format_labels(bucket_names, values + (_format_value(bound),))} {count}"
+            for bound, count in zip(self._upper_bounds + (math.inf,), counts)
+        ]
+        labels = _format_labels(self.label_names, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {counts[-1]}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """Metric whose samples are read from a callback at scrape time
+
+    Suits values that are already counted elsewhere, e.g. active
+    conversations, so nothing extra happens on the paths that change them.
+    """
+
+    def __init__(self, name: str, documentation: str, metric_type: str,
+                 label_names: Sequence[str],
+                 callback: Callable[[], Mapping[LabelValues, float]]):
+        """
+        Initialize the metric.
+
+        Args:
+            name (str): Metric name
+            documentation (str): Help text
+            metric_type (str): 'counter' or 'gauge'
+            label_names (Sequence[str]): Names of the labels
+            callback (Callable): Returns the value per label values tuple
+        """
+        # No children: every sample comes from the callback
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.metric_type = metric_type
+        self._callback = callback
+
+    def labels(self, *values: str):
+        raise TypeError(f"{self.name} is read from a callback")
+
+    def collect(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, values)} {_format_value(value)}"
+            for values, value in self._callback().items()
+        ]
+
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        """
+        Add a metric to the registry.
+
+        Args:
+            metric (_Metric): Metric with a name not yet registered
+
+        Returns:
+            _Metric: The registered metric
+
+        Raises:
+            ValueError: If a metric with the same name is registered
+        """
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def unregister(self, name: str) -> None:
+        """
+        Remove a metric from the registry.
+
+        Args:
+            name (str): Metric name
+        """
+        with self._lock:
+            self._metrics.pop(name, None)
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        """Create and register a counter"""
+        return self.register(Counter(name, documentation, label_names))
+
+    def gauge(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Gauge:
+        """Create and register a gauge"""
+        return self.register(Gauge(name, documentation, label_names))
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Create and register a histogram"""
+        return self.register(Histogram(name, documentation, label_names, buckets))
+
+    def callback(self, name: str, documentation: str, metric_type: str,
+                 label_names: Sequence[str],
+                 callback: Callable[[], Mapping[LabelValues, float]]) -> CallbackMetric:
+        """Create and register a metric read from a callback at scrape time"""
+        return self.register(CallbackMetric(name, documentation, metric_type, label_names, callback))
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text format.
+
+        Returns:
+            str: Exposition text
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+            lines.extend(metric.collect())
+        return '\n'.join(lines) + '\n'
+
+
+# Registry of the application metrics exported on /metrics
+REGISTRY = MetricsRegistry()
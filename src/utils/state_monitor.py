@@ -1,13 +1,21 @@
 """State transition monitoring and metrics."""
 import logging
-from typing import Dict, List, Optional
+import threading
+import zlib
+from typing import Callable, Counter as CounterType, Deque, Dict, List, Optional, Set, Tuple
 from datetime import datetime, timedelta
 import json
 from dataclasses import dataclass
-from collections import defaultdict
+from collections import Counter, OrderedDict, defaultdict, deque
+
+from .flow_analytics import FlowAnalytics
+from .transition_log import ColumnarTransitionLog
 
 logger = logging.getLogger(__name__)
 
+# Resolution of the per-user sample rate
+_SAMPLE_SCALE = 10000
+
 @dataclass
 class StateTransition:
     """State transition event data"""
@@ -18,32 +26,191 @@ class StateTransition:
     flow_type: str
     duration: Optional[timedelta] = None
 
+class FlowBucket:
+    """Rollup of one flow's transitions over one time bucket"""
+
+    __slots__ = ('start', 'transitions', 'completions', 'users',
+                 'duration_sum', 'duration_count', 'paths', 'state_durations')
+
+    def __init__(self, start: int):
+        """
+        Initialize an empty bucket.
+
+        Args:
+            start (int): Bucket start as a POSIX timestamp
+        """
+        self.start = start
+        self.transitions = 0
+        self.completions = 0
+        self.users: Set[str] = set()
+        self.duration_sum = 0.0
+        self.duration_count = 0
+        # (from_state, to_state) -> count
+        self.paths: CounterType[Tuple[str, str]] = Counter()
+        # from_state -> [seconds spent in it, number of timed exits]
+        self.state_durations: Dict[str, List[float]] = {}
+
+    def add(self, transition: StateTransition) -> None:
+        """
+        Fold a transition into the rollup.
+
+        Args:
+            transition (StateTransition): Transition that happened in this bucket
+        """
+        self.transitions += 1
+        self.users.add(transition.user_id)
+        if transition.to_state == 'completed':
+            self.completions += 1
+        self.paths[transition.from_state, transition.to_state] += 1
+        if transition.duration:
+            seconds = transition.duration.total_seconds()
+            self.duration_sum += seconds
+            self.duration_count += 1
+            totals = self.state_durations.get(transition.from_state)
+            if totals is None:
+                self.state_durations[transition.from_state] = [seconds, 1]
+            else:
+                totals[0] += seconds
+                totals[1] += 1
+
 class StateTransitionMonitor:
-    """Monitors and tracks state transitions"""
-    
-    def __init__(self):
-        self._transitions: List[StateTransition] = []
+    """Monitors and tracks state transitions
+
+    Memory is bounded: each user keeps a ring buffer of their latest
+    transitions, and each flow keeps rollups per time bucket that are
+    updated as transitions are logged. Buckets older than the retention
+    window are dropped together with the users last seen in them, so flow
+    metrics cost O(buckets) rather than O(history).
+    """
+
+    def __init__(self, max_user_history: int = 100,
+                 bucket_seconds: int = 3600,
+                 retention: timedelta = timedelta(days=7),
+                 clock: Callable[[], datetime] = datetime.now,
+                 sample_rate: float = 1.0,
+                 max_pending: int = 1024,
+                 event_log: Optional[ColumnarTransitionLog] = None):
+        """
+        Initialize the monitor.
+
+        Args:
+            max_user_history (int): Transitions kept per user
+            bucket_seconds (int): Width of the flow metric buckets
+            retention (timedelta): How long transitions count towards metrics
+            clock (Callable[[], datetime]): Source of transition timestamps
+            sample_rate (float): Share of users whose recorded transitions are kept
+            max_pending (int): Recorded transitions queued before the recorder folds them
+            event_log (Optional[ColumnarTransitionLog]): Keeps every transition for flow
+                metrics beyond the retention window, None for rollups only
+        """
+        if max_user_history <= 0 or bucket_seconds <= 0 or max_pending <= 0:
+            raise ValueError("max_user_history, bucket_seconds and max_pending must be positive")
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be between 0 and 1")
+        self._max_user_history = max_user_history
+        self._bucket_seconds = bucket_seconds
+        self._retention = retention
+        self._clock = clock
+        self._event_log = event_log
+        # Users are sampled by hash so the kept ones have complete paths
+        self._sample_threshold = int(sample_rate * _SAMPLE_SCALE)
+        self._max_pending = max_pending
+        self._pending: Deque[Tuple[datetime, str, str, str, str]] = deque()
+        self._user_history: Dict[str, Deque[StateTransition]] = {}
         self._user_states: Dict[str, Dict] = defaultdict(dict)
-        
-    def log_transition(self, user_id: str, from_state: str, 
+        # flow_type -> bucket start -> rollup, oldest first
+        self._buckets: Dict[str, "OrderedDict[int, FlowBucket]"] = {}
+        # (flow_type, from_state, to_state) -> transitions since start, never expired
+        self._transition_totals: Dict[Tuple[str, str, str], int] = {}
+        # Start timestamp and datetime bounds of the bucket of the latest transition
+        self._current_bucket: Optional[Tuple[int, datetime, datetime]] = None
+        self._lock = threading.Lock()
+
+    def log_transition(self, user_id: str, from_state: str,
                       to_state: str, flow_type: str) -> None:
         """Log a state transition
-        
+
         Args:
             user_id: User identifier
             from_state: Previous state
             to_state: New state
             flow_type: Type of business flow
         """
-        now = datetime.now()
-        
+        now = self._clock()
+
+        with self._lock:
+            self._drain()
+            transition = self._fold(now, user_id, from_state, to_state, flow_type)
+
+        # Log transition
+        logger.info(
+            "State transition: %s -> %s (user: %s, flow: %s)",
+            from_state, to_state, user_id, flow_type
+        )
+
+        # Update metrics
+        self._update_metrics(transition)
+
+    def record_transition(self, user_id: str, from_state: str,
+                          to_state: str, flow_type: str) -> None:
+        """Record a state transition from a hot path
+
+        Unlike log_transition this takes no lock and writes no log line: the
+        event is appended to a pending queue (deque appends are atomic) and
+        folded into the indexes by the next query, or by the caller that
+        finds the queue full and the lock free. Users outside the sample
+        are skipped entirely.
+
+        Args:
+            user_id: User identifier
+            from_state: Previous state
+            to_state: New state
+            flow_type: Type of business flow
+        """
+        threshold = self._sample_threshold
+        if threshold < _SAMPLE_SCALE and (
+            threshold == 0 or zlib.crc32(user_id.encode()) % _SAMPLE_SCALE >= threshold
+        ):
+            return
+        pending = self._pending
+        pending.append((self._clock(), user_id, from_state, to_state, flow_type))
+        if len(pending) >= self._max_pending and self._lock.acquire(blocking=False):
+            try:
+                self._drain()
+            finally:
+                self._lock.release()
+
+    def _drain(self) -> None:
+        """Fold recorded transitions into the indexes; the lock must be held"""
+        pending = self._pending
+        while pending:
+            self._fold(*pending.popleft())
+
+    def _fold(self, now: datetime, user_id: str, from_state: str,
+              to_state: str, flow_type: str) -> StateTransition:
+        """
+        Add a transition to the user history and flow rollups; the lock must be held.
+
+        Args:
+            now: Time of the transition
+            user_id: User identifier
+            from_state: Previous state
+            to_state: New state
+            flow_type: Type of business flow
+
+        Returns:
+            StateTransition: The stored transition
+        """
         # Calculate duration in previous state
         duration = None
-        if user_id in self._user_states:
-            last_transition = self._user_states[user_id].get('last_transition')
+        state = self._user_states.get(user_id)
+        if state is None:
+            state = self._user_states[user_id] = {}
+        else:
+            last_transition = state.get('last_transition')
             if last_transition:
                 duration = now - last_transition
-                
+
         # Create transition record
         transition = StateTransition(
             user_id=user_id,
@@ -53,40 +220,51 @@ class StateTransitionMonitor:
             flow_type=flow_type,
             duration=duration
         )
-        
+
         # Update user state tracking
-        self._user_states[user_id].update({
-            'current_state': to_state,
-            'last_transition': now,
-            'flow_type': flow_type
-        })
-        
+        state['current_state'] = to_state
+        state['last_transition'] = now
+        state['flow_type'] = flow_type
+
         # Store transition
-        self._transitions.append(transition)
-        
-        # Log transition
-        logger.info(
-            f"State transition: {from_state} -> {to_state} "
-            f"(user: {user_id}, flow: {flow_type})"
-        )
-        
-        # Update metrics
-        self._update_metrics(transition)
-        
+        history = self._user_history.get(user_id)
+        if history is None:
+            history = self._user_history[user_id] = deque(maxlen=self._max_user_history)
+        history.append(transition)
+
+        bounds = self._current_bucket
+        if bounds is None or not bounds[1] <= now < bounds[2]:
+            # Retention only moves on at bucket boundaries
+            start = self._bucket_start(now)
+            bounds = self._current_bucket = (
+                start,
+                datetime.fromtimestamp(start, now.tzinfo),
+                datetime.fromtimestamp(start + self._bucket_seconds, now.tzinfo)
+            )
+            self._expire(now)
+        self._get_bucket(flow_type, bounds[0]).add(transition)
+        key = (flow_type, from_state, to_state)
+        self._transition_totals[key] = self._transition_totals.get(key, 0) + 1
+        if self._event_log is not None:
+            self._event_log.append(
+                now, user_id, flow_type, from_state, to_state,
+                duration.total_seconds() if duration else None
+            )
+        return transition
+
     def get_user_flow_history(self, user_id: str) -> List[Dict]:
         """Get state transition history for a user
-        
+
         Args:
             user_id: User identifier
-            
+
         Returns:
-            List of transition records
+            List of the user's latest transition records, oldest first
         """
-        user_transitions = [
-            t for t in self._transitions
-            if t.user_id == user_id
-        ]
-        
+        with self._lock:
+            self._drain()
+            user_transitions = list(self._user_history.get(user_id, ()))
+
         def format_duration(td: Optional[timedelta]) -> Optional[str]:
             if not td:
                 return None
@@ -96,7 +274,7 @@ class StateTransitionMonitor:
             minutes = (total_seconds % 3600) // 60
             seconds = total_seconds % 60
             return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-        
+
         return [
             {
                 'from_state': t.from_state,
@@ -107,121 +285,231 @@ class StateTransitionMonitor:
             }
             for t in user_transitions
         ]
-        
+
+    def get_transition_counts(self) -> Dict[Tuple[str, str, str], int]:
+        """Get the number of transitions seen since start
+
+        Unlike the flow metrics these counts are not subject to retention,
+        so they can be exported as monotonic counters. With sampling they
+        cover the sampled users only.
+
+        Returns:
+            Dict[Tuple[str, str, str], int]: Count per (flow_type, from_state, to_state)
+        """
+        with self._lock:
+            self._drain()
+            return dict(self._transition_totals)
+
+    def flush(self) -> None:
+        """Fold recorded transitions and write the event log to disk
+
+        Called periodically by the conversation sweeper, so a crash loses at
+        most one sweep interval of transitions.
+        """
+        with self._lock:
+            self._drain()
+            if self._event_log is not None:
+                self._event_log.flush()
+
+    def close(self) -> None:
+        """Flush and close the event log; later transitions only update the rollups"""
+        with self._lock:
+            self._drain()
+            event_log, self._event_log = self._event_log, None
+        if event_log is not None:
+            event_log.close()
+
+    def get_analytics(self) -> FlowAnalytics:
+        """Get batch analytics over the transition history
+
+        Returns:
+            FlowAnalytics: Over the event log if configured, otherwise over
+                the per-user histories (the latest transitions of users
+                within retention)
+        """
+        with self._lock:
+            self._drain()
+            if self._event_log is None:
+                transitions = [t for history in self._user_history.values() for t in history]
+        if self._event_log is not None:
+            return FlowAnalytics.from_log(self._event_log)
+        return FlowAnalytics.from_transitions(transitions)
+
     def get_flow_metrics(self, flow_type: str,
                         start_time: Optional[datetime] = None,
                         end_time: Optional[datetime] = None) -> Dict:
         """Get metrics for a specific flow type
-        
+
+        With an event log the metrics are computed from the full history,
+        with an exact time window. Otherwise they come from the rollups
+        within retention, and the time window is applied per bucket: every
+        bucket overlapping [start_time, end_time] is counted in full.
+
         Args:
             flow_type: Type of business flow
             start_time: Start of time window
             end_time: End of time window
-            
+
         Returns:
             Dictionary of flow metrics
         """
-        # Filter transitions by time window
-        transitions = [
-            t for t in self._transitions
-            if t.flow_type == flow_type
-            and (not start_time or t.timestamp >= start_time)
-            and (not end_time or t.timestamp <= end_time)
-        ]
-        
-        if not transitions:
-            return {}
-            
-        # Calculate metrics
-        total_users = len(set(t.user_id for t in transitions))
-        completion_rate = len([
-            t for t in transitions
-            if t.to_state == 'completed'
-        ]) / total_users if total_users > 0 else 0
-        
-        avg_duration = timedelta()
-        duration_count = 0
-        for t in transitions:
-            if t.duration:
-                avg_duration += t.duration
-                duration_count += 1
-        if duration_count > 0:
-            avg_duration = avg_duration / duration_count
-            
+        if self._event_log is not None:
+            with self._lock:
+                self._drain()
+            return FlowAnalytics.from_log(self._event_log).flow_metrics(flow_type, start_time, end_time)
+
+        first = self._bucket_start(start_time) if start_time else None
+        last = self._bucket_start(end_time) if end_time else None
+
+        with self._lock:
+            self._drain()
+            buckets = [
+                bucket for start, bucket in self._buckets.get(flow_type, {}).items()
+                if (first is None or start >= first) and (last is None or start <= last)
+            ]
+            if not buckets:
+                return {}
+
+            # Calculate metrics
+            users: Set[str] = set()
+            total_transitions = completions = duration_count = 0
+            duration_sum = 0.0
+            for bucket in buckets:
+                users.update(bucket.users)
+                total_transitions += bucket.transitions
+                completions += bucket.completions
+                duration_sum += bucket.duration_sum
+                duration_count += bucket.duration_count
+            common_paths = self._get_common_paths(buckets)
+            state_distribution = self._get_state_distribution(buckets)
+
+        total_users = len(users)
+        completion_rate = completions / total_users if total_users > 0 else 0
+        avg_duration = timedelta(seconds=duration_sum / duration_count) if duration_count else timedelta()
+
         return {
             'total_users': total_users,
-            'total_transitions': len(transitions),
+            'total_transitions': total_transitions,
             'completion_rate': completion_rate,
             'avg_state_duration': str(avg_duration),
-            'common_paths': self._get_common_paths(transitions),
-            'state_distribution': self._get_state_distribution(transitions)
+            'common_paths': common_paths,
+            'state_distribution': state_distribution
         }
-        
+
+    def _bucket_start(self, when: datetime) -> int:
+        """Get the start of the bucket a time falls in, as a POSIX timestamp"""
+        timestamp = int(when.timestamp())
+        return timestamp - timestamp % self._bucket_seconds
+
+    def _get_bucket(self, flow_type: str, start: int) -> FlowBucket:
+        """
+        Get the rollup of a flow for a bucket.
+
+        Args:
+            flow_type: Type of business flow
+            start: Bucket start as a POSIX timestamp
+
+        Returns:
+            FlowBucket: Existing or newly created bucket
+        """
+        buckets = self._buckets.get(flow_type)
+        if buckets is None:
+            buckets = self._buckets[flow_type] = OrderedDict()
+        bucket = buckets.get(start)
+        if bucket is None:
+            bucket = buckets[start] = FlowBucket(start)
+            # Clock steps backwards are rare; keep the oldest-first order anyway
+            if len(buckets) > 1 and next(iter(buckets)) > start:
+                for key in sorted(buckets):
+                    buckets.move_to_end(key)
+        return bucket
+
+    def _expire(self, now: datetime) -> None:
+        """
+        Drop buckets that fell out of the retention window, and the users
+        whose latest transition was in them.
+
+        Args:
+            now: Current time
+        """
+        cutoff = now - self._retention
+        cutoff_timestamp = cutoff.timestamp()
+        for flow_type, buckets in list(self._buckets.items()):
+            while buckets:
+                start, bucket = next(iter(buckets.items()))
+                if start + self._bucket_seconds > cutoff_timestamp:
+                    break
+                del buckets[start]
+                for user_id in bucket.users:
+                    last_transition = self._user_states.get(user_id, {}).get('last_transition')
+                    if last_transition is None or last_transition < cutoff:
+                        self._user_states.pop(user_id, None)
+                        self._user_history.pop(user_id, None)
+            if not buckets:
+                del self._buckets[flow_type]
+
     def _update_metrics(self, transition: StateTransition) -> None:
         """Update metrics for a transition
-        
+
         Args:
             transition: State transition event
         """
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
         try:
             # This would integrate with your metrics collection system
             # For example, using Prometheus or similar:
             metrics = {
                 f"state_transition.{transition.from_state}.{transition.to_state}": 1,
-                f"state_duration.{transition.from_state}": 
+                f"state_duration.{transition.from_state}":
                     transition.duration.total_seconds() if transition.duration else 0
             }
-            
+
             logger.debug(f"Updated metrics: {json.dumps(metrics)}")
-            
+
         except Exception as e:
-            logger.error(f"Error updating metrics: {str(e)}")
-            
-    def _get_common_paths(self, transitions: List[StateTransition]) -> List[Dict]:
+            logger.error("Error updating metrics: %s", e)
+
+    def _get_common_paths(self, buckets: List[FlowBucket]) -> List[Dict]:
         """Get most common state transition paths
-        
+
         Args:
-            transitions: List of transitions to analyze
-            
+            buckets: Rollups to analyze
+
         Returns:
             List of common paths with counts
         """
-        paths = defaultdict(int)
-        for t in transitions:
-            path = f"{t.from_state}->{t.to_state}"
-            paths[path] += 1
-            
+        paths: CounterType[Tuple[str, str]] = Counter()
+        for bucket in buckets:
+            paths.update(bucket.paths)
+
         return [
-            {'path': path, 'count': count}
-            for path, count in sorted(
-                paths.items(),
-                key=lambda x: x[1],
-                reverse=True
-            )[:10]  # Top 10 most common
+            {'path': f"{from_state}->{to_state}", 'count': count}
+            for (from_state, to_state), count in paths.most_common(10)  # Top 10 most common
         ]
-        
-    def _get_state_distribution(self, transitions: List[StateTransition]) -> Dict:
+
+    def _get_state_distribution(self, buckets: List[FlowBucket]) -> Dict:
         """Get distribution of time spent in each state
-        
+
         Args:
-            transitions: List of transitions to analyze
-            
+            buckets: Rollups to analyze
+
         Returns:
             Dictionary of state durations
         """
-        state_durations = defaultdict(timedelta)
-        state_counts = defaultdict(int)
-        
-        for t in transitions:
-            if t.duration:
-                state_durations[t.from_state] += t.duration
-                state_counts[t.from_state] += 1
-                
+        state_seconds: Dict[str, float] = defaultdict(float)
+        state_counts: Dict[str, int] = defaultdict(int)
+
+        for bucket in buckets:
+            for state, (seconds, count) in bucket.state_durations.items():
+                state_seconds[state] += seconds
+                state_counts[state] += count
+
         return {
             state: {
-                'total_duration': str(duration),
-                'avg_duration': str(duration / state_counts[state])
+                'total_duration': str(timedelta(seconds=seconds)),
+                'avg_duration': str(timedelta(seconds=seconds / state_counts[state]))
                 if state_counts[state] > 0 else '0:00:00'
             }
-            for state, duration in state_durations.items()
-        }
\ No newline at end of file
+            for state, seconds in state_seconds.items()
+        }
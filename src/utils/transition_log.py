@@ -0,0 +1,255 @@
+"""Columnar, memory-mapped log of state transitions for long-term analysis."""
+import logging
+import math
+import os
+import threading
+from array import array
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Column name -> (array typecode for buffering, NumPy dtype for reading), native byte order
+COLUMNS: Dict[str, Tuple[str, str]] = {
+    'timestamp': ('d', 'f8'),  # Epoch seconds
+    'duration': ('f', 'f4'),   # Seconds spent in from_state, NaN if unknown
+    'user': ('I', 'u4'),
+    'flow': ('H', 'u2'),
+    'from_state': ('H', 'u2'),
+    'to_state': ('H', 'u2'),
+}
+
+# Interned string tables: users for 'user', flows for 'flow', states for both state columns
+_TABLES = ('users', 'flows', 'states')
+
+
+class _StringTable:
+    """Append-only string table backed by a text file, one value per line"""
+
+    __slots__ = ('_codes', '_values', '_file')
+
+    def __init__(self, path: str):
+        """
+        Load or create a table.
+
+        Args:
+            path (str): File holding the values in code order
+        """
+        self._values: List[str] = []
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self._values = f.read().split('\n')[:-1]
+        self._codes: Dict[str, int] = {value: code for code, value in enumerate(self._values)}
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def intern(self, value: str) -> int:
+        """
+        Get the code of a value, adding it on first use.
+
+        Args:
+            value (str): Value without line breaks
+
+        Returns:
+            int: Code of the value
+        """
+        code = self._codes.get(value)
+        if code is None:
+            if '\n' in value:
+                raise ValueError(f"Line breaks are not allowed in interned values: {value!r}")
+            code = self._codes[value] = len(self._values)
+            self._values.append(value)
+            # Written before any row using the code can be flushed
+            self._file.write(value + '\n')
+            self._file.flush()
+        return code
+
+    @property
+    def values(self) -> List[str]:
+        """Values in code order"""
+        return self._values
+
+    def close(self) -> None:
+        """Close the backing file"""
+        self._file.close()
+
+
+class TransitionColumns:
+    """Read-only view of the log as NumPy arrays, memory-mapped from the column files"""
+
+    def __init__(self, columns: Dict[str, np.ndarray], users: List[str],
+                 flows: List[str], states: List[str]):
+        """
+        Wrap the mapped columns.
+
+        Args:
+            columns (Dict[str, np.ndarray]): Equal length array per column name
+            users (List[str]): User IDs by code
+            flows (List[str]): Flow types by code
+            states (List[str]): State names by code
+        """
+        self.columns = columns
+        self.users = users
+        self.flows = flows
+        self.states = states
+
+    def __len__(self) -> int:
+        return len(self.columns['timestamp'])
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def state_code(self, state: str) -> Optional[int]:
+        """Get the code of a state name, None if it never occurred"""
+        try:
+            return self.states.index(state)
+        except ValueError:
+            return None
+
+    def window_mask(self, flow_type: Optional[str] = None,
+                    start_time: Optional[datetime] = None,
+                    end_time: Optional[datetime] = None) -> np.ndarray:
+        """
+        Select the rows of a flow within a time window.
+
+        Args:
+            flow_type (Optional[str]): Flow to select, None for all
+            start_time (Optional[datetime]): Inclusive start of the window
+            end_time (Optional[datetime]): Inclusive end of the window
+
+        Returns:
+            np.ndarray: Boolean mask over the rows
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if flow_type is not None:
+            if flow_type not in self.flows:
+                return np.zeros(len(self), dtype=bool)
+            mask &= self.columns['flow'] == self.flows.index(flow_type)
+        if start_time is not None:
+            mask &= self.columns['timestamp'] >= start_time.timestamp()
+        if end_time is not None:
+            mask &= self.columns['timestamp'] <= end_time.timestamp()
+        return mask
+
+
+class ColumnarTransitionLog:
+    """Append-only transition log stored as one fixed-width file per column
+
+    User IDs, flow types and states are interned into small integer codes
+    kept in text tables next to the columns, so a transition costs 22 bytes
+    on disk. Appends are buffered and written in batches; reads map the
+    column files into memory and hand them out as NumPy arrays, so months
+    of history can be scanned with vectorized operations without loading
+    it into Python objects.
+    """
+
+    def __init__(self, directory: str, flush_every: int = 1024):
+        """
+        Open or create a log.
+
+        Args:
+            directory (str): Directory holding the column and table files
+            flush_every (int): Buffered transitions written to disk at once
+        """
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._flush_every = flush_every
+        self._lock = threading.Lock()
+        self._tables = {name: _StringTable(os.path.join(directory, f'{name}.txt')) for name in _TABLES}
+        self._truncate_to_complete_rows()
+        self._buffers = {name: array(typecode) for name, (typecode, _) in COLUMNS.items()}
+        self._files = {name: open(self._column_path(name), 'ab') for name in COLUMNS}
+
+    def _column_path(self, name: str) -> str:
+        """Get the file path of a column"""
+        return os.path.join(self._directory, f'{name}.col')
+
+    def _truncate_to_complete_rows(self) -> None:
+        """Drop a partially written last batch, so every column has the same length"""
+        lengths = {}
+        for name, (_, dtype) in COLUMNS.items():
+            path = self._column_path(name)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            lengths[name] = size // np.dtype(dtype).itemsize
+        rows = min(lengths.values())
+        for name, length in lengths.items():
+            if length != rows or not os.path.exists(self._column_path(name)):
+                with open(self._column_path(name), 'ab') as f:
+                    f.truncate(rows * np.dtype(COLUMNS[name][1]).itemsize)
+                if length != rows:
+                    logger.warning("Truncated transition log column %s from %s to %s rows", name, length, rows)
+
+    def append(self, timestamp: datetime, user_id: str, flow_type: str,
+               from_state: str, to_state: str, duration_seconds: Optional[float]) -> None:
+        """
+        Append a transition.
+
+        Args:
+            timestamp (datetime): Time of the transition
+            user_id (str): User identifier
+            flow_type (str): Type of business flow
+            from_state (str): Previous state
+            to_state (str): New state
+            duration_seconds (Optional[float]): Seconds spent in from_state, None if unknown
+        """
+        with self._lock:
+            # Everything that can raise runs before any column grows, so the
+            # columns never get out of step
+            row = (
+                ('timestamp', timestamp.timestamp()),
+                ('duration', math.nan if duration_seconds is None else duration_seconds),
+                ('user', self._tables['users'].intern(user_id)),
+                ('flow', self._tables['flows'].intern(flow_type)),
+                ('from_state', self._tables['states'].intern(from_state)),
+                ('to_state', self._tables['states'].intern(to_state)),
+            )
+            buffers = self._buffers
+            for name, value in row:
+                buffers[name].append(value)
+            if len(buffers['timestamp']) >= self._flush_every:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        """Write buffered transitions to the column files"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        """Write buffered transitions; the lock must be held"""
+        if not self._buffers['timestamp']:
+            return
+        for name, buffer in self._buffers.items():
+            self._files[name].write(buffer.tobytes())
+            del buffer[:]
+        for f in self._files.values():
+            f.flush()
+
+    def read(self) -> TransitionColumns:
+        """
+        Map the flushed and buffered transitions for reading.
+
+        Returns:
+            TransitionColumns: Columns as read-only arrays of equal length
+        """
+        with self._lock:
+            self._flush_locked()
+            columns = {}
+            for name, (_, dtype) in COLUMNS.items():
+                path = self._column_path(name)
+                if os.path.getsize(path) == 0:
+                    # mmap cannot map empty files
+                    columns[name] = np.empty(0, dtype=dtype)
+                else:
+                    columns[name] = np.memmap(path, dtype=dtype, mode='r')
+            tables = {name: list(table.values) for name, table in self._tables.items()}
+        return TransitionColumns(columns, tables['users'], tables['flows'], tables['states'])
+
+    def close(self) -> None:
+        """Flush and close the files"""
+        with self._lock:
+            self._flush_locked()
+            for f in self._files.values():
+                f.close()
+            for table in self._tables.values():
+                table.close()
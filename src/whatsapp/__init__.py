@@ -2,9 +2,15 @@
 from .client import WhatsAppClient
 from .utils.message_parser import get_button_title
 from .label_manager import LabelManager
+from .label_sync import LabelSyncEngine
+from .label_queue import LabelWriteBehindQueue
+from .label_index import LabelIndex
 
 __all__ = [
     'WhatsAppClient',
     'get_button_title',
-    'LabelManager'
+    'LabelManager',
+    'LabelSyncEngine',
+    'LabelWriteBehindQueue',
+    'LabelIndex'
 ]
\ No newline at end of file
@@ -0,0 +1,249 @@
+"""asyncio WhatsApp API client with a bounded, keep-alive connection pool."""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Dict, List, Optional
+
+import aiohttp
+
+from .config import (
+    API as WHATSAPP_API,
+    HTTP as WHATSAPP_HTTP,
+    get_api_url
+)
+from .client import SEND_TIMERS
+from .rate_limiter import RateLimiter, RetryPolicy
+from .utils.validators import validate_outbound_payload
+from ..models.message_payload import encode_payload
+from ..utils.errors import WhatsAppAPIError, WhatsAppRateLimitError
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncWhatsAppClient:
+    """asyncio client for interacting with the WhatsApp API.
+
+    Requests share one aiohttp session whose connector bounds the number of
+    open connections and keeps idle ones alive, so replies do not pay for a
+    new TCP/TLS handshake and do not hold a thread while waiting on the API.
+    The session is bound to the event loop it was first used on.
+    """
+
+    def __init__(self,
+                 max_connections: int = WHATSAPP_HTTP['max_connections'],
+                 max_connections_per_host: int = WHATSAPP_HTTP['max_connections_per_host'],
+                 keepalive_timeout: float = WHATSAPP_HTTP['keepalive_timeout'],
+                 connect_timeout: float = WHATSAPP_HTTP['connect_timeout'],
+                 request_timeout: float = WHATSAPP_HTTP['request_timeout'],
+                 rate_limiter: Optional[RateLimiter] = None,
+                 retry_policy: Optional[RetryPolicy] = None):
+        """Initialize the async WhatsApp client.
+
+        Args:
+            max_connections: Maximum number of pooled connections
+            max_connections_per_host: Maximum connections per host (0 for no limit)
+            keepalive_timeout: Seconds an idle connection is kept open
+            connect_timeout: Seconds allowed to establish a connection
+            request_timeout: Total seconds allowed per request
+            rate_limiter: Limiter shared with other clients (a new one by default)
+            retry_policy: Backoff policy for 429/5xx responses (defaults from config)
+        """
+        self._rate_limiter = rate_limiter or RateLimiter()
+        self._retry_policy = retry_policy or RetryPolicy()
+        self._max_connections = max_connections
+        self._max_connections_per_host = max_connections_per_host
+        self._keepalive_timeout = keepalive_timeout
+        self._timeout = aiohttp.ClientTimeout(total=request_timeout, connect=connect_timeout)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Get the shared session, creating it on first use.
+
+        Returns:
+            The aiohttp session
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self._max_connections,
+                limit_per_host=self._max_connections_per_host,
+                keepalive_timeout=self._keepalive_timeout,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self._timeout,
+                headers={
+                    'Authorization': WHATSAPP_API['headers']['authorization'],
+                    'Content-Type': 'application/json; charset=utf-8',
+                    'Accept': 'application/json'
+                }
+            )
+        return self._session
+
+    async def send_message(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Send a message through the WhatsApp API.
+
+        Args:
+            payload: Message payload to send. For interactive messages, type should be 'button' by default.
+            For text messages, type field should not be present.
+
+        Returns:
+            API response data
+
+        Raises:
+            ValueError: If required fields are missing
+            WhatsAppAPIError: If the API keeps failing after all retries
+            aiohttp.ClientResponseError: For non-retryable error responses
+        """
+        message_type = validate_outbound_payload(payload)
+        url = get_api_url(message_type)
+
+        started = time.perf_counter()
+        try:
+            return await self._post_with_retry(url, payload)
+        finally:
+            SEND_TIMERS.get(message_type, SEND_TIMERS['text']).observe(time.perf_counter() - started)
+
+    async def _post_with_retry(self, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Post a payload, respecting rate limits and retrying 429/5xx responses.
+
+        Args:
+            url: Endpoint URL
+            payload: Validated message payload
+
+        Returns:
+            API response data
+
+        Raises:
+            WhatsAppRateLimitError: If the API still rate limits after all retries
+            WhatsAppAPIError: If the API keeps failing or is unreachable after all retries
+            aiohttp.ClientResponseError: For non-retryable error responses
+        """
+        recipient = payload.get('to', '')
+        body = encode_payload(payload)
+
+        attempt = 0
+        while True:
+            await self._rate_limiter.acquire_async(recipient)
+            try:
+                async with self._get_session().post(url, data=body) as response:
+                    retry_after = self._rate_limiter.update_from_headers(response.headers)
+                    if response.status < 400:
+                        return await response.json(content_type=None)
+
+                    status = response.status
+                    if not self._retry_policy.should_retry(status, attempt):
+                        logger.error("Error response %s from %s: %s",
+                                     status, url, await response.text())
+                        if status == 429:
+                            raise WhatsAppRateLimitError(
+                                f"WhatsApp API rate limit persisted after {attempt + 1} attempts",
+                                status, retry_after
+                            )
+                        if status in self._retry_policy.retry_statuses:
+                            raise WhatsAppAPIError(
+                                f"WhatsApp API returned {status} after {attempt + 1} attempts",
+                                status, retry_after
+                            )
+                        response.raise_for_status()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= self._retry_policy.max_retries:
+                    raise WhatsAppAPIError(f"WhatsApp API unreachable after {attempt + 1} attempts: {e}") from e
+                delay = self._retry_policy.backoff(attempt)
+                logger.warning("Request to %s failed (%s), retrying in %.2fs", url, e, delay)
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+
+            delay = self._retry_policy.backoff(attempt, retry_after)
+            logger.warning("WhatsApp API returned %s, retrying in %.2fs", status, delay)
+            if status == 429:
+                # Hold every sender back, not just this message
+                self._rate_limiter.hold(delay)
+            else:
+                await asyncio.sleep(delay)
+            attempt += 1
+
+    async def send_messages(self, payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Send payloads for one recipient in order.
+
+        Args:
+            payloads: Message payloads to send; empty entries are skipped
+
+        Returns:
+            API response data for each sent payload
+        """
+        results = []
+        for payload in payloads:
+            if payload:
+                results.append(await self.send_message(payload))
+        return results
+
+    async def close(self) -> None:
+        """Close the session and its pooled connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self) -> "AsyncWhatsAppClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+
+class BackgroundEventLoop:
+    """Event loop running on a dedicated daemon thread.
+
+    Frameworks such as Flask run each async view on a short-lived event loop,
+    which would discard pooled connections after every request. Coroutines
+    submitted here all run on one long-lived loop, so an AsyncWhatsAppClient
+    used through it keeps its connection pool across requests.
+    """
+
+    def __init__(self, name: str = 'async-sender'):
+        """Initialize the background loop.
+
+        Args:
+            name: Name of the loop thread
+        """
+        self._name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the loop thread if it is not running yet."""
+        if self._thread is not None:
+            return
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name=self._name, daemon=True)
+        self._thread.start()
+
+    def submit(self, coro: Awaitable[Any]) -> Future:
+        """Schedule a coroutine on the background loop.
+
+        Args:
+            coro: Coroutine to run
+
+        Returns:
+            Future resolved with the coroutine result
+        """
+        if self._loop is None:
+            self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the loop and wait for its thread.
+
+        Args:
+            timeout: Seconds to wait for the thread to finish
+        """
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._loop.close()
+        self._loop = None
+        self._thread = None
@@ -1,17 +1,47 @@
 """WhatsApp API client implementation."""
+import time
 import requests
-from typing import Any, Dict, Optional
+from concurrent.futures import Future
+from requests.adapters import HTTPAdapter
+from typing import Any, Dict, List, Optional
 from .config import (
     API as WHATSAPP_API,
+    HTTP as WHATSAPP_HTTP,
     LABELS as WHATSAPP_LABELS,
     get_api_url
 )
+from .rate_limiter import RateLimiter, RetryPolicy
+from .send_queue import OutboundSendQueue
+from ..utils.errors import WhatsAppAPIError, WhatsAppRateLimitError
+from .utils.validators import validate_outbound_payload
+from ..utils.logger import get_trace_logger, setup_logger
+from ..models.message_payload import encode_payload
+from ..utils.metrics import REGISTRY
+
+logger = setup_logger(__name__)
+tracer = get_trace_logger(__name__)
+
+SEND_SECONDS = REGISTRY.histogram(
+    'whatsapp_bot_send_seconds',
+    'WhatsApp API send latency including rate limiting and retries, by endpoint',
+    ('endpoint',)
+)
+# Children looked up once; shared with the async client
+SEND_TIMERS = {endpoint: SEND_SECONDS.labels(endpoint) for endpoint in WHATSAPP_API['endpoints']}
 
 class WhatsAppClient:
     """Client for interacting with the WhatsApp API."""
 
-    def __init__(self):
-        """Initialize the WhatsApp client."""
+    def __init__(self, rate_limiter: Optional[RateLimiter] = None,
+                 retry_policy: Optional[RetryPolicy] = None):
+        """Initialize the WhatsApp client.
+        
+        Args:
+            rate_limiter: Limiter shared with other clients (a new one by default)
+            retry_policy: Backoff policy for 429/5xx responses (defaults from config)
+        """
+        self._rate_limiter = rate_limiter or RateLimiter()
+        self._retry_policy = retry_policy or RetryPolicy()
         self.session = requests.Session()
         # Set required API headers with UTF-8 charset
         self.session.headers.update({
@@ -19,6 +49,19 @@ class WhatsAppClient:
             'Content-Type': 'application/json; charset=utf-8',
             'Accept': 'application/json'
         })
+        # Reuse pooled keep-alive connections across sender threads
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=WHATSAPP_HTTP['max_connections']
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._timeout = (WHATSAPP_HTTP['connect_timeout'], WHATSAPP_HTTP['request_timeout'])
+        self._send_queue = OutboundSendQueue(
+            self.send_message,
+            max_in_flight=WHATSAPP_HTTP['max_in_flight'],
+            max_pending=WHATSAPP_HTTP['max_pending_sends']
+        )
 
     def send_message(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         """Send a message through the WhatsApp API.
@@ -32,62 +75,126 @@ class WhatsAppClient:
             
         Raises:
             ValueError: If required fields are missing
+            WhatsAppAPIError: If the API keeps failing after all retries
         """
-        print("\n=== WhatsAppClient.send_message() ===")
-        print(f"Incoming payload: {payload}")
+        # Validate the payload and determine the endpoint from its structure
+        message_type = validate_outbound_payload(payload)
+        url = get_api_url(message_type)
+        tracer.trace(payload.get('to', ''), "Sending %s message to %s: %s", message_type, url, payload)
+        
+        started = time.perf_counter()
+        try:
+            return self._post_with_retry(url, payload)
+        finally:
+            SEND_TIMERS.get(message_type, SEND_TIMERS['text']).observe(time.perf_counter() - started)
 
-        # Determine message type from payload structure
-        message_type = 'text'
-        if payload.get('type') == 'button':
-            message_type = 'interactive'
-        print(f"Determined message type: {message_type}")
+    def _post_with_retry(self, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Post a payload, respecting rate limits and retrying 429/5xx responses.
         
-        if message_type == 'interactive':
-            print("Validating interactive message payload...")
-            required_fields = ['messaging_product', 'to', 'type', 'body', 'action']
-            if not all(key in payload for key in required_fields):
-                missing = [f for f in required_fields if f not in payload]
-                print(f"Missing required fields: {missing}")
-                raise ValueError(f"Interactive messages must have these fields: {', '.join(required_fields)}")
-            
-            if 'text' not in payload['body']:
-                print("Error: 'text' field missing in body")
-                raise ValueError("Interactive message body must have 'text' field")
-                
-            if 'buttons' not in payload['action']:
-                print("Error: 'buttons' field missing in action")
-                raise ValueError("Interactive message action must have 'buttons' field")
+        Messages are held back (never dropped) while the rate limiter or the
+        API asks senders to slow down.
+        
+        Args:
+            url: Endpoint URL
+            payload: Validated message payload
             
-            print("Interactive message validation passed")
-        else:
-            print("Validating text message payload...")
-            # For text messages, validate required fields
-            required_fields = ['messaging_product', 'to', 'body']
-            if not all(key in payload for key in required_fields):
-                missing = [f for f in required_fields if f not in payload]
-                print(f"Missing required fields: {missing}")
-                raise ValueError(f"Text messages must have these fields: {', '.join(required_fields)}")
+        Returns:
+            API response data
             
-            # For text messages, body must be a string
-            if not isinstance(payload['body'], str):
-                print(f"Error: body is type {type(payload['body'])}, expected str")
-                print(f"Body content: {payload['body']}")
-                raise ValueError("Text message body must be a string")
+        Raises:
+            WhatsAppRateLimitError: If the API still rate limits after all retries
+            WhatsAppAPIError: If the API keeps failing or is unreachable after all retries
+            requests.exceptions.HTTPError: For non-retryable error responses
+        """
+        recipient = payload.get('to', '')
+        # Compiled templates arrive pre-encoded; other payloads are encoded once for all attempts
+        body = encode_payload(payload)
+        attempt = 0
+        while True:
+            self._rate_limiter.acquire(recipient)
+            try:
+                response = self.session.post(url, data=body, timeout=self._timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt >= self._retry_policy.max_retries:
+                    raise WhatsAppAPIError(f"WhatsApp API unreachable after {attempt + 1} attempts: {e}") from e
+                delay = self._retry_policy.backoff(attempt)
+                logger.warning("Request to %s failed (%s), retrying in %.2fs", url, e, delay)
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            tracer.trace(recipient, "WhatsApp API responded %s", response.status_code)
+            retry_after = self._rate_limiter.update_from_headers(response.headers)
+            if response.status_code < 400:
+                return response.json()
+
+            status = response.status_code
+            if self._retry_policy.should_retry(status, attempt):
+                delay = self._retry_policy.backoff(attempt, retry_after)
+                logger.warning("WhatsApp API returned %s, retrying in %.2fs", status, delay)
+                if status == 429:
+                    # Hold every sender back, not just this message
+                    self._rate_limiter.hold(delay)
+                else:
+                    time.sleep(delay)
+                attempt += 1
+                continue
+
+            logger.error("Error response %s from %s: %s", status, url, response.text)
+            if status == 429:
+                raise WhatsAppRateLimitError(
+                    f"WhatsApp API rate limit persisted after {attempt + 1} attempts",
+                    status, retry_after
+                )
+            if status in self._retry_policy.retry_statuses:
+                raise WhatsAppAPIError(
+                    f"WhatsApp API returned {status} after {attempt + 1} attempts",
+                    status, retry_after
+                )
+            response.raise_for_status()
+
+    def enqueue_message(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> Future:
+        """Queue a message for pipelined sending.
+        
+        Messages to the same recipient are sent in the order they were queued.
+        
+        Args:
+            payload: Message payload to send
+            timeout: Seconds to wait for room when the send queue is full (None waits forever)
             
-            print("Text message validation passed")
+        Returns:
+            Future resolved with the API response data
             
-        url = get_api_url(message_type)
-        print(f"Sending {message_type} message to {url}")
-        
-        response = self.session.post(url, json=payload)
+        Raises:
+            SendQueueFullError: If the send queue stayed full for the whole timeout
+        """
+        return self._send_queue.enqueue(payload, timeout)
+
+    def enqueue_messages(self, payloads: List[Dict[str, Any]],
+                         timeout: Optional[float] = None) -> List[Future]:
+        """Queue several messages for pipelined sending, skipping empty payloads.
         
-        # Print response details for debugging
-        print(f"Response status: {response.status_code}")
+        Args:
+            payloads: Message payloads to send
+            timeout: Seconds to wait for room per payload when the send queue is full
+            
+        Returns:
+            Futures resolved with the API response data, one per queued payload
+        """
+        return [self._send_queue.enqueue(payload, timeout) for payload in payloads if payload]
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until all queued messages have been sent.
         
-        try:
-            response.raise_for_status()
-        except requests.exceptions.HTTPError as e:
-            print(f"Error response content: {response.text}")
-            raise
-        response.raise_for_status()
-        return response.json()
\ No newline at end of file
+        Args:
+            timeout: Seconds to wait (None waits forever)
+            
+        Returns:
+            True if the send queue drained, False on timeout
+        """
+        return self._send_queue.flush(timeout)
+
+    @property
+    def pending_sends(self) -> int:
+        """Number of queued or in-flight messages."""
+        return self._send_queue.pending_count
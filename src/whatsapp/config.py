@@ -2,6 +2,8 @@
 
 This module contains all WhatsApp-specific configuration including:
 - API endpoints and authentication
+- HTTP connection pool settings
+- Rate limits and retry backoff
 - Label mappings
 - Message type definitions
 """
@@ -19,6 +21,24 @@ class APIConfig(TypedDict):
     endpoints: APIEndpoints
     headers: Dict[str, str]
 
+class HTTPConfig(TypedDict):
+    max_connections: int
+    max_connections_per_host: int
+    keepalive_timeout: float
+    connect_timeout: float
+    request_timeout: float
+    max_in_flight: int
+    max_pending_sends: int
+
+class RateLimitConfig(TypedDict):
+    global_rate: float
+    global_burst: float
+    recipient_rate: float
+    recipient_burst: float
+    max_retries: int
+    backoff_base: float
+    backoff_max: float
+
 class WhatsAppLabels(TypedDict):
     bot_new_conversation: str
     waiting_urgent_support: str
@@ -41,6 +61,28 @@ API: APIConfig = {
     }
 }
 
+# Outbound HTTP connection pool and timeout settings
+HTTP: HTTPConfig = {
+    'max_connections': int(os.getenv('WHATSAPP_MAX_CONNECTIONS', 100)),
+    'max_connections_per_host': int(os.getenv('WHATSAPP_MAX_CONNECTIONS_PER_HOST', 0)),
+    'keepalive_timeout': float(os.getenv('WHATSAPP_KEEPALIVE_TIMEOUT', 30)),
+    'connect_timeout': float(os.getenv('WHATSAPP_CONNECT_TIMEOUT', 5)),
+    'request_timeout': float(os.getenv('WHATSAPP_REQUEST_TIMEOUT', 30)),
+    'max_in_flight': int(os.getenv('WHATSAPP_MAX_IN_FLIGHT', 16)),
+    'max_pending_sends': int(os.getenv('WHATSAPP_MAX_PENDING_SENDS', 1000)),
+}
+
+# Outbound rate limits and retry backoff
+RATE_LIMIT: RateLimitConfig = {
+    'global_rate': float(os.getenv('WHATSAPP_RATE_LIMIT_PER_SECOND', 80)),
+    'global_burst': float(os.getenv('WHATSAPP_RATE_LIMIT_BURST', 80)),
+    'recipient_rate': float(os.getenv('WHATSAPP_RECIPIENT_RATE_PER_SECOND', 1)),
+    'recipient_burst': float(os.getenv('WHATSAPP_RECIPIENT_BURST', 10)),
+    'max_retries': int(os.getenv('WHATSAPP_MAX_RETRIES', 5)),
+    'backoff_base': float(os.getenv('WHATSAPP_BACKOFF_BASE', 0.5)),
+    'backoff_max': float(os.getenv('WHATSAPP_BACKOFF_MAX', 30)),
+}
+
 # WhatsApp Label IDs with type safety
 LABELS: WhatsAppLabels = {
     'bot_new_conversation': os.getenv('WHATSAPP_BOT_NEW_CONVERSATION_LABEL_ID', ''),
@@ -50,6 +92,10 @@ LABELS: WhatsAppLabels = {
     'organization': os.getenv('WHATSAPP_ORGANIZATION_LABEL_ID', ''),
 }
 
+# Labels only the bot acts on; the others are for staff and stay on a chat
+# after its conversation expires, e.g. waiting_urgent_support
+BOT_LABELS = frozenset({'bot_new_conversation'})
+
 def get_api_url(message_type: str) -> str:
     """Get the appropriate API URL based on message type.
     
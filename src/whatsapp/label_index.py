@@ -0,0 +1,131 @@
+"""Bidirectional index between chats and their labels."""
+import threading
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class LabelIndex:
+    """Maps users to labels and labels to users, with the time each was applied
+
+    Both directions are dicts, so applying and removing a label is O(1) and
+    listing the chats of a label never scans other users. Chats of a label
+    keep the order in which the label was applied, oldest first, and
+    re-applying a label keeps its original time.
+    """
+
+    def __init__(self, clock: Callable[[], datetime] = datetime.now):
+        """
+        Initialize an empty index.
+
+        Args:
+            clock (Callable[[], datetime]): Time source for applied_at
+        """
+        self._clock = clock
+        self._by_user: Dict[str, Dict[str, datetime]] = {}
+        self._by_label: Dict[str, Dict[str, datetime]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, user_id: str, label: str) -> None:
+        """
+        Apply a label to a chat.
+
+        Args:
+            user_id (str): Unique identifier for the user
+            label (str): Label to apply
+        """
+        with self._lock:
+            labels = self._by_user.setdefault(user_id, {})
+            if label not in labels:
+                applied_at = labels[label] = self._clock()
+                self._by_label.setdefault(label, {})[user_id] = applied_at
+
+    def remove(self, user_id: str, label: str) -> None:
+        """
+        Remove a label from a chat.
+
+        Args:
+            user_id (str): Unique identifier for the user
+            label (str): Label to remove
+        """
+        with self._lock:
+            labels = self._by_user.get(user_id)
+            if labels is None or labels.pop(label, None) is None:
+                return
+            if not labels:
+                del self._by_user[user_id]
+            self._discard_locked(label, user_id)
+
+    def remove_all(self, user_id: str) -> None:
+        """
+        Remove every label from a chat.
+
+        Args:
+            user_id (str): Unique identifier for the user
+        """
+        with self._lock:
+            for label in self._by_user.pop(user_id, {}):
+                self._discard_locked(label, user_id)
+
+    def _discard_locked(self, label: str, user_id: str) -> None:
+        """Drop a chat from a label's chats; the lock must be held"""
+        users = self._by_label[label]
+        del users[user_id]
+        if not users:
+            del self._by_label[label]
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._by_user
+
+    def get_labels(self, user_id: str) -> Dict[str, datetime]:
+        """
+        Get the labels of a chat.
+
+        Args:
+            user_id (str): Unique identifier for the user
+
+        Returns:
+            Dict[str, datetime]: Time each label was applied
+        """
+        with self._lock:
+            return dict(self._by_user.get(user_id, {}))
+
+    def count(self, label: str) -> int:
+        """
+        Get the number of chats with a label.
+
+        Args:
+            label (str): Label to count
+
+        Returns:
+            int: Chats currently labelled
+        """
+        return len(self._by_label.get(label, ()))
+
+    def get_counts(self) -> Dict[str, int]:
+        """
+        Get the number of chats per label.
+
+        Returns:
+            Dict[str, int]: Chats per label in use
+        """
+        with self._lock:
+            return {label: len(users) for label, users in self._by_label.items()}
+
+    def get_users(self, label: str, offset: int = 0,
+                  limit: Optional[int] = None) -> List[Tuple[str, datetime]]:
+        """
+        Get a page of the chats with a label, oldest application first.
+
+        Args:
+            label (str): Label to list
+            offset (int): Chats to skip
+            limit (Optional[int]): Maximum number of chats, None for all
+
+        Returns:
+            List[Tuple[str, datetime]]: User ID and time the label was applied
+        """
+        with self._lock:
+            users = self._by_label.get(label, {})
+            stop = None if limit is None else offset + limit
+            return list(islice(users.items(), offset, stop))
@@ -1,50 +1,128 @@
 """WhatsApp label management functionality."""
-from typing import Set
+import logging
+import threading
+from typing import Optional, Set, Union
+
+from .label_index import LabelIndex
+from .label_queue import LabelWriteBehindQueue
+from .label_sync import LabelSyncEngine
+
+logger = logging.getLogger(__name__)
 
 class LabelManager:
-    """Manages WhatsApp chat labels."""
-    
-    def __init__(self):
-        """Initialize label manager."""
-        self._user_labels: dict[str, Set[str]] = {}
-        
+    """Manages WhatsApp chat labels.
+
+    Label changes only update the desired labels of a chat and mark it
+    dirty; sync() pushes the net result of all changes since the last
+    sync through the sync engine, one call per chat at most. With a
+    LabelWriteBehindQueue in its place, sync() only queues the result.
+    Labels are kept in a LabelIndex, so the chats of a label can be listed
+    without scanning every user.
+    """
+
+    def __init__(self, sync_engine: Optional[Union[LabelSyncEngine, LabelWriteBehindQueue]] = None,
+                 index: Optional[LabelIndex] = None):
+        """Initialize label manager.
+
+        Args:
+            sync_engine (Optional[Union[LabelSyncEngine, LabelWriteBehindQueue]]): Pushes or queues
+                labels for WhatsApp, None to keep them local
+            index (Optional[LabelIndex]): Index holding the labels, a new one by default
+        """
+        self._index = index if index is not None else LabelIndex()
+        self._sync_engine = sync_engine
+        self._dirty: Set[str] = set()
+        self._dirty_lock = threading.Lock()
+
+    def _mark_dirty(self, user_id: str) -> None:
+        """Mark a user's labels as changed since the last sync"""
+        if self._sync_engine is not None:
+            with self._dirty_lock:
+                self._dirty.add(user_id)
+
     def apply_label(self, user_id: str, label: str) -> None:
         """Apply a label to a user's conversation
-        
+
         Args:
             user_id (str): Unique identifier for the user
             label (str): Label to apply
         """
-        if user_id not in self._user_labels:
-            self._user_labels[user_id] = set()
-        self._user_labels[user_id].add(label)
-        
+        self._index.add(user_id, label)
+        self._mark_dirty(user_id)
+
     def remove_label(self, user_id: str, label: str) -> None:
         """Remove a specific label from a user
-        
+
         Args:
             user_id (str): Unique identifier for the user
             label (str): Label to remove
         """
-        if user_id in self._user_labels:
-            self._user_labels[user_id].discard(label)
-            
+        if user_id in self._index:
+            self._index.remove(user_id, label)
+            self._mark_dirty(user_id)
+
     def remove_all_labels(self, user_id: str) -> None:
         """Remove all labels for a user
-        
+
         Args:
             user_id (str): Unique identifier for the user
         """
-        if user_id in self._user_labels:
-            del self._user_labels[user_id]
-            
+        if user_id in self._index:
+            self._index.remove_all(user_id)
+            self._mark_dirty(user_id)
+
     def get_labels(self, user_id: str) -> Set[str]:
         """Get all labels for a user
-        
+
         Args:
             user_id (str): Unique identifier for the user
-            
+
         Returns:
             Set[str]: Set of labels for the user
         """
-        return self._user_labels.get(user_id, set())
\ No newline at end of file
+        return set(self._index.get_labels(user_id))
+
+    @property
+    def index(self) -> LabelIndex:
+        """Index of the labels by user and by label"""
+        return self._index
+
+    def sync(self, user_id: Optional[str] = None) -> int:
+        """Push changed labels to WhatsApp
+
+        Failed chats stay dirty and are retried on their next sync.
+
+        Args:
+            user_id (Optional[str]): User to sync, None for every changed user
+
+        Returns:
+            int: Number of API calls sent
+        """
+        if self._sync_engine is None:
+            return 0
+        with self._dirty_lock:
+            if user_id is None:
+                users = list(self._dirty)
+                self._dirty.clear()
+            elif user_id in self._dirty:
+                users = [user_id]
+                self._dirty.discard(user_id)
+            else:
+                return 0
+        calls = 0
+        for user in users:
+            try:
+                calls += self._sync_engine.sync(user, set(self.get_labels(user)))
+            except Exception as e:
+                logger.error("Error syncing labels for user %s: %s", user, e)
+                self._mark_dirty(user)
+        return calls
+
+    def get_pending_users(self) -> Set[str]:
+        """Get users whose labels changed since their last sync
+
+        Returns:
+            Set[str]: User identifiers
+        """
+        with self._dirty_lock:
+            return set(self._dirty)
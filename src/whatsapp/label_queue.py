@@ -0,0 +1,277 @@
+"""Write-behind queue pushing label changes after replies are sent."""
+import heapq
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from .label_sync import LabelSyncEngine
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingLabels:
+    """Latest desired labels of a chat waiting to be pushed"""
+
+    __slots__ = ('labels', 'due', 'held', 'attempts', 'last_error', 'queued_at')
+
+    def __init__(self, labels: FrozenSet[str], due: float, held: bool, queued_at: float):
+        self.labels = labels
+        self.due = due
+        self.held = held
+        self.attempts = 0
+        self.last_error: Optional[str] = None
+        self.queued_at = queued_at
+
+
+class LabelWriteBehindQueue:
+    """Pushes label changes on a background thread instead of the reply path
+
+    Takes the place of the sync engine in LabelManager. sync() only stores
+    the chat's desired labels, replacing anything still pending for it, so
+    all label changes a chat gets before the push are merged into one diff.
+    New entries are held until release() is called once the chat's reply
+    has been sent, or until hold_seconds pass for changes without a reply.
+    Failed pushes are retried with exponential backoff; after max_attempts
+    the chat's remote state is forgotten so its next sync resets it fully.
+    """
+
+    def __init__(self, engine: LabelSyncEngine, hold_seconds: float = 5.0,
+                 retry_delay: float = 1.0, max_retry_delay: float = 60.0,
+                 max_attempts: int = 5, clock: Callable[[], float] = time.monotonic,
+                 name: str = 'label-write-behind'):
+        """
+        Initialize the queue.
+
+        Args:
+            engine (LabelSyncEngine): Sends the merged label changes
+            hold_seconds (float): Longest wait for release() before pushing anyway
+            retry_delay (float): Seconds before the first retry, doubled per attempt
+            max_retry_delay (float): Upper bound of the retry delay
+            max_attempts (int): Attempts per chat before its changes are dropped
+            clock (Callable[[], float]): Monotonic time source in seconds
+            name (str): Name of the worker thread
+        """
+        self._engine = engine
+        self._hold_seconds = hold_seconds
+        self._retry_delay = retry_delay
+        self._max_retry_delay = max_retry_delay
+        self._max_attempts = max_attempts
+        self._clock = clock
+        self._name = name
+        self._pending: Dict[str, _PendingLabels] = {}
+        # (due, sequence, user_id); stale when the user's entry has another due time
+        self._schedule: List[Tuple[float, int, str]] = []
+        self._sequence = 0
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {'queued': 0, 'merged': 0, 'sent': 0, 'unchanged': 0, 'retried': 0, 'dropped': 0}
+
+    def _schedule_locked(self, user_id: str, entry: _PendingLabels, due: float) -> None:
+        """Set an entry's due time and wake the worker; the lock must be held"""
+        entry.due = due
+        self._sequence += 1
+        heapq.heappush(self._schedule, (due, self._sequence, user_id))
+        self._condition.notify_all()
+
+    def sync(self, user_id: str, desired: Iterable[str]) -> bool:
+        """
+        Queue a chat's desired labels, merging them with pending ones.
+
+        Args:
+            user_id (str): Unique identifier for the user
+            desired (Iterable[str]): Label keys the chat should have
+
+        Returns:
+            bool: Always False, as no call is sent on the caller's thread
+        """
+        labels = frozenset(desired)
+        with self._condition:
+            entry = self._pending.get(user_id)
+            if entry is not None:
+                # Keep the due time: a released or retrying chat stays due
+                entry.labels = labels
+                self._stats['merged'] += 1
+            else:
+                now = self._clock()
+                entry = self._pending[user_id] = _PendingLabels(labels, now, True, now)
+                self._stats['queued'] += 1
+                self._schedule_locked(user_id, entry, now + self._hold_seconds)
+        return False
+
+    def release(self, user_id: str) -> None:
+        """
+        Let a chat's held label changes be pushed now, e.g. after its reply was sent.
+
+        Args:
+            user_id (str): Unique identifier for the user
+        """
+        with self._condition:
+            entry = self._pending.get(user_id)
+            if entry is not None and entry.held:
+                entry.held = False
+                self._schedule_locked(user_id, entry, self._clock())
+
+    def run_pending(self) -> int:
+        """
+        Push every chat whose changes are due, on the calling thread.
+
+        Returns:
+            int: Number of chats pushed successfully
+        """
+        pushed = 0
+        while True:
+            with self._condition:
+                user_id = self._pop_due_locked(self._clock())
+                if user_id is None:
+                    return pushed
+                entry = self._pending.pop(user_id)
+                self._in_flight += 1
+            pushed += self._push(user_id, entry)
+
+    def _pop_due_locked(self, now: float) -> Optional[str]:
+        """Take the next due chat off the schedule; the lock must be held"""
+        while self._schedule and self._schedule[0][0] <= now:
+            due, _, user_id = heapq.heappop(self._schedule)
+            entry = self._pending.get(user_id)
+            if entry is not None and entry.due == due:
+                return user_id
+        return None
+
+    def _push(self, user_id: str, entry: _PendingLabels) -> int:
+        """Send one chat's labels and reschedule it on failure"""
+        error: Optional[Exception] = None
+        sent = False
+        try:
+            sent = self._engine.sync(user_id, entry.labels)
+        except Exception as e:
+            error = e
+        with self._condition:
+            self._in_flight -= 1
+            if error is None:
+                self._stats['sent' if sent else 'unchanged'] += 1
+            else:
+                entry.attempts += 1
+                entry.last_error = str(error)
+                newer = self._pending.get(user_id)
+                if entry.attempts >= self._max_attempts:
+                    self._stats['dropped'] += 1
+                    logger.error("Dropping label update for user %s after %s attempts: %s",
+                                 user_id, entry.attempts, entry.last_error)
+                    # Unknown remote state now, the next sync resets every label
+                    self._engine.forget(user_id)
+                elif newer is not None:
+                    # Changes queued meanwhile supersede the failed ones
+                    newer.attempts, newer.last_error = entry.attempts, entry.last_error
+                else:
+                    self._stats['retried'] += 1
+                    logger.warning("Label update for user %s failed (attempt %s), retrying: %s",
+                                   user_id, entry.attempts, entry.last_error)
+                    delay = min(self._retry_delay * 2 ** (entry.attempts - 1), self._max_retry_delay)
+                    entry.held = False
+                    self._pending[user_id] = entry
+                    self._schedule_locked(user_id, entry, self._clock() + delay)
+            self._condition.notify_all()
+        return int(error is None)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Release every held chat and wait until nothing is pending.
+
+        Retries keep their backoff, so failing chats can outlast the timeout.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait, None waits forever
+
+        Returns:
+            bool: True if the queue drained, False on timeout
+        """
+        with self._condition:
+            now = self._clock()
+            for user_id, entry in self._pending.items():
+                if entry.held:
+                    entry.held = False
+                    self._schedule_locked(user_id, entry, now)
+            running = self._thread is not None
+        if not running:
+            self.run_pending()
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not self._pending and not self._in_flight, timeout if running else 0
+            )
+
+    def get_pending(self) -> List[Dict[str, Any]]:
+        """
+        Describe the chats with label changes not pushed yet.
+
+        Returns:
+            List[Dict[str, Any]]: Per chat the labels, hold and retry state, oldest first
+        """
+        with self._condition:
+            now = self._clock()
+            return [
+                {
+                    'user_id': user_id,
+                    'labels': sorted(entry.labels),
+                    'held': entry.held,
+                    'attempts': entry.attempts,
+                    'last_error': entry.last_error,
+                    'age_seconds': round(now - entry.queued_at, 3),
+                    'due_in_seconds': round(max(entry.due - now, 0.0), 3),
+                }
+                for user_id, entry in sorted(self._pending.items(), key=lambda item: item[1].queued_at)
+            ]
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get queue counters.
+
+        Returns:
+            Dict[str, int]: Queued, merged, sent, unchanged, retried and dropped updates and current depth
+        """
+        with self._condition:
+            return {**self._stats, 'pending': len(self._pending), 'in_flight': self._in_flight}
+
+    def start(self) -> None:
+        """Start the worker thread if it is not running yet"""
+        with self._condition:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop the worker thread; pending changes stay queued.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait for the thread to finish
+        """
+        with self._condition:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._condition.notify_all()
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self) -> None:
+        """Push due chats until stopped, sleeping until the next due time"""
+        while True:
+            with self._condition:
+                while not self._stopping:
+                    now = self._clock()
+                    while self._schedule and self._schedule[0][0] <= now and \
+                            self._pending.get(self._schedule[0][2]) is None:
+                        heapq.heappop(self._schedule)
+                    if self._schedule and self._schedule[0][0] <= now:
+                        break
+                    self._condition.wait(self._schedule[0][0] - now if self._schedule else None)
+                if self._stopping:
+                    return
+            try:
+                self.run_pending()
+            except Exception:
+                logger.exception("Label write-behind push failed")
@@ -0,0 +1,126 @@
+"""Synchronization of desired chat labels with the WhatsApp labels endpoint."""
+import logging
+import threading
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+from .config import LABELS
+from ..models.message_payload import MessagePayloadBuilder
+
+logger = logging.getLogger(__name__)
+
+SendCallback = Callable[[Dict[str, Any]], Any]
+
+
+class LabelSyncEngine:
+    """Pushes label changes to the API as per-chat diffs
+
+    The engine remembers the labels each chat last had on the remote side.
+    Syncing a chat compares its desired labels with that state and sends
+    one call with the net label IDs to add and remove, so a burst of local
+    changes (e.g. remove_all_labels followed by apply_label) costs a single
+    call, or none if it ends where it started. Chats never synced since
+    start have an unknown remote state; their first sync also removes every
+    other managed label so stale labels from earlier runs are cleared.
+    """
+
+    def __init__(self, send: SendCallback, label_ids: Optional[Mapping[str, str]] = None):
+        """
+        Initialize the engine.
+
+        Args:
+            send (SendCallback): Sends a payload, e.g. WhatsAppClient.send_message
+            label_ids (Optional[Mapping[str, str]]): Label key to ID, LABELS by default;
+                keys without an ID are not synced
+        """
+        self._send = send
+        source = LABELS if label_ids is None else label_ids
+        self._label_ids: Dict[str, str] = {key: label_id for key, label_id in source.items() if label_id}
+        self._remote: Dict[str, FrozenSet[str]] = {}
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._skipped = 0
+
+    def diff(self, user_id: str, desired: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """
+        Get the label IDs to add and remove to reach the desired labels.
+
+        Args:
+            user_id (str): Unique identifier for the user
+            desired (Iterable[str]): Label keys the chat should have
+
+        Returns:
+            Tuple[List[str], List[str]]: Sorted label IDs to add and to remove
+        """
+        wanted = frozenset(key for key in desired if key in self._label_ids)
+        with self._lock:
+            remote = self._remote.get(user_id)
+        if remote is None:
+            # Unknown remote state: clear every managed label not wanted
+            remote = frozenset(self._label_ids)
+            add = wanted
+        else:
+            add = wanted - remote
+        remove = remote - wanted
+        return (
+            sorted(self._label_ids[key] for key in add),
+            sorted(self._label_ids[key] for key in remove)
+        )
+
+    def sync(self, user_id: str, desired: Iterable[str]) -> bool:
+        """
+        Bring a chat's remote labels to the desired set with at most one call.
+
+        Args:
+            user_id (str): Unique identifier for the user
+            desired (Iterable[str]): Label keys the chat should have
+
+        Returns:
+            bool: True if a call was sent, False if the remote state already matched
+
+        Raises:
+            Exception: Whatever the send callback raises; the remote state is then unchanged
+        """
+        desired = frozenset(key for key in desired if key in self._label_ids)
+        add, remove = self.diff(user_id, desired)
+        if add or remove:
+            self._send(MessagePayloadBuilder.create_label_update(user_id, add, remove))
+        with self._lock:
+            self._remote[user_id] = desired
+            if add or remove:
+                self._calls += 1
+            else:
+                self._skipped += 1
+        return bool(add or remove)
+
+    def forget(self, user_id: str) -> None:
+        """
+        Drop the remembered remote state of a chat.
+
+        Args:
+            user_id (str): Unique identifier for the user
+        """
+        with self._lock:
+            self._remote.pop(user_id, None)
+
+    def get_remote_labels(self, user_id: str) -> Optional[FrozenSet[str]]:
+        """
+        Get the label keys a chat last had on the remote side.
+
+        Args:
+            user_id (str): Unique identifier for the user
+
+        Returns:
+            Optional[FrozenSet[str]]: Label keys, None if never synced
+        """
+        with self._lock:
+            return self._remote.get(user_id)
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get sync counters.
+
+        Returns:
+            Dict[str, int]: Calls sent, syncs that needed no call and chats with known state
+        """
+        with self._lock:
+            return {'calls': self._calls, 'skipped': self._skipped, 'tracked_chats': len(self._remote)}
@@ -0,0 +1,276 @@
+"""Token-bucket rate limiting and retry backoff for the WhatsApp API."""
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Callable, Mapping, Optional
+
+from .config import RATE_LIMIT as WHATSAPP_RATE_LIMIT
+
+logger = logging.getLogger(__name__)
+
+# Reset values larger than this are epoch timestamps rather than relative seconds
+_EPOCH_THRESHOLD = 10 ** 9
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations instead of rejecting callers.
+
+    A reservation always succeeds and returns how long the caller has to wait
+    for its token. Tokens may go negative, which queues later callers behind
+    earlier ones instead of dropping their messages.
+    """
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated_at')
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        """Initialize a full bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum number of stored tokens (burst size)
+            now: Current clock value
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = now
+
+    def reserve(self, now: float) -> float:
+        """Take one token.
+
+        Args:
+            now: Current clock value
+
+        Returns:
+            Seconds to wait before the token may be used
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+    def is_full(self, now: float) -> bool:
+        """Check whether the bucket would be full at the given time.
+
+        Args:
+            now: Current clock value
+
+        Returns:
+            True if the bucket has refilled completely
+        """
+        return self.tokens + (now - self.updated_at) * self.rate >= self.capacity
+
+
+class RateLimiter:
+    """Global and per-recipient rate limiter for outbound API calls.
+
+    Besides the configured buckets, the limiter honours rate-limit hints sent
+    back by the API (Retry-After, X-RateLimit-Remaining/Reset) by holding all
+    senders back until the advertised reset time.
+    """
+
+    def __init__(self,
+                 global_rate: float = WHATSAPP_RATE_LIMIT['global_rate'],
+                 global_burst: float = WHATSAPP_RATE_LIMIT['global_burst'],
+                 recipient_rate: float = WHATSAPP_RATE_LIMIT['recipient_rate'],
+                 recipient_burst: float = WHATSAPP_RATE_LIMIT['recipient_burst'],
+                 max_tracked_recipients: int = 10000,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize the rate limiter.
+
+        Args:
+            global_rate: Messages per second across all recipients
+            global_burst: Burst size across all recipients
+            recipient_rate: Messages per second to a single recipient
+            recipient_burst: Burst size for a single recipient
+            max_tracked_recipients: Number of recipient buckets kept in memory
+            clock: Monotonic clock, replaceable for tests
+        """
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._global = TokenBucket(global_rate, global_burst, clock())
+        self._recipient_rate = recipient_rate
+        self._recipient_burst = recipient_burst
+        self._max_tracked_recipients = max_tracked_recipients
+        self._recipients: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._blocked_until = 0.0
+
+    def reserve(self, recipient: str) -> float:
+        """Reserve a send slot for a recipient.
+
+        Args:
+            recipient: Recipient phone number
+
+        Returns:
+            Seconds the caller must wait before sending
+        """
+        with self._lock:
+            now = self._clock()
+            bucket = self._recipients.get(recipient)
+            if bucket is None:
+                bucket = TokenBucket(self._recipient_rate, self._recipient_burst, now)
+                self._recipients[recipient] = bucket
+                self._evict_idle(now)
+            else:
+                self._recipients.move_to_end(recipient)
+            return max(
+                self._global.reserve(now),
+                bucket.reserve(now),
+                self._blocked_until - now
+            )
+
+    def acquire(self, recipient: str) -> None:
+        """Block until a message to the recipient may be sent.
+
+        Args:
+            recipient: Recipient phone number
+        """
+        delay = self.reserve(recipient)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, recipient: str) -> None:
+        """Wait without blocking the event loop until a message may be sent.
+
+        Args:
+            recipient: Recipient phone number
+        """
+        delay = self.reserve(recipient)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def hold(self, seconds: float) -> None:
+        """Hold every sender back for the given time.
+
+        Args:
+            seconds: Seconds from now during which nothing is sent
+        """
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, self._clock() + seconds)
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> Optional[float]:
+        """Apply rate-limit hints from an API response.
+
+        Args:
+            headers: Response headers (case-insensitive mapping)
+
+        Returns:
+            Seconds senders are held back, or None if the headers carry no hint
+        """
+        delay = parse_retry_after(headers.get('Retry-After'))
+        if delay is None and headers.get('X-RateLimit-Remaining') == '0':
+            delay = _parse_reset(headers.get('X-RateLimit-Reset'))
+        if delay is not None and delay > 0:
+            logger.warning("WhatsApp API rate limit reached, holding sends for %.2fs", delay)
+            self.hold(delay)
+        return delay
+
+    def _evict_idle(self, now: float) -> None:
+        """Drop least recently used recipient buckets that have fully refilled.
+
+        Args:
+            now: Current clock value
+        """
+        while len(self._recipients) > self._max_tracked_recipients:
+            recipient, bucket = next(iter(self._recipients.items()))
+            if not bucket.is_full(now):
+                break
+            del self._recipients[recipient]
+
+
+class RetryPolicy:
+    """Jittered exponential backoff for retryable API responses."""
+
+    def __init__(self,
+                 max_retries: int = WHATSAPP_RATE_LIMIT['max_retries'],
+                 base_delay: float = WHATSAPP_RATE_LIMIT['backoff_base'],
+                 max_delay: float = WHATSAPP_RATE_LIMIT['backoff_max'],
+                 retry_statuses: frozenset = frozenset({429, 500, 502, 503, 504})):
+        """Initialize the retry policy.
+
+        Args:
+            max_retries: Retries after the first attempt
+            base_delay: Backoff for the first retry in seconds
+            max_delay: Upper bound for a single backoff in seconds
+            retry_statuses: HTTP statuses that are retried
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_statuses = retry_statuses
+
+    def should_retry(self, status: int, attempt: int) -> bool:
+        """Check whether a response should be retried.
+
+        Args:
+            status: HTTP status code
+            attempt: Zero-based attempt number that produced the response
+
+        Returns:
+            True if another attempt is allowed
+        """
+        return status in self.retry_statuses and attempt < self.max_retries
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Get the delay before the next attempt.
+
+        Uses full jitter so clients that failed together do not retry together.
+
+        Args:
+            attempt: Zero-based attempt number that failed
+            retry_after: Delay requested by the server, used as a lower bound
+
+        Returns:
+            Seconds to wait
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date.
+
+    Args:
+        value: Header value
+
+    Returns:
+        Seconds to wait, or None if missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_reset(value: Optional[str]) -> Optional[float]:
+    """Parse an X-RateLimit-Reset header given in seconds or as an epoch timestamp.
+
+    Args:
+        value: Header value
+
+    Returns:
+        Seconds until the limit resets, or None if missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        reset = float(value)
+    except ValueError:
+        return None
+    if reset > _EPOCH_THRESHOLD:
+        reset -= time.time()
+    return max(0.0, reset)
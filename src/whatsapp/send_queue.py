@@ -0,0 +1,138 @@
+"""Outbound send queue with per-recipient ordering and bounded concurrency."""
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional, Set, Tuple
+
+from ..utils.errors import WhatsAppBotError
+
+logger = logging.getLogger(__name__)
+
+SendCallable = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+class SendQueueFullError(WhatsAppBotError):
+    """Raised when the outbound queue stays full for longer than the enqueue timeout"""
+    pass
+
+
+class OutboundSendQueue:
+    """Pipelines outbound messages over a bounded pool of in-flight requests.
+
+    Each recipient has its own lane and at most one request in flight, so the
+    payloads produced for a user are delivered in the order they were queued.
+    Lanes of different recipients are sent concurrently, up to max_in_flight
+    requests at once. When max_pending payloads are waiting, enqueue blocks
+    the producer (backpressure) instead of starting more HTTP calls.
+    """
+
+    def __init__(self, send: SendCallable, max_in_flight: int = 16, max_pending: int = 1000):
+        """Initialize the send queue.
+
+        Args:
+            send: Function performing one blocking send
+            max_in_flight: Maximum number of concurrent HTTP requests
+            max_pending: Maximum number of queued or in-flight payloads
+        """
+        self._send = send
+        self._max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight,
+                                            thread_name_prefix='whatsapp-send')
+        self._lanes: Dict[str, Deque[Tuple[Dict[str, Any], Future]]] = {}
+        self._active: Set[str] = set()
+        self._pending = 0
+        self._in_flight = 0
+        self._condition = threading.Condition()
+
+    @property
+    def pending_count(self) -> int:
+        """Number of payloads queued or in flight."""
+        return self._pending
+
+    @property
+    def in_flight_count(self) -> int:
+        """Number of HTTP requests currently in flight."""
+        return self._in_flight
+
+    def enqueue(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> Future:
+        """Queue a payload for sending.
+
+        Args:
+            payload: Message payload to send
+            timeout: Seconds to wait for room when the queue is full (None waits forever)
+
+        Returns:
+            Future resolved with the API response data
+
+        Raises:
+            SendQueueFullError: If no room became available within the timeout
+        """
+        recipient = payload.get('to', '')
+        future: Future = Future()
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._pending < self._max_pending, timeout):
+                raise SendQueueFullError(
+                    f"Outbound queue full ({self._pending} pending), message to {recipient} not queued"
+                )
+            self._pending += 1
+            self._lanes.setdefault(recipient, deque()).append((payload, future))
+            if recipient not in self._active:
+                self._active.add(recipient)
+                self._executor.submit(self._send_next, recipient)
+        return future
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued payload has been sent.
+
+        Args:
+            timeout: Seconds to wait (None waits forever)
+
+        Returns:
+            True if the queue drained, False on timeout
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Flush the queue and stop the sender threads.
+
+        Args:
+            timeout: Seconds to wait for the flush
+        """
+        self.flush(timeout)
+        self._executor.shutdown(wait=False)
+
+    def _send_next(self, recipient: str) -> None:
+        """Send the oldest payload of a recipient lane and reschedule the lane.
+
+        Args:
+            recipient: Recipient whose lane should advance
+        """
+        with self._condition:
+            payload, future = self._lanes[recipient].popleft()
+            self._in_flight += 1
+
+        try:
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(self._send(payload))
+                except Exception as e:
+                    logger.error("Failed sending queued message to %s: %s", recipient, str(e))
+                    future.set_exception(e)
+                except BaseException as e:
+                    # Fail the future too, so nobody waits on it forever
+                    future.set_exception(e)
+                    raise
+        finally:
+            # Release the lane whatever happened, or the recipient stalls for good
+            with self._condition:
+                self._in_flight -= 1
+                self._pending -= 1
+                if self._lanes[recipient]:
+                    # Sending one payload per task keeps busy lanes from starving others
+                    self._executor.submit(self._send_next, recipient)
+                else:
+                    del self._lanes[recipient]
+                    self._active.discard(recipient)
+                self._condition.notify_all()
@@ -1,8 +1,9 @@
 """Utilities for WhatsApp messaging."""
 from .message_parser import get_button_title
-from .validators import validate_sender
+from .validators import validate_sender, validate_outbound_payload
 
 __all__ = [
     'get_button_title',
-    'validate_sender'
+    'validate_sender',
+    'validate_outbound_payload'
 ]
\ No newline at end of file
@@ -1,9 +1,10 @@
 """Validation utilities for WhatsApp messages."""
 from typing import Dict, Any
-from src.utils.logger import setup_logger
+from src.utils.logger import setup_logger, get_trace_logger
 from src.config.whatsapp import is_debug_number
 
 logger = setup_logger(__name__)
+tracer = get_trace_logger(__name__)
 
 def validate_sender(message: Dict[str, Any]) -> bool:
     """
@@ -22,12 +23,65 @@ def validate_sender(message: Dict[str, Any]) -> bool:
         
     # For incoming messages, validate the sender
     sender_number = message.get('from', '').strip()
-    logger.debug("Received message from number: %s", sender_number)
     
     # Use the more flexible is_debug_number check
     if not is_debug_number(sender_number):
         logger.debug("Skipping message from %s - not in debug mode or not the debug number", sender_number)
         return False
 
-    logger.debug("Message from %s accepted for processing", sender_number)
-    return True
\ No newline at end of file
+    tracer.trace(sender_number, "Message accepted for processing")
+    return True
+
+def validate_outbound_payload(payload: Dict[str, Any]) -> str:
+    """
+    Validate an outgoing message payload and determine its message type.
+    
+    Args:
+        payload (Dict[str, Any]): Message payload to send. Interactive messages have
+            type 'button'; text messages have no type field.
+        
+    Returns:
+        str: The message type ('text', 'interactive' or 'labels') used for endpoint routing
+        
+    Raises:
+        ValueError: If required fields are missing
+    """
+    # Label updates go to their own endpoint
+    if payload.get('type') == 'labels':
+        labels = payload.get('labels')
+        if 'to' not in payload or not isinstance(labels, dict) or not ('add' in labels and 'remove' in labels):
+            logger.error("Invalid label update payload: %s", payload)
+            raise ValueError("Label updates must have 'to' and 'labels' with 'add' and 'remove'")
+        return 'labels'
+
+    # Determine message type from payload structure
+    message_type = 'interactive' if payload.get('type') == 'button' else 'text'
+    
+    if message_type == 'interactive':
+        required_fields = ['messaging_product', 'to', 'type', 'body', 'action']
+        if not all(key in payload for key in required_fields):
+            missing = [f for f in required_fields if f not in payload]
+            logger.error("Missing required fields: %s", missing)
+            raise ValueError(f"Interactive messages must have these fields: {', '.join(required_fields)}")
+        
+        if 'text' not in payload['body']:
+            logger.error("'text' field missing in interactive message body")
+            raise ValueError("Interactive message body must have 'text' field")
+            
+        if 'buttons' not in payload['action']:
+            logger.error("'buttons' field missing in interactive message action")
+            raise ValueError("Interactive message action must have 'buttons' field")
+    else:
+        # For text messages, validate required fields
+        required_fields = ['messaging_product', 'to', 'body']
+        if not all(key in payload for key in required_fields):
+            missing = [f for f in required_fields if f not in payload]
+            logger.error("Missing required fields: %s", missing)
+            raise ValueError(f"Text messages must have these fields: {', '.join(required_fields)}")
+        
+        # For text messages, body must be a string
+        if not isinstance(payload['body'], str):
+            logger.error("Text message body is type %s, expected str", type(payload['body']))
+            raise ValueError("Text message body must be a string")
+    
+    return message_type